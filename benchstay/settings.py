@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.humanize',
+    'django.contrib.postgres',
     'rest_framework',
     'django_filters',
     # Custom apps
@@ -72,6 +73,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'accounts.context_processors.system_settings',
+                'hotel_management.context_processors.properties',
             ],
         },
     },
@@ -159,6 +161,13 @@ CACHES = {
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
 
+# Redis pub/sub carrying live front-desk updates between processes (None: in-process only)
+GUEST_EVENTS_REDIS_URL = 'redis://localhost:6379/1'
+
+# Overdue deadlines for front-desk actions; see guest_experience.models.DEFAULT_SLA_RULES.
+# After a change, run: manage.py snapshot_overdue_actions --refresh-deadlines
+# GUEST_SLA_RULES = {"IN_HOUSE_HOURS": 24, "COURTESY_GRACE_MINUTES": 0, "DEPARTURE_HOURS": 24}
+
 # Django REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
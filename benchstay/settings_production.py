@@ -167,6 +167,13 @@ SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
 SESSION_COOKIE_AGE = 86400  # 1 day in seconds
 
+# Redis pub/sub carrying live front-desk updates between processes (None: in-process only)
+GUEST_EVENTS_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/1')
+
+# Overdue deadlines for front-desk actions; see guest_experience.models.DEFAULT_SLA_RULES.
+# After a change, run: manage.py snapshot_overdue_actions --refresh-deadlines
+# GUEST_SLA_RULES = {"IN_HOUSE_HOURS": 24, "COURTESY_GRACE_MINUTES": 0, "DEPARTURE_HOURS": 24}
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -0,0 +1,136 @@
+"""
+Travel agent analytics over whole months, from the arrival rollups.
+
+The monthly ``ArrivalRollup`` rows already count each agent's arrivals,
+known room nights, VIPs, cancellations and no-shows, kept current on every
+upload and edit (see ``rollups.py``). ``agent_analytics`` groups them by
+agent and month in one query covering the requested period and the one it
+is compared with, then ranks the top agents, builds their monthly trend and
+the period-over-period changes in Python, without reading arrival records.
+"""
+from django.db.models import Q, Sum
+
+from .models import ArrivalRollup
+from .rollups import MEASURES
+
+AGENT_TOP_DEFAULT = 10
+AGENT_TOP_MAX = 100
+AGENT_PERIOD_MONTHS = 12
+AGENT_SORT_METRICS = ("arrivals", "room_nights")
+# Compared with the months just before, or with the same months a year earlier
+AGENT_COMPARISONS = ("previous", "year")
+
+
+def add_months(month, count):
+    """The first of the month ``count`` months after ``month`` (before, if negative)."""
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+
+def month_range(first, end):
+    """Months from ``first`` up to ``end``, exclusive."""
+    months = []
+    while first < end:
+        months.append(first)
+        first = add_months(first, 1)
+    return months
+
+
+def compared_period(first, end, compare):
+    """First month and exclusive end of the period that ``first`` up to ``end`` is compared with."""
+    shift = 12 if compare == "year" else (end.year - first.year) * 12 + end.month - first.month
+    return add_months(first, -shift), add_months(end, -shift)
+
+
+def agent_months(first, end):
+    """
+    {(travel agent, month): measures} over the months from ``first`` up to
+    ``end`` (exclusive). ``stays`` counts the arrivals with a known length
+    of stay, the ones ``nights_total`` covers.
+    """
+    rows = ArrivalRollup.objects.filter(month__gte=first, month__lt=end).exclude(travel_agent_name="").order_by().values(
+        "travel_agent_name", "month"
+    ).annotate(
+        # Ahead of the sums, whose names shadow the columns they add up
+        stays=Sum("arrivals", filter=Q(stay_nights__isnull=False), default=0),
+        **{measure: Sum(measure) for measure in MEASURES},
+    )
+    return {(row.pop("travel_agent_name"), row.pop("month")): row for row in rows}
+
+
+def _totals(monthly, agent, months):
+    totals = dict.fromkeys([*MEASURES, "stays"], 0)
+    for month in months:
+        for measure, value in monthly.get((agent, month), {}).items():
+            totals[measure] += value
+    return totals
+
+
+def agent_metrics(totals):
+    """The API figures for one agent's summed measures."""
+    arrivals = totals["arrivals"]
+    return {
+        "arrivals": arrivals,
+        "room_nights": totals["nights_total"],
+        "average_los": round(totals["nights_total"] / totals["stays"], 2) if totals["stays"] else None,
+        "vip_share": round(totals["vip_arrivals"] / arrivals * 100, 1) if arrivals else None,
+        "cancellations": totals["cancelled"],
+        "no_shows": totals["no_shows"],
+    }
+
+
+def _change(current, previous):
+    """Percentage change, or None without a previous figure to compare with."""
+    if current is None or not previous:
+        return None
+    return round((current - previous) / previous * 100, 1)
+
+
+def agent_analytics(first, end, top=AGENT_TOP_DEFAULT, sort="arrivals", compare="previous"):
+    """
+    The ``top`` agents by ``sort`` over the months from ``first`` up to
+    ``end`` (exclusive), with their figures for the compared period, the
+    change between the two and their month-by-month trend.
+    """
+    months = month_range(first, end)
+    compared_first, compared_end = compared_period(first, end, compare)
+    compared_months = month_range(compared_first, compared_end)
+
+    monthly = agent_months(min(first, compared_first), max(end, compared_end))
+    agents = {agent for agent, month in monthly if first <= month < end}
+    current = {agent: agent_metrics(_totals(monthly, agent, months)) for agent in agents}
+    ranking = sorted(agents, key=lambda agent: (-current[agent][sort], agent))[:top]
+    total = sum(metrics[sort] for metrics in current.values())
+
+    rows = []
+    for agent in ranking:
+        previous = agent_metrics(_totals(monthly, agent, compared_months))
+        rows.append({
+            "travel_agent_name": agent,
+            **current[agent],
+            # Of all agents' arrivals or room nights in the period
+            "share": round(current[agent][sort] / total * 100, 1) if total else None,
+            "compared": previous,
+            "change": {metric: _change(current[agent][metric], previous[metric]) for metric in (
+                "arrivals", "room_nights", "average_los", "vip_share",
+            )},
+        })
+
+    return {
+        "period": {"start": first.isoformat()[:7], "end": add_months(end, -1).isoformat()[:7]},
+        "compared_period": {
+            "start": compared_first.isoformat()[:7], "end": add_months(compared_end, -1).isoformat()[:7],
+        },
+        "sort": sort,
+        "agents": rows,
+        "trend": {
+            "months": [month.isoformat()[:7] for month in months],
+            "agents": {
+                agent: {
+                    "arrivals": [monthly.get((agent, month), {}).get("arrivals", 0) for month in months],
+                    "room_nights": [monthly.get((agent, month), {}).get("nights_total", 0) for month in months],
+                }
+                for agent in ranking
+            },
+        },
+    }
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class GuestExperienceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'guest_experience'
+
+    def ready(self):
+        # Keep the arrival rollups in step with ArrivalRecord
+        from . import signals  # noqa: F401
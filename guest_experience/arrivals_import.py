@@ -0,0 +1,205 @@
+"""
+Parsing and validation of uploaded arrivals files.
+
+``parse_arrivals`` turns the sheet read by ``upload_arrivals`` into the
+field values of each arrival in one pass over whole columns: the header
+row is found with a single comparison over the sheet, dates are parsed
+per column with ``pd.to_datetime``, text is cleaned with the string
+accessors and every check is a boolean mask. Dates parse as they would
+one cell at a time, and a rejected row or dropped value is reported with
+its sheet row and column rather than skipped silently.
+"""
+import pandas as pd
+
+# Column names accepted for each field, case-insensitive, in order of preference
+ARRIVAL_COLUMNS = {
+    "property_name": ("property",),
+    "confirmation_number": ("confirmation number", "confirmation"),
+    "first_name": ("first name", "firstname", "first"),
+    "last_name": ("last name", "lastname", "last"),
+    "room": ("room number", "room"),
+    "phone": ("phone", "phone number", "tel"),
+    "email": ("email", "e-mail"),
+    "nationality": ("nationality",),
+    "country": ("country",),
+    "guest_name": ("guest name", "guest", "name"),
+    "eta": ("eta", "arrival time"),
+    "nights": ("nights", "length of stay"),
+    "status": ("status",),
+    "arrival_date": ("arrival date", "check in", "arrival"),
+    "departure_date": ("departure date", "check out", "checkout", "departure"),
+    "travel_agent_name": ("travel agent name", "agent", "travel agent"),
+    "vip_code": ("vip code", "vip"),
+    "rate": ("rate",),
+    "rate_code": ("rate code",),
+    "last_room_number": ("last room number", "last room"),
+    "preference": ("preference",),
+    "alert_code": ("alert code", "alert"),
+    "membership_type": ("membership type", "membership"),
+    "membership_number": ("membership number", "membership #"),
+}
+
+TEXT_FIELDS = (
+    "property_name", "confirmation_number", "first_name", "last_name", "room", "phone", "email", "nationality",
+    "country", "eta", "travel_agent_name", "vip_code", "rate_code", "last_room_number", "preference",
+    "alert_code", "membership_type", "membership_number",
+)
+
+HEADER_MARKER = "arrival date"
+HEADER_SCAN_ROWS = 50
+DEFAULT_STATUS = "Expected"
+# Problems listed in the upload message; the rest are only counted
+ERRORS_SHOWN = 10
+
+
+class ArrivalsFileError(ValueError):
+    """An arrivals file that cannot be imported at all."""
+
+
+def find_header_row(raw_df):
+    """Position of the first row with an 'Arrival Date' cell, or 0 when there is none."""
+    # Report titles take a few rows at most, so look there before the whole sheet
+    for rows in (raw_df.head(HEADER_SCAN_ROWS), raw_df):
+        cells = rows.astype(str).apply(lambda column: column.str.strip().str.lower())
+        matches = (cells == HEADER_MARKER).any(axis=1).to_numpy()
+        if matches.any():
+            return int(matches.argmax())
+    return 0
+
+
+def _text(series):
+    # As str(value or "").strip(): blank, zero and missing cells are empty
+    blank = series.isna() | series.isin(["", 0])
+    return series.astype(str).str.strip().where(~blank, "")
+
+
+def _rejected(raw, parsed):
+    """Cells of ``raw`` holding something other than whitespace that did not parse."""
+    missing = parsed.isna()
+    rejected = pd.Series(False, index=raw.index)
+    values = raw[missing]
+    rejected[missing] = values.notna() & (values.astype(str).str.strip() != "")
+    return rejected
+
+
+def _to_datetime(series):
+    return pd.to_datetime(series, errors="coerce", format="mixed")
+
+
+def _parse_date(value):
+    parsed = _to_datetime(pd.Series([value], dtype=object)).iloc[0]
+    return parsed.date() if pd.notna(parsed) else pd.NaT
+
+
+def _parse_dates(series):
+    """Dates of a column, NaT where a cell is missing or not a date."""
+    try:
+        return _to_datetime(series).dt.date
+    except (TypeError, ValueError):
+        # Offsets that differ between cells; each keeps its own, as when parsed one by one
+        return series.map(_parse_date)
+
+
+def _errors(errors, mask, column, values, message):
+    """Add an error for each row where ``mask`` holds."""
+    for row, value in values[mask].items():
+        errors.append({"row": row, "column": column, "value": value, "error": message})
+
+
+def parse_arrivals(raw_df):
+    """
+    Field values of the arrivals in a sheet read without a header, and the
+    problems found in it. Returns (records, errors): one dict of
+    ArrivalRecord field values per importable row, in sheet order, and one
+    {"row", "column", "value", "error"} dict per rejected row or dropped
+    value, rows numbered as in the sheet. Raises ArrivalsFileError without
+    an arrival date column.
+    """
+    header_row = find_header_row(raw_df)
+    header = [str(c).strip() for c in raw_df.iloc[header_row]]
+    df = raw_df.iloc[header_row + 1:].copy()
+    df.columns = [c.lower() for c in header]
+    df.index = df.index + 1
+    labels = dict(zip(df.columns, header))
+
+    columns = {}
+    for field, names in ARRIVAL_COLUMNS.items():
+        columns[field] = next((name for name in names if name in df.columns), None)
+    if not columns["arrival_date"]:
+        raise ArrivalsFileError("Excel file must contain an 'Arrival Date' column.")
+
+    def column(field):
+        # A repeated header yields its first column
+        values = df[columns[field]]
+        return values.iloc[:, 0] if isinstance(values, pd.DataFrame) else values
+
+    out = pd.DataFrame(index=df.index)
+    for field in TEXT_FIELDS:
+        out[field] = _text(column(field)) if columns[field] else ""
+    if columns["guest_name"]:
+        out["guest_name"] = _text(column("guest_name"))
+    else:
+        out["guest_name"] = (out["first_name"] + " " + out["last_name"]).str.strip()
+
+    # Rows missing both are blank or footer lines, skipped quietly
+    errors = []
+    raw_arrival = column("arrival_date")
+    out["arrival_date"] = _parse_dates(raw_arrival)
+    bad_arrival = _rejected(raw_arrival, out["arrival_date"])
+    has_arrival = out["arrival_date"].notna() | bad_arrival
+    has_confirmation = out["confirmation_number"] != ""
+    imported = has_arrival & ~bad_arrival & has_confirmation
+    arrival_label = labels[columns["arrival_date"]]
+    _errors(errors, bad_arrival, arrival_label, raw_arrival, "not a date; row skipped")
+    _errors(errors, ~has_arrival & has_confirmation, arrival_label, raw_arrival, "missing; row skipped")
+    _errors(errors, has_arrival & ~has_confirmation, labels.get(columns["confirmation_number"], "Confirmation Number"),
+            out["confirmation_number"], "missing; row skipped")
+
+    if columns["departure_date"]:
+        raw_departure = column("departure_date")
+        out["departure_date"] = _parse_dates(raw_departure)
+        _errors(errors, imported & _rejected(raw_departure, out["departure_date"]), labels[columns["departure_date"]],
+                raw_departure, "not a date; imported without a departure date")
+    else:
+        out["departure_date"] = pd.NaT
+
+    if columns["nights"]:
+        raw_nights = column("nights")
+        nights = pd.to_numeric(raw_nights, errors="coerce")
+        nights = nights.where(nights % 1 == 0)
+        out["nights"] = nights.astype("Int64")
+        _errors(errors, imported & _rejected(raw_nights, nights), labels[columns["nights"]], raw_nights,
+                "not a whole number; imported without nights")
+    else:
+        # From the stay dates; a departure before arrival leaves it unknown
+        days = (pd.to_datetime(out["departure_date"]) - pd.to_datetime(out["arrival_date"])).dt.days
+        out["nights"] = days.where(days >= 0).astype("Int64")
+
+    if columns["rate"]:
+        raw_rate = column("rate")
+        out["rate"] = pd.to_numeric(raw_rate, errors="coerce")
+        _errors(errors, imported & _rejected(raw_rate, out["rate"]), labels[columns["rate"]], raw_rate,
+                "not a number; imported without a rate")
+    else:
+        out["rate"] = None
+
+    out["status"] = _text(column("status")).replace("", DEFAULT_STATUS) if columns["status"] else DEFAULT_STATUS
+    errors.sort(key=lambda error: error["row"])
+
+    valid = out[imported]
+    # Column by column: converting the whole frame at once goes cell by cell
+    fields = list(valid.columns)
+    values = [valid[field].astype(object).where(valid[field].notna(), None).tolist() for field in fields]
+    records = [dict(zip(fields, row)) for row in zip(*values)]
+    return records, errors
+
+
+def describe_errors(errors, limit=ERRORS_SHOWN):
+    """One message listing the first ``limit`` problems of an upload."""
+    shown = []
+    for error in errors[:limit]:
+        value = error["value"]
+        value = f" ({value})" if pd.notna(value) and str(value).strip() else ""
+        shown.append(f"row {error['row']}, {error['column']}{value}: {error['error']}")
+    more = f" and {len(errors) - limit} more" if len(errors) > limit else ""
+    return f"{len(errors)} problems in the file: {'; '.join(shown)}{more}."
@@ -0,0 +1,190 @@
+"""
+Front-desk transitions applied to many arrivals at once.
+
+A group check-in used to be one request, one fetch and one save per room.
+``apply_bulk_action`` moves a whole list of arrivals in four statements
+whatever its size: a locking read of the rows that also tells each id's
+outcome, one bulk UPDATE of the rows that moved, one bulk insert of audit
+entries and the event publish. The derived courtesy call queue and SLA
+deadline columns are recomputed on each row by the same
+``refresh_courtesy_call`` and ``refresh_sla_deadlines`` that
+``ArrivalRecord.save`` calls, so the rows end up exactly as a save would
+leave them. Checking in a cancelled or no-show booking also moves its count
+in the arrival rollups, which the bulk UPDATE's skipped signals would
+otherwise have done.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper, Q
+
+from hotel_management.models import AuditLog
+
+from .dashboard import IN_HOUSE
+from .models import ArrivalRecord, sla_rules
+from .rollups import apply_status_changes
+
+BULK_ACTIONS = ("in_house", "departed", "room", "courtesy_done")
+BULK_ACTION_MAX_IDS = 500
+
+DEPARTED = Q(status__iexact="departed")
+
+# What each transition may start from, and why others are refused
+SOURCE_STATES = {
+    "in_house": (~IN_HOUSE & ~DEPARTED, "already in house or departed"),
+    "departed": (IN_HOUSE, "not in house"),
+    "room": (~DEPARTED, "already departed"),
+}
+
+# Written by refresh_courtesy_call and refresh_sla_deadlines
+DERIVED_FIELDS = (
+    "courtesy_call_status", "courtesy_call_due_at", "in_house_deadline", "courtesy_deadline", "departure_deadline",
+)
+
+
+class BulkActionError(ValueError):
+    """Invalid parameters for a bulk action."""
+
+
+def _courtesy_source(which):
+    # A call can be logged for an in-house guest once, and only if it was scheduled
+    return (
+        IN_HOUSE & Q(**{f"{which}_courtesy_due_at__isnull": False, f"{which}_courtesy_done_at__isnull": True}),
+        f"{which} courtesy call not outstanding",
+    )
+
+
+def _check_in(user, now):
+    second_due = now + timedelta(days=1)
+
+    def change(record):
+        record.status = "In-House"
+        record.in_house_since = now
+        record.in_house_by = user
+        record.first_courtesy_due_at = now + timedelta(minutes=20)
+        # Mirrors mark_in_house: a second call the next day for multi-night
+        # stays that are still in house by then
+        stays = record.nights and record.nights > 1 and (
+            not record.departure_date or second_due.date() <= record.departure_date
+        )
+        record.second_courtesy_due_at = second_due if stays else None
+
+    fields = ("status", "in_house_since", "in_house_by", "first_courtesy_due_at", "second_courtesy_due_at")
+    return change, fields, {}
+
+
+def _check_out(user, now, params):
+    method = str(params.get("departure_method") or "").strip()
+    if not method:
+        raise BulkActionError("departure_method is required")
+    notes = str(params.get("departure_notes") or "").strip()
+    message_sent = bool(params.get("message_sent_to_guest", False))
+
+    def change(record):
+        record.status = "Departed"
+        record.departed_at = now
+        record.departed_by = user
+        record.departure_method = method
+        record.departure_notes = notes
+        record.message_sent_to_guest = message_sent
+
+    fields = ("status", "departed_at", "departed_by", "departure_method", "departure_notes", "message_sent_to_guest")
+    return change, fields, {"departure_method": method}
+
+
+def _parse_rooms(ids, params):
+    """{id: new room} for a room move, every id included."""
+    rooms = params.get("rooms")
+    if not isinstance(rooms, dict) or not rooms:
+        raise BulkActionError("rooms must map each id to its new room")
+    try:
+        rooms = {int(pk): str(room or "").strip() for pk, room in rooms.items()}
+    except (TypeError, ValueError):
+        raise BulkActionError("rooms must map each id to its new room")
+    if set(rooms) != set(ids) or not all(rooms.values()):
+        raise BulkActionError("every id needs a room")
+    return rooms
+
+
+def _move_rooms(ids, params):
+    rooms = _parse_rooms(ids, params)
+
+    def change(record):
+        record.room = rooms[record.pk]
+
+    return change, ("room",), {}
+
+
+def _log_courtesy(user, now, which, params):
+    outcome = str(params.get("outcome") or "").strip()
+    notes = str(params.get("notes") or "").strip()
+
+    def change(record):
+        setattr(record, f"{which}_courtesy_done_at", now)
+        setattr(record, f"{which}_courtesy_by", user)
+        setattr(record, f"{which}_courtesy_outcome", outcome)
+        setattr(record, f"{which}_courtesy_notes", notes)
+
+    fields = tuple(f"{which}_courtesy_{field}" for field in ("done_at", "by", "outcome", "notes"))
+    return change, fields, {"which": which, "outcome": outcome}
+
+
+def apply_bulk_action(action, ids, user, params, now):
+    """
+    Apply ``action`` to the arrivals with these ids. Returns the ids that
+    moved and a result per requested id; raises BulkActionError for bad
+    parameters.
+    """
+    if action not in BULK_ACTIONS:
+        raise BulkActionError(f"action must be one of {', '.join(BULK_ACTIONS)}")
+
+    if action == "in_house":
+        change, fields, details = _check_in(user, now)
+    elif action == "departed":
+        change, fields, details = _check_out(user, now, params)
+    elif action == "room":
+        change, fields, details = _move_rooms(ids, params)
+    else:
+        which = str(params.get("which") or "").strip().lower()
+        if which not in {"first", "second"}:
+            raise BulkActionError('which must be "first" or "second"')
+        change, fields, details = _log_courtesy(user, now, which, params)
+    source, refusal = _courtesy_source(which) if action == "courtesy_done" else SOURCE_STATES[action]
+    rules = sla_rules()
+
+    with transaction.atomic():
+        current = ArrivalRecord.objects.filter(pk__in=ids).select_for_update().annotate(
+            allowed=ExpressionWrapper(source, output_field=BooleanField())
+        ).order_by().in_bulk()
+        moved = [pk for pk in ids if pk in current and current[pk].allowed]
+        if moved:
+            previous = {pk: (current[pk].status, current[pk].room) for pk in moved}
+            records = [current[pk] for pk in moved]
+            for record in records:
+                change(record)
+                record.updated_by = user
+                record.updated_at = now
+                record.refresh_courtesy_call()
+                record.refresh_sla_deadlines(rules)
+            ArrivalRecord.objects.bulk_update(records, [*fields, "updated_by", "updated_at", *DERIVED_FIELDS])
+            if "status" in fields:
+                apply_status_changes({pk: status for pk, (status, _) in previous.items()}, records[0].status)
+
+            entries = []
+            for pk in moved:
+                changes = {"transition": action, **details, "from_status": previous[pk][0]}
+                if action == "room":
+                    changes.update(from_room=previous[pk][1], room=current[pk].room)
+                entries.append(AuditLog(entity_type="arrival", entity_id=pk, action="update",
+                                        changes=changes, performed_by=user))
+            AuditLog.objects.bulk_create(entries)
+
+    results = []
+    for pk in ids:
+        if pk not in current:
+            results.append({"id": pk, "ok": False, "error": "not found"})
+        elif not current[pk].allowed:
+            results.append({"id": pk, "ok": False, "error": refusal, "status": current[pk].status})
+        else:
+            results.append({"id": pk, "ok": True})
+    return moved, results
@@ -0,0 +1,66 @@
+"""
+Cached counters and charts for the guest experience dashboard.
+
+The front desk polls ``dashboard_api`` constantly during check-in peaks.
+Every counter comes out of one conditional aggregate, and the whole
+payload for a set of filters is cached for a few seconds under the day's
+version token. The views that change arrivals (upload, edit, delete,
+in-house, courtesy call and departure marks) replace that token, so an
+edit shows on the next poll while repeated polls cost one build per cache
+window.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+
+from .models import COURTESY_PENDING
+
+GUEST_DASHBOARD_CACHE_TIMEOUT = 10
+GUEST_DASHBOARD_VERSION_KEY = 'guest_dashboard_version'
+
+IN_HOUSE = Q(status__iexact='In-House') | Q(status__iexact='in house')
+
+
+def _version_key(day):
+    return f'{GUEST_DASHBOARD_VERSION_KEY}:{day.isoformat()}'
+
+
+def dashboard_version(day=None):
+    """Token that changes whenever arrivals change on ``day`` (default today)."""
+    key = _version_key(day or timezone.localdate())
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(key, version, 60 * 60 * 48)
+        version = cache.get(key, version)
+    return version
+
+
+def bump_dashboard_version():
+    cache.set(_version_key(timezone.localdate()), uuid.uuid4().hex, 60 * 60 * 48)
+
+
+def dashboard_cache_key(*params):
+    """Cache key for a dashboard payload built from ``params`` at today's version."""
+    digest = hashlib.md5(repr(params).encode()).hexdigest()
+    return f'guest_dashboard:{dashboard_version()}:{digest}'
+
+
+def dashboard_counters(qs, today, now):
+    """Every dashboard counter for the arrivals in ``qs``, in one query."""
+    counters = qs.aggregate(
+        total_arrivals=Count('id'),
+        arrivals_today=Count('id', filter=Q(arrival_date=today)),
+        expected=Count('id', filter=Q(status__iexact='Expected')),
+        in_house=Count('id', filter=IN_HOUSE),
+        departed=Count('id', filter=Q(status__iexact='Departed')),
+        vip=Count('id', filter=~Q(vip_code='')),
+        courtesy_pending=Count('id', filter=Q(courtesy_call_status=COURTESY_PENDING)),
+        courtesy_overdue=Count('id', filter=Q(courtesy_call_status=COURTESY_PENDING, courtesy_call_due_at__lte=now)),
+        avg_nights=Avg('nights'),
+    )
+    counters['avg_nights'] = round(counters['avg_nights'], 1) if counters['avg_nights'] else 0
+    return counters
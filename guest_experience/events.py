@@ -0,0 +1,254 @@
+"""
+Live arrival updates for the front-desk screens, as server-sent events.
+
+The views that change arrivals (upload, mark in-house, mark departed, room
+moves and courtesy calls) publish the changed rows once their transaction
+commits. Every open arrivals, in-house, courtesy call and departures screen
+holds one ``arrival_events`` stream and patches its table from the rows it
+receives, instead of reloading its whole list, so database work per change
+does not grow with the number of terminals.
+
+With ``GUEST_EVENTS_REDIS_URL`` set, changes go through Redis pub/sub and
+each process runs one listener thread that fans them out to its own
+streams; without it the broker is in-process, which is enough for a single
+ASGI worker. Streams hold their connection open, so they need an ASGI
+server (daphne); under WSGI the endpoint refuses them and the screens keep
+loading on demand.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArrivalRecord
+
+logger = logging.getLogger(__name__)
+
+GUEST_EVENTS_CHANNEL = 'guest_experience:arrival_events'
+
+# Seconds between keep-alive comments, so proxies do not close idle streams
+EVENT_STREAM_KEEPALIVE = 15
+# Milliseconds browsers wait before reconnecting a dropped stream
+EVENT_STREAM_RETRY = 3000
+# Rows per message for large uploads
+EVENT_BATCH_SIZE = 200
+# Messages a stream may fall behind before it is told to reload instead
+SUBSCRIBER_QUEUE_SIZE = 100
+
+RESYNC = object()
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _username(user):
+    return user.username if user else None
+
+
+def arrival_row(a, now):
+    """
+    One arrival with every field the arrivals, in-house, departures and
+    courtesy call APIs return, so any screen can render it.
+    """
+    return {
+        "id": a.id,
+        "room": a.room,
+        "guest_name": a.guest_name,
+        "eta": a.eta,
+        "nights": a.nights,
+        "status": a.status,
+        "property_name": a.property_name,
+        "confirmation_number": a.confirmation_number,
+        "first_name": a.first_name,
+        "last_name": a.last_name,
+        "phone": a.phone,
+        "email": a.email,
+        "nationality": a.nationality,
+        "country": a.country,
+        "arrival_date": _iso(a.arrival_date),
+        "departure_date": _iso(a.departure_date),
+        "travel_agent_name": a.travel_agent_name,
+        "vip_code": a.vip_code,
+        "rate": float(a.rate) if a.rate else None,
+        "rate_code": a.rate_code,
+        "last_room_number": a.last_room_number,
+        "preference": a.preference,
+        "alert_code": a.alert_code,
+        "membership_type": a.membership_type,
+        "membership_number": a.membership_number,
+        "in_house_since": _iso(a.in_house_since),
+        "in_house_by": _username(a.in_house_by),
+        "courtesy_call_due_at": _iso(a.courtesy_call_due_at),
+        "first_courtesy_due_at": _iso(a.first_courtesy_due_at),
+        "first_courtesy_done_at": _iso(a.first_courtesy_done_at),
+        "first_courtesy_by": _username(a.first_courtesy_by),
+        "first_courtesy_status": a.courtesy_status("first", now),
+        "first_courtesy_outcome": a.first_courtesy_outcome,
+        "first_courtesy_notes": a.first_courtesy_notes,
+        "second_courtesy_due_at": _iso(a.second_courtesy_due_at),
+        "second_courtesy_done_at": _iso(a.second_courtesy_done_at),
+        "second_courtesy_by": _username(a.second_courtesy_by),
+        "second_courtesy_status": a.courtesy_status("second", now),
+        "second_courtesy_outcome": a.second_courtesy_outcome,
+        "second_courtesy_notes": a.second_courtesy_notes,
+        "departed_at": _iso(a.departed_at),
+        "departed_on": _iso(timezone.localdate(a.departed_at)) if a.departed_at else None,
+        "checkout_time": a.departed_at.strftime("%H:%M") if a.departed_at else "",
+        "departed_by": _username(a.departed_by),
+        "departure_method": a.departure_method or "",
+        "departure_notes": a.departure_notes or "",
+        "message_sent_to_guest": a.message_sent_to_guest,
+    }
+
+
+class _Hub:
+    """Streams subscribed in this process, each an asyncio queue on its own event loop."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues = {}
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._queues[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._queues.pop(queue, None)
+
+    def __len__(self):
+        return len(self._queues)
+
+    def dispatch(self, message):
+        """Hand a message to every stream; callable from any thread."""
+        with self._lock:
+            subscribers = list(self._queues.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, message)
+            except RuntimeError:
+                # The stream's loop has closed
+                self.unsubscribe(queue)
+
+
+def _offer(queue, message):
+    if queue.full():
+        # A stream this far behind reloads its list once instead
+        while not queue.empty():
+            queue.get_nowait()
+        message = RESYNC
+    queue.put_nowait(message)
+
+
+hub = _Hub()
+
+_redis = {'client': None, 'listener': None}
+_redis_lock = threading.Lock()
+
+
+def _redis_url():
+    return getattr(settings, 'GUEST_EVENTS_REDIS_URL', None)
+
+
+def _redis_client():
+    with _redis_lock:
+        if _redis['client'] is None:
+            _redis['client'] = redis.Redis.from_url(_redis_url())
+        return _redis['client']
+
+
+def _listen():
+    """Forward the Redis channel to this process's streams, reconnecting on errors."""
+    reconnecting = False
+    while True:
+        try:
+            pubsub = _redis_client().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(GUEST_EVENTS_CHANNEL)
+            if reconnecting:
+                # Changes published while disconnected were missed
+                hub.dispatch(RESYNC)
+            for message in pubsub.listen():
+                hub.dispatch(message['data'].decode())
+        except Exception:
+            logger.exception("Guest event listener lost its Redis connection")
+            reconnecting = True
+            time.sleep(EVENT_STREAM_RETRY / 1000)
+
+
+def _ensure_listener():
+    with _redis_lock:
+        if _redis['listener'] is None:
+            _redis['listener'] = threading.Thread(target=_listen, name='guest-events', daemon=True)
+            _redis['listener'].start()
+
+
+def _send(message):
+    if _redis_url():
+        try:
+            _redis_client().publish(GUEST_EVENTS_CHANNEL, message)
+        except Exception:
+            # Screens catch up on their next reload; the change itself is saved
+            logger.exception("Could not publish guest event")
+    else:
+        hub.dispatch(message)
+
+
+def publish_arrivals(action, ids):
+    """
+    Publish the current state of the arrivals with these ids once the
+    transaction commits. Costs one query per batch, however many screens
+    are listening.
+    """
+    ids = list(ids)
+    if not ids:
+        return
+
+    def send():
+        now = timezone.now()
+        for start in range(0, len(ids), EVENT_BATCH_SIZE):
+            records = ArrivalRecord.objects.filter(pk__in=ids[start:start + EVENT_BATCH_SIZE]).select_related(
+                "in_house_by", "first_courtesy_by", "second_courtesy_by", "departed_by"
+            )
+            rows = [arrival_row(a, now) for a in records]
+            _send(json.dumps({"action": action, "rows": rows}, cls=DjangoJSONEncoder))
+
+    transaction.on_commit(send)
+
+
+def publish_removed(confirmation_numbers):
+    """Publish that the arrivals with these confirmation numbers are gone, once the transaction commits."""
+    confirmation_numbers = list(confirmation_numbers)
+    if confirmation_numbers:
+        message = json.dumps({"action": "deleted", "rows": [], "removed": confirmation_numbers})
+        transaction.on_commit(lambda: _send(message))
+
+
+async def event_stream():
+    """Server-sent events for one screen: changed rows, resync requests and keep-alives."""
+    if _redis_url():
+        _ensure_listener()
+    queue = hub.subscribe()
+    try:
+        yield f"retry: {EVENT_STREAM_RETRY}\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), EVENT_STREAM_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if message is RESYNC:
+                yield "event: resync\ndata: {}\n\n"
+            else:
+                yield f"event: arrivals\ndata: {message}\n\n"
+    finally:
+        hub.unsubscribe(queue)
@@ -0,0 +1,62 @@
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from guest_experience.arrivals_import import parse_arrivals
+
+HEADER = [
+    "Property", "Confirmation Number", "First Name", "Last Name", "Room", "Phone", "Email", "Nationality", "Country",
+    "ETA", "Nights", "Status", "Arrival Date", "Departure Date", "Travel Agent Name", "VIP Code", "Rate",
+    "Rate Code", "Preference",
+]
+
+
+def sample_sheet(rows, seed=0):
+    """An arrivals report as read by upload_arrivals: title lines, header, rows, a few bad cells."""
+    rnd = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    sheet = [["Arrivals Report"] + [None] * (len(HEADER) - 1), [None] * len(HEADER), HEADER]
+    for i in range(rows):
+        arrival = start + timedelta(days=rnd.randint(0, 364))
+        nights = rnd.randint(1, 14)
+        arrival_value = rnd.choice([arrival, arrival.strftime("%Y-%m-%d"), "TBC"]) if rnd.random() < 0.02 else arrival
+        sheet.append([
+            rnd.choice(["Downtown", "Marina"]), f"CNF{i:07d}", f"First{i}", f"Last{i}", 100 + i % 900,
+            f"+9715{i:08d}" if rnd.random() < 0.9 else None, f"guest{i}@example.com", "AE", "United Arab Emirates",
+            "14:00", nights if rnd.random() < 0.99 else "n/a", rnd.choice(["Reserved", "Due In", None]),
+            arrival_value, arrival + timedelta(days=nights), f"Agent {i % 60}", rnd.choice(["", "VIP1", None]),
+            round(rnd.uniform(80, 900), 2), "BAR", None,
+        ])
+    return pd.DataFrame(sheet, dtype=object)
+
+
+class Command(BaseCommand):
+    help = ('Time the parse and validation stage of arrivals uploads on a generated arrivals report, or on an '
+            'Excel file; nothing is written')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Rows of the generated report (default 20000)')
+        parser.add_argument('--file', help='Parse this Excel file instead of a generated report')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs (default 5)')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['repeat'] < 1:
+            raise CommandError('--rows and --repeat must be at least 1.')
+        if options['file']:
+            raw_df = pd.read_excel(options['file'], header=None)
+        else:
+            raw_df = sample_sheet(options['rows'])
+
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            records, errors = parse_arrivals(raw_df)
+            timings.append(time.perf_counter() - started)
+        self.stdout.write(f'{len(raw_df)} sheet rows: {len(records)} arrivals, {len(errors)} problems')
+        self.stdout.write(self.style.SUCCESS(
+            f'Parse and validation: median {statistics.median(timings):.3f}s, best {min(timings):.3f}s '
+            f'over {len(timings)} runs'
+        ))
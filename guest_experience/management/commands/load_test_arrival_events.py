@@ -0,0 +1,101 @@
+import asyncio
+import statistics
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from guest_experience.events import event_stream, publish_arrivals
+from guest_experience.models import ArrivalRecord
+from guest_experience.views import in_house_api
+
+
+class Command(BaseCommand):
+    help = ('Measure how live front-desk updates scale with open terminals: database queries and delivery '
+            'times of the arrival event stream, against every terminal re-polling the in-house list. '
+            'Existing arrivals are re-published; nothing is written.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--terminals', type=int, nargs='+', default=[1, 10, 50, 200],
+                            help='Open terminal counts to measure (default 1 10 50 200)')
+        parser.add_argument('--events', type=int, default=20, help='Changes published per run (default 20)')
+
+    def handle(self, *args, **options):
+        if options['events'] < 1 or min(options['terminals']) < 1:
+            raise CommandError('--events and --terminals must be at least 1.')
+        ids = list(ArrivalRecord.objects.order_by('-updated_at').values_list('pk', flat=True)[:options['events']])
+        if not ids:
+            raise CommandError('There are no arrivals to publish.')
+        user = User.objects.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError('A superuser is needed to measure the polling baseline.')
+
+        request = RequestFactory().get('/guest-experience/api/in-house/')
+        request.user = user
+        with CaptureQueriesContext(connection) as poll:
+            in_house_api(request)
+        self.stdout.write(f'Polling baseline: {len(poll)} queries per in-house list load')
+
+        self.stdout.write(f'{"terminals":>9} {"delivered":>11} {"db queries":>10} {"p50 ms":>7} {"p95 ms":>7} '
+                          f'{"polling queries":>15}')
+        for terminals in options['terminals']:
+            delivered, queries, latencies = asyncio.run(self._run(terminals, ids))
+            p50 = statistics.median(latencies) if latencies else 0
+            p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else p50
+            self.stdout.write(
+                f'{terminals:>9} {f"{delivered}/{terminals * len(ids)}":>11} {queries:>10} {p50:>7.1f} {p95:>7.1f} '
+                f'{terminals * len(ids) * len(poll):>15}'
+            )
+
+    async def _run(self, terminals, ids):
+        published = []
+        latencies = []
+        delivered = 0
+        ready = asyncio.Event()
+        opened = 0
+
+        async def terminal():
+            nonlocal opened, delivered
+            stream = event_stream()
+            received = 0
+            try:
+                await anext(stream)
+                opened += 1
+                if opened == terminals:
+                    ready.set()
+                while received < len(ids):
+                    chunk = await anext(stream)
+                    if chunk.startswith('event: arrivals'):
+                        latencies.append((time.perf_counter() - published[received]) * 1000)
+                        received += 1
+                        delivered += 1
+            finally:
+                await stream.aclose()
+
+        def publish():
+            # Runs in its own thread, as a view would, with its own connection
+            with CaptureQueriesContext(connection) as captured:
+                for pk in ids:
+                    published.append(time.perf_counter())
+                    publish_arrivals('load_test', [pk])
+                    time.sleep(0.01)
+            connection.close()
+            return len(captured)
+
+        tasks = [asyncio.create_task(terminal()) for _ in range(terminals)]
+        await ready.wait()
+        # Leave a broker listener time to subscribe
+        await asyncio.sleep(0.5)
+        result = {}
+        thread = threading.Thread(target=lambda: result.update(queries=publish()))
+        thread.start()
+        # Events lost on the way leave terminals waiting; report what arrived
+        _, pending = await asyncio.wait(tasks, timeout=10 + len(ids))
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        thread.join()
+        return delivered, result['queries'], latencies
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+from guest_experience.rollups import rebuild_arrival_rollups, refresh_record_report_fields
+
+
+class Command(BaseCommand):
+    help = ('Recount the monthly arrival rollups behind the nationality, length of stay and contact '
+            'completeness reports from the arrival records')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--refresh-records', action='store_true',
+                            help="Recompute each record's stay nights, nationality code and contact "
+                                 'completeness first, e.g. after rows were written with raw SQL')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['refresh_records']:
+            changed = refresh_record_report_fields()
+            self.stdout.write(f'{changed} arrival records had stale report fields')
+        rows = rebuild_arrival_rollups()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} arrival rollup rows in {elapsed:.1f}s'))
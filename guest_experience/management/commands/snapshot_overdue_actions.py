@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from guest_experience.sla import SNAPSHOT_KEEP_DAYS, prune_snapshots, refresh_deadlines, snapshot_overdue
+
+
+class Command(BaseCommand):
+    help = ('Record the overdue front-desk actions per property for the overdue actions trend chart; '
+            'run periodically, e.g. every 15 minutes from cron')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=int, default=SNAPSHOT_KEEP_DAYS,
+                            help=f'Delete snapshots older than this many days (default {SNAPSHOT_KEEP_DAYS})')
+        parser.add_argument('--refresh-deadlines', action='store_true',
+                            help='Recompute every arrival\'s deadlines first, e.g. after changing GUEST_SLA_RULES')
+
+    def handle(self, *args, **options):
+        if options['refresh_deadlines']:
+            changed = refresh_deadlines()
+            self.stdout.write(f'{changed} arrival records had stale deadlines')
+        now = timezone.now()
+        snapshots = snapshot_overdue(now)
+        pruned = prune_snapshots(now, options['keep_days'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Recorded overdue actions for {len(snapshots)} properties, pruned {pruned} old snapshots'
+        ))
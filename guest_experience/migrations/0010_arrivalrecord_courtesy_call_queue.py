@@ -0,0 +1,50 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:00
+
+from django.db import migrations, models
+
+
+def fill_courtesy_call_queue(apps, schema_editor):
+    # Same rules as ArrivalRecord.refresh_courtesy_call
+    ArrivalRecord = apps.get_model('guest_experience', 'ArrivalRecord')
+
+    records = []
+    for record in ArrivalRecord.objects.exclude(first_courtesy_due_at__isnull=True, second_courtesy_due_at__isnull=True).iterator():
+        calls = [
+            (record.first_courtesy_due_at, record.first_courtesy_done_at),
+            (record.second_courtesy_due_at, record.second_courtesy_done_at),
+        ]
+        outstanding = [due for due, done in calls if due and not done]
+        if outstanding and (record.status or '').lower() in ('in-house', 'in house'):
+            record.courtesy_call_status = 'pending'
+            record.courtesy_call_due_at = min(outstanding)
+        elif not outstanding:
+            record.courtesy_call_status = 'done'
+        else:
+            continue
+        records.append(record)
+    ArrivalRecord.objects.bulk_update(records, ['courtesy_call_status', 'courtesy_call_due_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guest_experience', '0009_arrivalrecord_alert_code_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='arrivalrecord',
+            name='courtesy_call_status',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='arrivalrecord',
+            name='courtesy_call_due_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='arrivalrecord',
+            index=models.Index(condition=models.Q(('courtesy_call_status', 'pending')), fields=['courtesy_call_due_at'], name='arrival_courtesy_due_idx'),
+        ),
+        migrations.RunPython(fill_courtesy_call_queue, migrations.RunPython.noop),
+    ]
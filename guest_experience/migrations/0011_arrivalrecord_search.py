@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.contrib.postgres.search
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guest_experience', '0010_arrivalrecord_courtesy_call_queue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.AddField(
+            model_name='arrivalrecord',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('guest_name', 'confirmation_number', 'room', config='simple', weight='A'), '||', django.contrib.postgres.search.SearchVector('travel_agent_name', 'nationality', 'country', config='simple', weight='B'), django.contrib.postgres.search.SearchConfig('simple')), '||', django.contrib.postgres.search.SearchVector('phone', 'email', 'departure_method', config='simple', weight='C'), django.contrib.postgres.search.SearchConfig('simple')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='arrivalrecord',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='arrival_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='arrivalrecord',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('guest_name', models.TextField())), name='gin_trgm_ops'), name='arrival_guest_name_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='arrivalrecord',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('room', models.TextField())), name='gin_trgm_ops'), name='arrival_room_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='arrivalrecord',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('confirmation_number', models.TextField())), name='gin_trgm_ops'), name='arrival_confirmation_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:00
+
+from django.db import migrations, models
+from django.db.models import Case, Count, ExpressionWrapper, F, Q, Sum, Value, When
+from django.db.models.functions import TruncMonth
+
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+
+
+def fill_report_fields(apps, schema_editor):
+    # Same rules as ArrivalRecord.refresh_report_fields, in one UPDATE rather
+    # than a save per record
+    ArrivalRecord = apps.get_model('guest_experience', 'ArrivalRecord')
+
+    codes = [
+        When(nationality=nationality, then=Value(' '.join(nationality.split()).upper()[:100]))
+        for nationality in ArrivalRecord.objects.order_by().values_list('nationality', flat=True).distinct()
+    ]
+    ArrivalRecord.objects.update(
+        stay_nights=F('nights'),
+        nationality_code=Case(*codes, default=Value('')),
+        is_contact_complete=ExpressionWrapper(
+            ~Q(phone='') & Q(email__regex=EMAIL_PATTERN), output_field=models.BooleanField()
+        ),
+    )
+
+    # Uploads and edits derive nights from the dates, so few records lack them
+    records = []
+    for record in ArrivalRecord.objects.filter(
+        nights__isnull=True, arrival_date__isnull=False, departure_date__isnull=False
+    ).only('arrival_date', 'departure_date').iterator():
+        days = (record.departure_date - record.arrival_date).days
+        if days >= 0:
+            record.stay_nights = days
+            records.append(record)
+    ArrivalRecord.objects.bulk_update(records, ['stay_nights'], batch_size=500)
+
+
+def build_rollups(apps, schema_editor):
+    # Same grouping as rollups.rebuild_arrival_rollups
+    ArrivalRecord = apps.get_model('guest_experience', 'ArrivalRecord')
+    ArrivalRollup = apps.get_model('guest_experience', 'ArrivalRollup')
+
+    missing_phone, missing_email = Q(phone=''), Q(email='')
+    grouped = ArrivalRecord.objects.annotate(month=TruncMonth('arrival_date')).order_by().values(
+        'month', 'property_name', 'nationality_code', 'country', 'travel_agent_name',
+        'stay_nights', 'is_contact_complete',
+    ).annotate(
+        arrivals=Count('id'),
+        nights_total=Sum('stay_nights', default=0),
+        missing_phone=Count('id', filter=missing_phone),
+        missing_email=Count('id', filter=missing_email),
+        missing_both=Count('id', filter=missing_phone & missing_email),
+        invalid_email=Count('id', filter=~missing_email & ~Q(email__regex=EMAIL_PATTERN)),
+    )
+    ArrivalRollup.objects.bulk_create((ArrivalRollup(**row) for row in grouped.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guest_experience', '0011_arrivalrecord_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArrivalRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(blank=True, null=True)),
+                ('property_name', models.CharField(blank=True, max_length=255)),
+                ('nationality_code', models.CharField(blank=True, max_length=100)),
+                ('country', models.CharField(blank=True, max_length=100)),
+                ('travel_agent_name', models.CharField(blank=True, max_length=255)),
+                ('stay_nights', models.IntegerField(blank=True, null=True)),
+                ('is_contact_complete', models.BooleanField(default=False)),
+                ('arrivals', models.IntegerField(default=0)),
+                ('nights_total', models.IntegerField(default=0)),
+                ('missing_phone', models.IntegerField(default=0)),
+                ('missing_email', models.IntegerField(default=0)),
+                ('missing_both', models.IntegerField(default=0)),
+                ('invalid_email', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='arrivalrecord',
+            name='is_contact_complete',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='arrivalrecord',
+            name='nationality_code',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='arrivalrecord',
+            name='stay_nights',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='arrivalrecord',
+            index=models.Index(fields=['arrival_date'], name='arrival_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='arrivalrollup',
+            constraint=models.UniqueConstraint(fields=('month', 'property_name', 'nationality_code', 'country', 'travel_agent_name', 'stay_nights', 'is_contact_complete'), name='arrival_rollup_unique', nulls_distinct=False),
+        ),
+        migrations.RunPython(fill_report_fields, migrations.RunPython.noop),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:00
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+CANCELLED_STATUSES = ('cancelled', 'canceled', 'cxl')
+NO_SHOW_STATUSES = ('no show', 'no-show', 'noshow')
+
+
+def recount_rollups(apps, schema_editor):
+    # Same grouping as rollups.rebuild_arrival_rollups, now with the VIP,
+    # cancellation and no-show counts
+    ArrivalRecord = apps.get_model('guest_experience', 'ArrivalRecord')
+    ArrivalRollup = apps.get_model('guest_experience', 'ArrivalRollup')
+
+    def status_in(statuses):
+        return Q(*[Q(status__iexact=status) for status in statuses], _connector=Q.OR)
+
+    missing_phone, missing_email = Q(phone=''), Q(email='')
+    grouped = ArrivalRecord.objects.annotate(month=TruncMonth('arrival_date')).order_by().values(
+        'month', 'property_name', 'nationality_code', 'country', 'travel_agent_name',
+        'stay_nights', 'is_contact_complete',
+    ).annotate(
+        arrivals=Count('id'),
+        nights_total=Sum('stay_nights', default=0),
+        missing_phone=Count('id', filter=missing_phone),
+        missing_email=Count('id', filter=missing_email),
+        missing_both=Count('id', filter=missing_phone & missing_email),
+        invalid_email=Count('id', filter=~missing_email & ~Q(email__regex=EMAIL_PATTERN)),
+        vip_arrivals=Count('id', filter=~Q(vip_code='')),
+        cancelled=Count('id', filter=status_in(CANCELLED_STATUSES)),
+        no_shows=Count('id', filter=status_in(NO_SHOW_STATUSES)),
+    )
+    ArrivalRollup.objects.all().delete()
+    ArrivalRollup.objects.bulk_create((ArrivalRollup(**row) for row in grouped.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guest_experience', '0012_arrivalrecord_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='arrivalrollup',
+            name='cancelled',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='arrivalrollup',
+            name='no_shows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='arrivalrollup',
+            name='vip_arrivals',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(recount_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:00
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+IN_HOUSE_STATUSES = ('in-house', 'in house')
+CLOSED_STATUSES = ('departed', 'cancelled', 'canceled', 'cxl', 'no show', 'no-show', 'noshow')
+
+
+def backfill_deadlines(apps, schema_editor):
+    # Same rules as ArrivalRecord.refresh_sla_deadlines
+    ArrivalRecord = apps.get_model('guest_experience', 'ArrivalRecord')
+    rules = {
+        'IN_HOUSE_HOURS': 24, 'COURTESY_GRACE_MINUTES': 0, 'DEPARTURE_HOURS': 24,
+        **getattr(settings, 'GUEST_SLA_RULES', {}),
+    }
+
+    def day_deadline(day, hours):
+        return timezone.make_aware(datetime.combine(day, time.min)) + timedelta(hours=hours)
+
+    fields = ['in_house_deadline', 'courtesy_deadline', 'departure_deadline']
+    changed = []
+    for record in ArrivalRecord.objects.only(
+        'status', 'arrival_date', 'departure_date', 'first_courtesy_due_at', 'first_courtesy_done_at',
+        'second_courtesy_due_at', 'second_courtesy_done_at',
+    ).iterator(chunk_size=1000):
+        status = (record.status or '').lower()
+        in_house = status in IN_HOUSE_STATUSES
+        if record.arrival_date and not in_house and status not in CLOSED_STATUSES:
+            record.in_house_deadline = day_deadline(record.arrival_date, rules['IN_HOUSE_HOURS'])
+        outstanding = [
+            due for due, done in (
+                (record.first_courtesy_due_at, record.first_courtesy_done_at),
+                (record.second_courtesy_due_at, record.second_courtesy_done_at),
+            ) if due and not done
+        ]
+        if outstanding and status != 'departed':
+            record.courtesy_deadline = min(outstanding) + timedelta(minutes=rules['COURTESY_GRACE_MINUTES'])
+        if record.departure_date and in_house:
+            record.departure_deadline = day_deadline(record.departure_date, rules['DEPARTURE_HOURS'])
+        if any(getattr(record, field) for field in fields):
+            changed.append(record)
+    ArrivalRecord.objects.bulk_update(changed, fields, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guest_experience', '0013_arrivalrollup_agent_measures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OverdueSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(db_index=True)),
+                ('property_name', models.CharField(blank=True, max_length=255)),
+                ('in_house', models.IntegerField(default=0)),
+                ('first_courtesy', models.IntegerField(default=0)),
+                ('second_courtesy', models.IntegerField(default=0)),
+                ('departures', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['taken_at', 'property_name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='arrivalrecord',
+            name='courtesy_deadline',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='arrivalrecord',
+            name='departure_deadline',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='arrivalrecord',
+            name='in_house_deadline',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='arrivalrecord',
+            index=models.Index(condition=models.Q(('in_house_deadline__isnull', False)), fields=['in_house_deadline'], name='arrival_in_house_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='arrivalrecord',
+            index=models.Index(condition=models.Q(('courtesy_deadline__isnull', False)), fields=['courtesy_deadline'], name='arrival_courtesy_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='arrivalrecord',
+            index=models.Index(condition=models.Q(('departure_deadline__isnull', False)), fields=['departure_deadline'], name='arrival_departure_deadline_idx'),
+        ),
+        migrations.RunPython(backfill_deadlines, migrations.RunPython.noop),
+    ]
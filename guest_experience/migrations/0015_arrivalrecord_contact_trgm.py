@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:00
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guest_experience', '0014_arrivalrecord_sla_deadlines'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='arrivalrecord',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('phone', models.TextField())), name='gin_trgm_ops'), name='arrival_phone_trgm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='arrivalrecord',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper(django.db.models.functions.comparison.Cast('email', models.TextField())), name='gin_trgm_ops'), name='arrival_email_trgm_idx'),
+        ),
+    ]
@@ -1,5 +1,65 @@
+import re
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+from django.db.models.functions import Cast, Upper
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+
+IN_HOUSE_STATUSES = ("in-house", "in house")
+CANCELLED_STATUSES = ("cancelled", "canceled", "cxl")
+NO_SHOW_STATUSES = ("no show", "no-show", "noshow")
+
+# Defaults for settings.GUEST_SLA_RULES, the deadlines behind the overdue actions report
+DEFAULT_SLA_RULES = {
+    # Hours from the start of the arrival day until a guest not yet in house is overdue
+    "IN_HOUSE_HOURS": 24,
+    # Minutes a courtesy call may run past its due time
+    "COURTESY_GRACE_MINUTES": 0,
+    # Hours from the start of the departure day until an in-house guest not yet checked out is overdue
+    "DEPARTURE_HOURS": 24,
+}
+
+COURTESY_PENDING = "pending"
+COURTESY_DONE = "done"
+
+# Basic shape check used by the contact completeness report
+EMAIL_PATTERN = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
+EMAIL_RE = re.compile(EMAIL_PATTERN)
+
+
+def sla_rules():
+    """The SLA rules in force: the defaults, overridden by settings.GUEST_SLA_RULES."""
+    return {**DEFAULT_SLA_RULES, **getattr(settings, "GUEST_SLA_RULES", {})}
+
+
+def day_deadline(day, hours):
+    """``hours`` after the start of ``day``, local time."""
+    return timezone.make_aware(datetime.combine(day, time.min)) + timedelta(hours=hours)
+
+
+def normalize_nationality(value):
+    """Nationality as reported on: trimmed, single-spaced and upper case."""
+    return " ".join((value or "").split()).upper()[:100]
+
+
+# The "simple" configuration keeps names, rooms and confirmation numbers as
+# typed (no stemming or stop words), and is immutable, as a stored generated
+# column requires
+SEARCH_CONFIG = "simple"
+ARRIVAL_SEARCH_VECTOR = (
+    SearchVector("guest_name", "confirmation_number", "room", weight="A", config=SEARCH_CONFIG)
+    + SearchVector("travel_agent_name", "nationality", "country", weight="B", config=SEARCH_CONFIG)
+    + SearchVector("phone", "email", "departure_method", weight="C", config=SEARCH_CONFIG)
+)
+
+
+def _trigram_index(field, name):
+    # Matches the UPPER(col::text) LIKE that icontains compiles to
+    return GinIndex(OpClass(Upper(Cast(field, models.TextField())), name="gin_trgm_ops"), name=name)
 
 
 class ArrivalRecord(models.Model):
@@ -52,6 +112,11 @@ class ArrivalRecord(models.Model):
     first_courtesy_notes = models.TextField(blank=True)
     second_courtesy_outcome = models.CharField(max_length=100, blank=True)
     second_courtesy_notes = models.TextField(blank=True)
+    # Derived on save from the fields above: "pending" while an in-house
+    # guest has a call outstanding, with the earliest outstanding due time,
+    # "done" once every scheduled call is completed
+    courtesy_call_status = models.CharField(max_length=20, blank=True)
+    courtesy_call_due_at = models.DateTimeField(null=True, blank=True)
 
     # Departure tracking
     departed_at = models.DateTimeField(null=True, blank=True)
@@ -60,6 +125,22 @@ class ArrivalRecord(models.Model):
     departure_notes = models.TextField(blank=True)
     message_sent_to_guest = models.BooleanField(default=False)
 
+    # Derived on save for the rollups in rollups.py
+    stay_nights = models.IntegerField(null=True, blank=True)
+    nationality_code = models.CharField(max_length=100, blank=True)
+    is_contact_complete = models.BooleanField(default=False)
+
+    # Derived on save from the SLA rules: when each open front-desk action
+    # falls overdue, null while there is none
+    in_house_deadline = models.DateTimeField(null=True, blank=True)
+    courtesy_deadline = models.DateTimeField(null=True, blank=True)
+    departure_deadline = models.DateTimeField(null=True, blank=True)
+
+    # Kept up to date by PostgreSQL on every write, bulk updates included
+    search_vector = models.GeneratedField(
+        expression=ARRIVAL_SEARCH_VECTOR, output_field=SearchVectorField(), db_persist=True
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="arrival_records_created")
@@ -67,6 +148,169 @@ class ArrivalRecord(models.Model):
 
     class Meta:
         ordering = ["arrival_date", "room"]
+        indexes = [
+            # The courtesy call queue only ever scans outstanding calls
+            models.Index(
+                fields=["courtesy_call_due_at"],
+                name="arrival_courtesy_due_idx",
+                condition=models.Q(courtesy_call_status=COURTESY_PENDING),
+            ),
+            # Overdue lists only ever scan open deadlines
+            *[
+                models.Index(
+                    fields=[f"{action}_deadline"],
+                    name=f"arrival_{action}_deadline_idx",
+                    condition=models.Q(**{f"{action}_deadline__isnull": False}),
+                )
+                for action in ("in_house", "courtesy", "departure")
+            ],
+            # Reports read the edges of a date range that are not whole months
+            models.Index(fields=["arrival_date"], name="arrival_date_idx"),
+            GinIndex(fields=["search_vector"], name="arrival_search_vector_idx"),
+            _trigram_index("guest_name", "arrival_guest_name_trgm_idx"),
+            _trigram_index("room", "arrival_room_trgm_idx"),
+            _trigram_index("confirmation_number", "arrival_confirmation_trgm_idx"),
+            _trigram_index("phone", "arrival_phone_trgm_idx"),
+            _trigram_index("email", "arrival_email_trgm_idx"),
+        ]
 
     def __str__(self):
         return f"{self.arrival_date} - {self.room} - {self.guest_name}"
+
+    def save(self, *args, **kwargs):
+        self.refresh_courtesy_call()
+        self.refresh_report_fields()
+        self.refresh_sla_deadlines()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {
+                *kwargs["update_fields"], "courtesy_call_status", "courtesy_call_due_at",
+                "stay_nights", "nationality_code", "is_contact_complete",
+                "in_house_deadline", "courtesy_deadline", "departure_deadline",
+            }
+        super().save(*args, **kwargs)
+
+    @property
+    def is_in_house(self):
+        return (self.status or "").lower() in IN_HOUSE_STATUSES
+
+    def refresh_courtesy_call(self):
+        """Recompute courtesy_call_status and courtesy_call_due_at."""
+        calls = [
+            (self.first_courtesy_due_at, self.first_courtesy_done_at),
+            (self.second_courtesy_due_at, self.second_courtesy_done_at),
+        ]
+        outstanding = [due for due, done in calls if due and not done]
+        if outstanding and self.is_in_house:
+            self.courtesy_call_status = COURTESY_PENDING
+            self.courtesy_call_due_at = min(outstanding)
+        else:
+            scheduled = [due for due, _ in calls if due]
+            self.courtesy_call_status = COURTESY_DONE if scheduled and not outstanding else ""
+            self.courtesy_call_due_at = None
+
+    def refresh_report_fields(self):
+        """Recompute stay_nights, nationality_code and is_contact_complete."""
+        stay = self.nights
+        if stay is None and self.arrival_date and self.departure_date:
+            days = (self.departure_date - self.arrival_date).days
+            stay = days if days >= 0 else None
+        self.stay_nights = stay
+        self.nationality_code = normalize_nationality(self.nationality)
+        self.is_contact_complete = bool(self.phone) and bool(EMAIL_RE.match(self.email or ""))
+
+    def refresh_sla_deadlines(self, rules=None):
+        """Recompute in_house_deadline, courtesy_deadline and departure_deadline."""
+        rules = rules or sla_rules()
+        status = (self.status or "").lower()
+        closed = status == "departed" or status in CANCELLED_STATUSES or status in NO_SHOW_STATUSES
+
+        self.in_house_deadline = None
+        if self.arrival_date and not self.is_in_house and not closed:
+            self.in_house_deadline = day_deadline(self.arrival_date, rules["IN_HOUSE_HOURS"])
+
+        # Calls stay open until made, unless the guest has left
+        outstanding = [
+            due for due, done in (
+                (self.first_courtesy_due_at, self.first_courtesy_done_at),
+                (self.second_courtesy_due_at, self.second_courtesy_done_at),
+            ) if due and not done
+        ]
+        self.courtesy_deadline = None
+        if outstanding and status != "departed":
+            self.courtesy_deadline = min(outstanding) + timedelta(minutes=rules["COURTESY_GRACE_MINUTES"])
+
+        self.departure_deadline = None
+        if self.departure_date and self.is_in_house:
+            self.departure_deadline = day_deadline(self.departure_date, rules["DEPARTURE_HOURS"])
+
+    def courtesy_status(self, which, now):
+        """Display status of the first or second courtesy call at ``now``."""
+        due_at = getattr(self, f"{which}_courtesy_due_at")
+        if not due_at:
+            return "Not Scheduled"
+        if getattr(self, f"{which}_courtesy_done_at"):
+            return "Completed"
+        return "Overdue" if due_at <= now else "Pending"
+
+
+class ArrivalRollup(models.Model):
+    """
+    Arrivals counted per month, property, nationality, country, travel
+    agent, length of stay and contact completeness. Kept current by the
+    signal handlers in ``signals.py`` and by bulk status changes; see
+    ``rollups.py``.
+    """
+
+    # First day of the arrival month; null for arrivals without a date
+    month = models.DateField(null=True, blank=True)
+    property_name = models.CharField(max_length=255, blank=True)
+    nationality_code = models.CharField(max_length=100, blank=True)
+    country = models.CharField(max_length=100, blank=True)
+    travel_agent_name = models.CharField(max_length=255, blank=True)
+    stay_nights = models.IntegerField(null=True, blank=True)
+    is_contact_complete = models.BooleanField(default=False)
+
+    arrivals = models.IntegerField(default=0)
+    nights_total = models.IntegerField(default=0)
+    missing_phone = models.IntegerField(default=0)
+    missing_email = models.IntegerField(default=0)
+    missing_both = models.IntegerField(default=0)
+    invalid_email = models.IntegerField(default=0)
+    vip_arrivals = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    no_shows = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "month", "property_name", "nationality_code", "country", "travel_agent_name",
+                    "stay_nights", "is_contact_complete",
+                ],
+                name="arrival_rollup_unique",
+                nulls_distinct=False,
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.month} - {self.nationality_code or '-'} - {self.arrivals}"
+
+
+class OverdueSnapshot(models.Model):
+    """
+    Overdue front-desk actions per property at one moment, taken
+    periodically by the snapshot_overdue_actions command for trend charts.
+    """
+
+    taken_at = models.DateTimeField(db_index=True)
+    property_name = models.CharField(max_length=255, blank=True)
+    in_house = models.IntegerField(default=0)
+    first_courtesy = models.IntegerField(default=0)
+    second_courtesy = models.IntegerField(default=0)
+    departures = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["taken_at", "property_name"]
+
+    def __str__(self):
+        return f"{self.taken_at:%Y-%m-%d %H:%M} - {self.property_name or '-'}"
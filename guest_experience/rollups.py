@@ -0,0 +1,255 @@
+"""
+Monthly arrival rollups behind the nationality, length of stay and contact
+completeness reports.
+
+Each ``ArrivalRecord`` stores its length of stay, normalized nationality
+and contact completeness when saved, and counts towards exactly one
+``ArrivalRollup`` row: its arrival month, property, nationality, country,
+travel agent, length of stay and completeness. The signal handlers in
+``signals.py`` move a record's counts between rows as it is created,
+edited or deleted, inside the same transaction, so the rollup always
+matches the table. Bulk front-desk transitions skip the signals and
+report their status changes through ``apply_status_changes``. The length
+of stay is kept exact rather than bucketed, which keeps minimum, maximum
+and the per-night distribution exact too.
+
+``arrival_totals`` answers a report from the rollup rows of the whole
+months in its date range and reads only the partial months at either end
+from the records, through the arrival date index, so a report over years
+of arrivals groups a few thousand rollup rows instead of every record.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import (
+    CANCELLED_STATUSES, EMAIL_PATTERN, EMAIL_RE, NO_SHOW_STATUSES, ArrivalRecord, ArrivalRollup,
+)
+
+DIMENSIONS = (
+    "month", "property_name", "nationality_code", "country", "travel_agent_name",
+    "stay_nights", "is_contact_complete",
+)
+MEASURES = (
+    "arrivals", "nights_total", "missing_phone", "missing_email", "missing_both", "invalid_email",
+    "vip_arrivals", "cancelled", "no_shows",
+)
+
+# Record fields an entry is computed from
+ENTRY_FIELDS = (
+    "arrival_date", "property_name", "nationality_code", "country", "travel_agent_name",
+    "stay_nights", "is_contact_complete", "phone", "email", "vip_code", "status",
+)
+
+MISSING_PHONE = Q(phone="")
+MISSING_EMAIL = Q(email="")
+INVALID_EMAIL = ~MISSING_EMAIL & ~Q(email__regex=EMAIL_PATTERN)
+
+
+def _status_in(statuses):
+    return Q(*[Q(status__iexact=status) for status in statuses], _connector=Q.OR)
+
+
+def _status_kind(status):
+    status = (status or "").lower()
+    return "cancelled" if status in CANCELLED_STATUSES else "no_show" if status in NO_SHOW_STATUSES else None
+
+
+def record_measures():
+    """Aggregates over arrival records giving the rollup measures."""
+    return {
+        "arrivals": Count("id"),
+        "nights_total": Sum("stay_nights", default=0),
+        "missing_phone": Count("id", filter=MISSING_PHONE),
+        "missing_email": Count("id", filter=MISSING_EMAIL),
+        "missing_both": Count("id", filter=MISSING_PHONE & MISSING_EMAIL),
+        "invalid_email": Count("id", filter=INVALID_EMAIL),
+        "vip_arrivals": Count("id", filter=~Q(vip_code="")),
+        "cancelled": Count("id", filter=_status_in(CANCELLED_STATUSES)),
+        "no_shows": Count("id", filter=_status_in(NO_SHOW_STATUSES)),
+    }
+
+
+def rollup_entry(record):
+    """(dimensions, measures) a saved arrival record counts as."""
+    month = record.arrival_date.replace(day=1) if record.arrival_date else None
+    key = (
+        month, record.property_name, record.nationality_code, record.country, record.travel_agent_name,
+        record.stay_nights, record.is_contact_complete,
+    )
+    missing_phone, missing_email = not record.phone, not record.email
+    status = _status_kind(record.status)
+    measures = (
+        1,
+        record.stay_nights or 0,
+        int(missing_phone),
+        int(missing_email),
+        int(missing_phone and missing_email),
+        int(not missing_email and not EMAIL_RE.match(record.email)),
+        int(bool(record.vip_code)),
+        int(status == "cancelled"),
+        int(status == "no_show"),
+    )
+    return key, measures
+
+
+def stored_entry(pk):
+    """The entry of the record as currently stored, or None."""
+    record = ArrivalRecord.objects.filter(pk=pk).only(*ENTRY_FIELDS).first()
+    return rollup_entry(record) if record else None
+
+
+def apply_rollup_deltas(entries):
+    """
+    Add (dimensions, measures, sign) entries to the rollup rows, creating
+    rows as needed and dropping those left without arrivals.
+    """
+    deltas = {}
+    for key, measures, sign in entries:
+        total = deltas.setdefault(key, [0] * len(MEASURES))
+        for i, value in enumerate(measures):
+            total[i] += sign * value
+
+    for key, values in deltas.items():
+        if not any(values):
+            continue
+        dims = dict(zip(DIMENSIONS, key))
+        increments = {field: F(field) + value for field, value in zip(MEASURES, values)}
+        with transaction.atomic():
+            if not ArrivalRollup.objects.filter(**dims).update(**increments):
+                try:
+                    with transaction.atomic():
+                        ArrivalRollup.objects.create(**dims, **dict(zip(MEASURES, values)))
+                except IntegrityError:
+                    # Created by a concurrent save in the meantime
+                    ArrivalRollup.objects.filter(**dims).update(**increments)
+            if values[0] < 0:
+                ArrivalRollup.objects.filter(**dims, arrivals__lte=0).delete()
+
+
+def apply_status_changes(previous, status):
+    """
+    Move the counts of records whose status was set to ``status`` by a bulk
+    UPDATE, given {pk: previous status}. Only changes in or out of a
+    cancelled or no-show status touch the rollup.
+    """
+    changed = {pk: old for pk, old in previous.items() if _status_kind(old) != _status_kind(status)}
+    if not changed:
+        return
+    entries = []
+    for record in ArrivalRecord.objects.filter(pk__in=changed).only(*ENTRY_FIELDS):
+        record.status = changed[record.pk]
+        entries.append((*rollup_entry(record), -1))
+        record.status = status
+        entries.append((*rollup_entry(record), 1))
+    apply_rollup_deltas(entries)
+
+
+def refresh_record_report_fields(batch_size=1000):
+    """Recompute the stored report fields of every arrival record. Returns the number changed."""
+    fields = ["stay_nights", "nationality_code", "is_contact_complete"]
+    changed = []
+    for record in ArrivalRecord.objects.only(
+        "nights", "arrival_date", "departure_date", "nationality", "phone", "email", *fields
+    ).iterator(chunk_size=batch_size):
+        stored = [getattr(record, field) for field in fields]
+        record.refresh_report_fields()
+        if [getattr(record, field) for field in fields] != stored:
+            changed.append(record)
+    ArrivalRecord.objects.bulk_update(changed, fields, batch_size=batch_size)
+    return len(changed)
+
+
+def rebuild_arrival_rollups():
+    """Recount every rollup row from the arrival records. Returns the number of rows."""
+    grouped = ArrivalRecord.objects.annotate(month=TruncMonth("arrival_date")).order_by().values(
+        *DIMENSIONS
+    ).annotate(**record_measures())
+    with transaction.atomic():
+        ArrivalRollup.objects.all().delete()
+        rows = ArrivalRollup.objects.bulk_create((ArrivalRollup(**row) for row in grouped.iterator()), batch_size=1000)
+    return len(rows)
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def whole_months(start_date, end_date):
+    """
+    (first, end) months of the whole months inside the date range, end
+    exclusive; None bounds are open. None when the range holds no whole month.
+    """
+    first = start_date if start_date is None or start_date.day == 1 else _next_month(start_date)
+    end = None
+    if end_date is not None:
+        end = _next_month(end_date) if (end_date + timedelta(days=1)).day == 1 else end_date.replace(day=1)
+    if first is not None and end is not None and first >= end:
+        return None
+    return first, end
+
+
+def _grouped(qs, fields, aggregates):
+    # No fields means a single total
+    if not fields:
+        return [qs.aggregate(**aggregates)]
+    return qs.order_by().values(*fields).annotate(**aggregates)
+
+
+def _merge(totals, row, fields):
+    key = tuple(row[field] for field in fields)
+    total = totals.get(key)
+    if total is None:
+        totals[key] = dict(row)
+        return
+    for measure in MEASURES:
+        total[measure] += row[measure]
+    for bound, pick in (("min_nights", min), ("max_nights", max)):
+        values = [value for value in (total[bound], row[bound]) if value is not None]
+        total[bound] = pick(values) if values else None
+
+
+def arrival_totals(fields=(), start_date=None, end_date=None, filters=None):
+    """
+    Rollup measures plus min_nights and max_nights for the arrivals in the
+    date range, grouped by ``fields`` and largest group first. ``filters``
+    are lookups on the fields the rollup and the records share. Without a
+    date range, arrivals without a date are included, as the reports
+    always have.
+    """
+    fields = list(fields)
+    filters = filters or {}
+    bounds = {"min_nights": Min("stay_nights"), "max_nights": Max("stay_nights")}
+    totals = {}
+
+    months = whole_months(start_date, end_date)
+    record_ranges = []
+    if months is None:
+        record_ranges.append(Q(arrival_date__gte=start_date, arrival_date__lte=end_date))
+    else:
+        first, end = months
+        rollup = ArrivalRollup.objects.filter(**filters)
+        if first is not None:
+            rollup = rollup.filter(month__gte=first)
+            if start_date is not None and start_date < first:
+                record_ranges.append(Q(arrival_date__gte=start_date, arrival_date__lt=first))
+        if end is not None:
+            rollup = rollup.filter(month__lt=end)
+            if end_date >= end:
+                record_ranges.append(Q(arrival_date__gte=end, arrival_date__lte=end_date))
+        sums = {measure: Sum(measure, default=0) for measure in MEASURES}
+        for row in _grouped(rollup, fields, {**sums, **bounds}):
+            _merge(totals, row, fields)
+
+    if record_ranges:
+        records = ArrivalRecord.objects.filter(**filters).filter(Q(*record_ranges, _connector=Q.OR))
+        for row in _grouped(records, fields, {**record_measures(), **bounds}):
+            _merge(totals, row, fields)
+
+    return sorted(
+        (total for total in totals.values() if total["arrivals"]),
+        key=lambda total: (-total["arrivals"], [(total[field] is None, total[field]) for field in fields]),
+    )
+
@@ -0,0 +1,61 @@
+"""
+Ranked search over arrival records.
+
+``ArrivalRecord.search_vector`` is a stored tsvector that PostgreSQL keeps
+up to date from the guest, confirmation, room, agent, nationality and
+contact columns, weighted in that order and GIN indexed. Every word typed
+matches as a prefix, so "smi jo" already finds "John Smith" while the
+guest is still spelling it. Guest names, rooms, confirmation numbers,
+phone numbers and emails also match anywhere inside them through their
+pg_trgm indexes, which keeps partial numbers and addresses working. Agent,
+nationality, country and departure method match by word prefix only.
+Hits are ranked by weighted relevance, with the latest arrivals first
+among equals.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField, Q, Value
+
+from .models import SEARCH_CONFIG
+
+SEARCH_RESULT_LIMIT = 20
+MAX_SEARCH_RESULT_LIMIT = 100
+
+
+def _terms(text):
+    # Quoted terms leave the tsquery operators in the input inert
+    return ["'{}'".format(word.replace('\\', '\\\\').replace("'", "''")) for word in text.split()]
+
+
+def prefix_query(text):
+    """A tsquery matching every word of ``text`` as a prefix, or None when there are none."""
+    terms = _terms(text)
+    if not terms:
+        return None
+    return SearchQuery(' & '.join(f'{term}:*' for term in terms), config=SEARCH_CONFIG, search_type='raw')
+
+
+def search_filter(text):
+    """Q matching the records that ``text`` finds."""
+    text = text.strip()
+    contains = Q()
+    for field in ('guest_name', 'room', 'confirmation_number', 'phone', 'email'):
+        contains |= Q(**{f'{field}__icontains': text})
+    query = prefix_query(text)
+    return Q(search_vector=query) | contains if query is not None else Q()
+
+
+def search_arrivals(qs, text):
+    """``qs`` narrowed to the records matching ``text``, annotated with their ``rank``."""
+    query = prefix_query(text)
+    if query is None:
+        return qs.annotate(rank=Value(0.0, output_field=FloatField()))
+    # Whole words typed out rank above longer words they are a prefix of
+    exact = SearchQuery(' & '.join(_terms(text)), config=SEARCH_CONFIG, search_type='raw')
+    return qs.filter(search_filter(text)).annotate(
+        rank=SearchRank(F('search_vector'), query) + SearchRank(F('search_vector'), exact)
+    )
+
+
+def ranked(qs):
+    """Best matches first, then the latest arrivals."""
+    return qs.order_by('-rank', '-arrival_date', '-pk')
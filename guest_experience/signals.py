@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import ArrivalRecord
+from .rollups import apply_rollup_deltas, rollup_entry, stored_entry
+
+
+@receiver(pre_save, sender=ArrivalRecord)
+def remember_rollup_entry(sender, instance, raw=False, **kwargs):
+    # An edit moves the record's counts out of the rollup row it was in
+    instance._rollup_previous = None
+    if instance.pk and not raw:
+        instance._rollup_previous = stored_entry(instance.pk)
+
+
+@receiver(post_save, sender=ArrivalRecord)
+def update_rollup_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    entries = [(*rollup_entry(instance), 1)]
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous:
+        entries.append((*previous, -1))
+    apply_rollup_deltas(entries)
+
+
+@receiver(post_delete, sender=ArrivalRecord)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    apply_rollup_deltas([(*rollup_entry(instance), -1)])
@@ -0,0 +1,114 @@
+"""
+Overdue front-desk actions, from the deadline columns on ArrivalRecord.
+
+``ArrivalRecord.save`` stores when each open action falls overdue: marking
+an arrival in house, its next courtesy call and checking an in-house guest
+out, following ``settings.GUEST_SLA_RULES``. Each deadline is null once
+its action is done and has a partial index over the open ones, so an
+overdue list is a range scan of that index up to now, however many
+arrivals are on file. ``snapshot_overdue`` stores the counts per property
+for the trend chart of the overdue actions report; run the
+snapshot_overdue_actions command periodically (e.g. from cron).
+
+The deadlines are computed on write, so after changing the rules run
+``refresh_deadlines`` (the same command, with --refresh-deadlines) to apply
+them to open actions.
+"""
+import math
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import ArrivalRecord, OverdueSnapshot, sla_rules
+
+OVERDUE_ACTIONS = ("in_house", "first_courtesy", "second_courtesy", "departures")
+SNAPSHOT_KEEP_DAYS = 90
+DEADLINE_FIELDS = ["in_house_deadline", "courtesy_deadline", "departure_deadline"]
+
+
+def overdue_querysets(now, min_overdue_hours=None, rules=None):
+    """
+    {action: queryset of the arrivals overdue for it at ``now``}. With
+    ``min_overdue_hours``, only those overdue by at least that long, counted
+    from the deadline, from a call's due time, and for departures in whole
+    days since the departure date, as the report always has.
+    """
+    rules = rules or sla_rules()
+    grace = timedelta(minutes=rules["COURTESY_GRACE_MINUTES"])
+    late = timedelta(hours=min_overdue_hours) if min_overdue_hours and min_overdue_hours > 0 else None
+
+    querysets = {"in_house": ArrivalRecord.objects.filter(in_house_deadline__lt=now)}
+    for which in ("first", "second"):
+        # Any overdue call keeps the record's courtesy deadline in the past
+        qs = ArrivalRecord.objects.filter(
+            courtesy_deadline__lt=now,
+            **{f"{which}_courtesy_due_at__lt": now - grace, f"{which}_courtesy_done_at__isnull": True},
+        )
+        if late:
+            qs = qs.filter(**{f"{which}_courtesy_due_at__lte": now - late})
+        querysets[f"{which}_courtesy"] = qs
+    querysets["departures"] = ArrivalRecord.objects.filter(departure_deadline__lt=now)
+
+    if late:
+        querysets["in_house"] = querysets["in_house"].filter(in_house_deadline__lte=now - late)
+        querysets["departures"] = querysets["departures"].filter(
+            departure_date__lte=timezone.localdate(now) - timedelta(days=math.ceil(min_overdue_hours / 24))
+        )
+    return querysets
+
+
+def snapshot_overdue(now):
+    """Store the overdue counts per property at ``now``. Returns the snapshots."""
+    counts = {}
+    for action, qs in overdue_querysets(now).items():
+        for property_name, count in qs.order_by().values_list("property_name").annotate(count=Count("id")):
+            counts.setdefault(property_name, dict.fromkeys(OVERDUE_ACTIONS, 0))[action] = count
+    snapshots = [
+        OverdueSnapshot(taken_at=now, property_name=property_name, **actions)
+        for property_name, actions in sorted(counts.items())
+    ]
+    # A moment without anything overdue is still a point on the chart
+    if not snapshots:
+        snapshots.append(OverdueSnapshot(taken_at=now))
+    return OverdueSnapshot.objects.bulk_create(snapshots)
+
+
+def prune_snapshots(now, keep_days=SNAPSHOT_KEEP_DAYS):
+    """Delete snapshots older than ``keep_days``. Returns how many."""
+    deleted, _ = OverdueSnapshot.objects.filter(taken_at__lt=now - timedelta(days=keep_days)).delete()
+    return deleted
+
+
+def overdue_trend(start, end, property_filter=""):
+    """
+    Overdue counts per snapshot taken between ``start`` and ``end``, summed
+    over the properties matching ``property_filter``, oldest first.
+    """
+    qs = OverdueSnapshot.objects.filter(taken_at__gte=start, taken_at__lt=end)
+    if property_filter:
+        qs = qs.filter(property_name__icontains=property_filter)
+    trend = {}
+    for snapshot in qs.order_by("taken_at"):
+        point = trend.setdefault(snapshot.taken_at, dict.fromkeys(OVERDUE_ACTIONS, 0))
+        for action in OVERDUE_ACTIONS:
+            point[action] += getattr(snapshot, action)
+    return [{"taken_at": taken_at, **actions} for taken_at, actions in trend.items()]
+
+
+def refresh_deadlines(batch_size=1000):
+    """Recompute the deadlines of every arrival under the current rules. Returns the number changed."""
+    rules = sla_rules()
+    changed = []
+    for record in ArrivalRecord.objects.only(
+        "status", "arrival_date", "departure_date", "first_courtesy_due_at", "first_courtesy_done_at",
+        "second_courtesy_due_at", "second_courtesy_done_at", *DEADLINE_FIELDS,
+    ).iterator(chunk_size=batch_size):
+        stored = [getattr(record, field) for field in DEADLINE_FIELDS]
+        record.refresh_sla_deadlines(rules)
+        if [getattr(record, field) for field in DEADLINE_FIELDS] != stored:
+            changed.append(record)
+    with transaction.atomic():
+        ArrivalRecord.objects.bulk_update(changed, DEADLINE_FIELDS, batch_size=batch_size)
+    return len(changed)
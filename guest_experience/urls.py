@@ -11,6 +11,7 @@ urlpatterns = [
     path("arrivals/edit/<str:confirmation_number>/", views.edit_arrival, name="edit_arrival"),
     path("arrivals/delete/", views.delete_arrivals, name="delete_arrivals"),
     path("arrivals/mark-in-house/", views.mark_in_house, name="mark_in_house"),
+    path("arrivals/bulk-action/", views.bulk_arrival_action, name="bulk_arrival_action"),
     path("in-house/", views.in_house, name="in_house"),
     path("in-house/mark-departed/", views.mark_departed, name="mark_departed"),
     path("in-house/update-room/", views.update_room, name="update_room"),
@@ -22,8 +23,12 @@ urlpatterns = [
     path("api/arrivals/", views.arrivals_api, name="arrivals_api"),
     path("api/in-house/", views.in_house_api, name="in_house_api"),
     path("api/departures/", views.departures_api, name="departures_api"),
+    path("api/search/", views.search_api, name="search_api"),
+    path("api/events/", views.arrival_events, name="arrival_events"),
     path("api/courtesy-calls/", views.courtesy_calls_api, name="courtesy_calls_api"),
+    path("api/courtesy-calls/count/", views.courtesy_calls_count_api, name="courtesy_calls_count_api"),
     path("api/travel-agents/", views.travel_agents_api, name="travel_agents_api"),
+    path("api/travel-agents/analytics/", views.travel_agent_analytics_api, name="travel_agent_analytics_api"),
     path("api/courtesy-calls/mark-done/", views.mark_courtesy_done, name="mark_courtesy_done"),
     path("api/dashboard/", views.dashboard_api, name="dashboard_api"),
     # Reports
@@ -1,27 +1,34 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
-from django.http import JsonResponse, HttpResponse
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 import logging
-from django.db.models import Count, Q, Avg, Min, Max
-from django.db.models.functions import TruncDate
+from django.db.models import Count, Q, Avg, F, Func, Value, DateTimeField, DurationField, ExpressionWrapper
+from django.db.models.functions import Cast
 import json
 import pandas as pd
-import io
+from collections import defaultdict
 from datetime import datetime, timedelta
-from .models import ArrivalRecord
+from .agent_analytics import (
+    AGENT_COMPARISONS, AGENT_PERIOD_MONTHS, AGENT_SORT_METRICS, AGENT_TOP_DEFAULT, AGENT_TOP_MAX, add_months,
+    agent_analytics, compared_period,
+)
+from .arrivals_import import ArrivalsFileError, describe_errors, parse_arrivals
+from .bulk_actions import BULK_ACTION_MAX_IDS, BulkActionError, apply_bulk_action
+from .dashboard import GUEST_DASHBOARD_CACHE_TIMEOUT, bump_dashboard_version, dashboard_cache_key, dashboard_counters
+from .events import event_stream, publish_arrivals, publish_removed
+from .models import ArrivalRecord, ArrivalRollup, COURTESY_PENDING
+from .rollups import INVALID_EMAIL, MEASURES as ROLLUP_MEASURES, arrival_totals
+from .search import MAX_SEARCH_RESULT_LIMIT, SEARCH_RESULT_LIMIT, ranked, search_arrivals, search_filter
+from .sla import overdue_querysets, overdue_trend
 from django.db import models
 import logging
 
-try:
-    import openpyxl
-    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-    from openpyxl.utils import get_column_letter
-    OPENPYXL_AVAILABLE = True
-except ImportError:
-    OPENPYXL_AVAILABLE = False
+from hotel_management.export_utils import StreamingWorkbook, iter_queryset_rows, XLSXWRITER_AVAILABLE
 
 
 @login_required
@@ -130,145 +137,26 @@ def upload_arrivals(request):
         messages.error(request, f"Could not read Excel file: {exc}")
         return redirect("guest_experience:arrivals")
 
-    # Try to detect the header row by looking for a cell equal to 'Arrival Date' (case-insensitive)
-    header_row_idx = None
-    target_header = "arrival date"
-    for idx, row in raw_df.iterrows():
-        for val in row:
-            if isinstance(val, str) and val.strip().lower() == target_header:
-                header_row_idx = idx
-                break
-        if header_row_idx is not None:
-            break
-
-    if header_row_idx is None:
-        # Fallback: treat the first row as header
-        header_row_idx = 0
-
-    header = raw_df.iloc[header_row_idx].tolist()
-    df = raw_df.iloc[header_row_idx + 1 :].copy()
-
-    # Normalize column names for flexible matching
-    df.columns = [str(c).strip().lower() for c in header]
-
-    def col(*names):
-        for n in names:
-            n = n.lower()
-            if n in df.columns:
-                return n
-        return None
-
-    # Map your Excel headers
-    property_col = col("property")
-    confirmation_col = col("confirmation number", "confirmation")
-    first_name_col = col("first name", "firstname", "first")
-    last_name_col = col("last name", "lastname", "last")
-    room_col = col("room number", "room")
-    phone_col = col("phone", "phone number", "tel")
-    email_col = col("email", "e-mail")
-    nationality_col = col("nationality")
-    country_col = col("country")
-    guest_col = col("guest name", "guest", "name")
-    first_name_col = col("first name", "firstname", "first")
-    last_name_col = col("last name", "lastname", "last")
-    eta_col = col("eta", "arrival time")
-    nights_col = col("nights", "length of stay")
-    status_col = col("status")
-    arrival_date_col = col("arrival date", "check in", "arrival")
-    departure_date_col = col("departure date", "check out", "checkout", "departure")
-    travel_agent_col = col("travel agent name", "agent", "travel agent")
-    vip_code_col = col("vip code", "vip")
-    rate_col = col("rate")
-    rate_code_col = col("rate code")
-    last_room_col = col("last room number", "last room")
-    preference_col = col("preference")
-    alert_code_col = col("alert code", "alert")
-    membership_type_col = col("membership type", "membership")
-    membership_number_col = col("membership number", "membership #")
-
-    # We must at least have arrival date; room number is optional
-    if not arrival_date_col:
-        messages.error(
-            request,
-            "Excel file must contain an 'Arrival Date' column.",
-        )
+    try:
+        rows, errors = parse_arrivals(raw_df)
+    except ArrivalsFileError as exc:
+        messages.error(request, str(exc))
         return redirect("guest_experience:arrivals")
 
-    # If we have confirmation numbers, clean existing rows for those confirmations
-    # so re-importing the same Excel file does not create duplicates.
-    if confirmation_col:
-        confirmation_values = set()
-        for _, row in df.iterrows():
-            cn = str(row.get(confirmation_col) or "").strip()
-            if cn:
-                confirmation_values.add(cn)
+    # Existing arrivals by confirmation number, fetched in chunks rather than one query per row
+    existing_records = {}
+    confirmation_numbers = sorted({row["confirmation_number"] for row in rows})
+    for start in range(0, len(confirmation_numbers), 1000):
+        for record in ArrivalRecord.objects.filter(
+            confirmation_number__in=confirmation_numbers[start:start + 1000]
+        ):
+            existing_records.setdefault(record.confirmation_number, record)
 
     created_or_updated = 0
-    today = timezone.localdate()
-    for _, row in df.iterrows():
-        arrival_date_val = row.get(arrival_date_col)
-        if pd.isna(arrival_date_val):
-            continue
-        try:
-            arrival_date = pd.to_datetime(arrival_date_val).date()
-        except Exception:
-            # Skip rows with bad dates
-            continue
-
-        property_name = str(row.get(property_col) or "").strip() if property_col else ""
-        confirmation_number = str(row.get(confirmation_col) or "").strip() if confirmation_col else ""
-        first_name = str(row.get(first_name_col) or "").strip() if first_name_col else ""
-        last_name = str(row.get(last_name_col) or "").strip() if last_name_col else ""
-        room = str(row.get(room_col) or "").strip() if room_col else ""
-        phone = str(row.get(phone_col) or "").strip() if phone_col else ""
-        email = str(row.get(email_col) or "").strip() if email_col else ""
-        nationality = str(row.get(nationality_col) or "").strip() if nationality_col else ""
-        country = str(row.get(country_col) or "").strip() if country_col else ""
-
-        # Build guest name from either a combined column or First/Last Name
-        if guest_col:
-            guest_name = str(row.get(guest_col) or "").strip()
-        else:
-            first = str(row.get(first_name_col) or "").strip() if first_name_col else ""
-            last = str(row.get(last_name_col) or "").strip() if last_name_col else ""
-            guest_name = (first + " " + last).strip()
-
-        eta = "" if not eta_col else str(row.get(eta_col) or "").strip()
-
-        # Departure date (store raw date if present)
-        departure_date = None
-        if departure_date_col:
-            dep_val_for_store = row.get(departure_date_col)
-            if pd.notna(dep_val_for_store):
-                try:
-                    departure_date = pd.to_datetime(dep_val_for_store).date()
-                except Exception:
-                    departure_date = None
-
-        # Nights: from explicit column if present, otherwise compute from Arrival/Departure
-        nights = None
-        if nights_col:
-            nights_raw = row.get(nights_col)
-            try:
-                nights = int(nights_raw) if pd.notna(nights_raw) else None
-            except (TypeError, ValueError):
-                nights = None
-        elif departure_date is not None:
-            try:
-                diff = (departure_date - arrival_date).days
-                nights = diff if diff >= 0 else None
-            except Exception:
-                nights = None
-
-        # Status: from column; default to "Expected" if blank
-        raw_status = "" if not status_col else str(row.get(status_col) or "").strip()
-        status = raw_status or "Expected"
-
-        # If no confirmation number, skip to avoid untrackable duplicates
-        if not confirmation_number:
-            continue
-        # Check if record already exists
-        existing_record = ArrivalRecord.objects.filter(confirmation_number=confirmation_number).first()
+    changed_ids = []
+    for row in rows:
+        row["room"] = row["room"] or None
+        existing_record = existing_records.get(row["confirmation_number"])
         
         if existing_record:
             # Record exists - check if status is protected (In-House or Departed)
@@ -276,72 +164,33 @@ def upload_arrivals(request):
             is_protected = current_status.lower() in ['in-house', 'in house', 'departed']
             
             # Update all fields except status if it's protected
-            existing_record.property_name = property_name
-            existing_record.first_name = first_name
-            existing_record.last_name = last_name
-            existing_record.room = room or None
-            existing_record.phone = phone
-            existing_record.email = email
-            existing_record.nationality = nationality
-            existing_record.country = country
-            existing_record.arrival_date = arrival_date
-            existing_record.departure_date = departure_date
-            existing_record.travel_agent_name = str(row.get(travel_agent_col) or "").strip() if travel_agent_col else ""
-            existing_record.vip_code = str(row.get(vip_code_col) or "").strip() if vip_code_col else ""
-            existing_record.rate = float(row.get(rate_col)) if rate_col and pd.notna(row.get(rate_col)) else None
-            existing_record.rate_code = str(row.get(rate_code_col) or "").strip() if rate_code_col else ""
-            existing_record.last_room_number = str(row.get(last_room_col) or "").strip() if last_room_col else ""
-            existing_record.preference = str(row.get(preference_col) or "").strip() if preference_col else ""
-            existing_record.alert_code = str(row.get(alert_code_col) or "").strip() if alert_code_col else ""
-            existing_record.membership_type = str(row.get(membership_type_col) or "").strip() if membership_type_col else ""
-            existing_record.membership_number = str(row.get(membership_number_col) or "").strip() if membership_number_col else ""
-            existing_record.guest_name = guest_name
-            existing_record.eta = eta
-            existing_record.nights = nights
-            if not is_protected:
-                existing_record.status = status
+            for field, value in row.items():
+                if field == "status" and is_protected:
+                    continue
+                setattr(existing_record, field, value)
             existing_record.updated_by = request.user
             existing_record.updated_at = timezone.now()
             existing_record.save()
+            changed_ids.append(existing_record.pk)
             created_or_updated += 1
         else:
-            ArrivalRecord.objects.create(
-            # Raw columns
-            property_name=property_name,
-            confirmation_number=confirmation_number,
-            first_name=first_name,
-            last_name=last_name,
-            room=room or None,
-            phone=phone,
-            email=email,
-            nationality=nationality,
-            country=country,
-            arrival_date=arrival_date,
-            departure_date=departure_date,
-            travel_agent_name=str(row.get(travel_agent_col) or "").strip() if travel_agent_col else "",
-            # New VIP and membership fields
-            vip_code=str(row.get(vip_code_col) or "").strip() if vip_code_col else "",
-            rate=float(row.get(rate_col)) if rate_col and pd.notna(row.get(rate_col)) else None,
-            rate_code=str(row.get(rate_code_col) or "").strip() if rate_code_col else "",
-            last_room_number=str(row.get(last_room_col) or "").strip() if last_room_col else "",
-            preference=str(row.get(preference_col) or "").strip() if preference_col else "",
-            alert_code=str(row.get(alert_code_col) or "").strip() if alert_code_col else "",
-            membership_type=str(row.get(membership_type_col) or "").strip() if membership_type_col else "",
-            membership_number=str(row.get(membership_number_col) or "").strip() if membership_number_col else "",
-            # Derived/display
-            guest_name=guest_name,
-            eta=eta,
-            nights=nights,
-            status=status,
-            created_by=request.user,
-            updated_by=request.user,
+            created = ArrivalRecord.objects.create(
+                **row,
+                created_by=request.user,
+                updated_by=request.user,
             )
+            existing_records[created.confirmation_number] = created
+            changed_ids.append(created.pk)
             created_or_updated += 1
 
+    bump_dashboard_version()
+    publish_arrivals("uploaded", changed_ids)
     messages.success(
         request,
         f"Imported {created_or_updated} arrival rows from Excel.",
     )
+    if errors:
+        messages.warning(request, describe_errors(errors))
     return redirect("guest_experience:arrivals")
 
 
@@ -563,6 +412,8 @@ def edit_arrival(request, confirmation_number):
         record.updated_by = request.user
         record.updated_at = timezone.now()
         record.save()
+        bump_dashboard_version()
+        publish_arrivals("edited", [record.pk])
 
         return JsonResponse({
             "success": True,
@@ -594,6 +445,8 @@ def delete_arrivals(request):
         return JsonResponse({"deleted": 0})
 
     deleted_count, _ = ArrivalRecord.objects.filter(confirmation_number__in=cleaned_ids).delete()
+    bump_dashboard_version()
+    publish_removed(cleaned_ids)
     return JsonResponse({"deleted": deleted_count})
 
 
@@ -620,6 +473,7 @@ def mark_in_house(request):
 
     now = timezone.now()
     updated = 0
+    changed_ids = []
     qs = ArrivalRecord.objects.filter(confirmation_number__in=cleaned_ids)
     for record in qs:
         # Only set in-house timing if actually transitioning to In-House
@@ -646,8 +500,11 @@ def mark_in_house(request):
         record.updated_by = request.user
         record.updated_at = now
         record.save()
+        changed_ids.append(record.pk)
         updated += 1
 
+    bump_dashboard_version()
+    publish_arrivals("in_house", changed_ids)
     return JsonResponse({"updated": updated})
 
 
@@ -701,6 +558,8 @@ def mark_departed(request):
     record.updated_by = request.user
     record.updated_at = now
     record.save()
+    bump_dashboard_version()
+    publish_arrivals("departed", [record.pk])
 
     return JsonResponse({"success": True})
 
@@ -745,10 +604,56 @@ def update_room(request):
     record.updated_by = request.user
     record.updated_at = timezone.now()
     record.save()
+    publish_arrivals("room_moved", [record.pk])
 
     return JsonResponse({"success": True, "room": record.room})
 
 
+@login_required
+@permission_required("accounts.view_hotel_management", raise_exception=True)
+@require_POST
+def bulk_arrival_action(request):
+    """
+    Apply one front-desk transition to many arrivals in a single request.
+    Expects JSON body: {
+        "action": "in_house" | "departed" | "room" | "courtesy_done",
+        "ids": [12, 13, ...],
+        # departed: "departure_method", "departure_notes", "message_sent_to_guest"
+        # room: "rooms": {"12": "205", "13": "206"}
+        # courtesy_done: "which", "outcome", "notes"
+    }
+    Records not in an allowed state for the action are left alone and
+    reported in the per-id results.
+    """
+    try:
+        payload = json.loads(request.body.decode("utf-8") or "{}")
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    ids = payload.get("ids") or []
+    if not isinstance(ids, list):
+        return JsonResponse({"error": "ids must be a list"}, status=400)
+    try:
+        ids = list(dict.fromkeys(int(x) for x in ids))
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "ids must be record ids"}, status=400)
+    if not ids:
+        return JsonResponse({"updated": 0, "results": []})
+    if len(ids) > BULK_ACTION_MAX_IDS:
+        return JsonResponse({"error": f"At most {BULK_ACTION_MAX_IDS} ids per request"}, status=400)
+
+    action = str(payload.get("action") or "").strip()
+    try:
+        moved, results = apply_bulk_action(action, ids, request.user, payload, timezone.now())
+    except BulkActionError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    if moved:
+        bump_dashboard_version()
+        publish_arrivals(action, moved)
+    return JsonResponse({"updated": len(moved), "results": results})
+
+
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 def courtesy_calls(request):
@@ -874,19 +779,12 @@ def departures_api(request):
     if date_param:
         qs = qs.filter(departed_at__date=target_date)
 
-    # Apply search filter
+    # Apply search filter, best matches first
     if search_query:
-        qs = qs.filter(
-            models.Q(room__icontains=search_query) |
-            models.Q(guest_name__icontains=search_query) |
-            models.Q(confirmation_number__icontains=search_query) |
-            models.Q(phone__icontains=search_query) |
-            models.Q(country__icontains=search_query) |
-            models.Q(travel_agent_name__icontains=search_query) |
-            models.Q(departure_method__icontains=search_query)
-        )
-
-    qs = qs.order_by("-departed_at", "room")
+        qs = search_arrivals(qs, search_query).order_by("-rank", "-departed_at", "room")
+    else:
+        qs = qs.order_by("-departed_at", "room")
+    qs = qs.select_related("departed_by")
 
     data = []
     for a in qs:
@@ -919,41 +817,87 @@ def departures_api(request):
     return JsonResponse({"results": data})
 
 
+@login_required
+@permission_required("accounts.view_hotel_management", raise_exception=True)
+def search_api(request):
+    """
+    API endpoint for the arrivals search box.
+    Returns the best matches for ?q= across all arrival records, at most
+    ?limit= of them (20 by default).
+    """
+    search_query = request.GET.get("q", "").strip()
+    try:
+        limit = min(max(int(request.GET.get("limit", SEARCH_RESULT_LIMIT)), 1), MAX_SEARCH_RESULT_LIMIT)
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit, expected a number."}, status=400)
+    if not search_query:
+        return JsonResponse({"results": []})
+
+    qs = ranked(search_arrivals(ArrivalRecord.objects.all(), search_query)).only(
+        "id", "room", "guest_name", "confirmation_number", "status", "property_name",
+        "arrival_date", "departure_date", "travel_agent_name",
+    )[:limit]
+    data = [
+        {
+            "id": a.id,
+            "room": a.room,
+            "guest_name": a.guest_name,
+            "confirmation_number": a.confirmation_number,
+            "status": a.status,
+            "property_name": a.property_name,
+            "arrival_date": a.arrival_date.isoformat() if a.arrival_date else None,
+            "departure_date": a.departure_date.isoformat() if a.departure_date else None,
+            "travel_agent_name": a.travel_agent_name,
+            "rank": round(a.rank, 4),
+        }
+        for a in qs
+    ]
+    return JsonResponse({"results": data})
+
+
+@login_required
+@permission_required("accounts.view_hotel_management", raise_exception=True)
+async def arrival_events(request):
+    """
+    Server-sent event stream of arrival changes for the front-desk screens.
+    Only served under ASGI; WSGI workers would be held by the open stream.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "Live updates need the ASGI server."}, status=501)
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 def courtesy_calls_api(request):
     """
     API endpoint for courtesy call tracking.
     Shows in-house guests and their courtesy call due/completed state.
+
+    With ?due_within=<minutes>, returns only guests with a call outstanding
+    that falls due within that many minutes (overdue ones included), read
+    from the courtesy call queue index.
     """
     now = timezone.now()
 
-    qs = ArrivalRecord.objects.filter(
-        models.Q(status__iexact="In-House") | models.Q(status__iexact="in house")
-    ).order_by("room")
+    if request.GET.get("due_within"):
+        due_by = _courtesy_due_by(request, now)
+        if due_by is None:
+            return JsonResponse({"error": "due_within must be a whole number of minutes"}, status=400)
+        qs = ArrivalRecord.objects.filter(
+            courtesy_call_status=COURTESY_PENDING, courtesy_call_due_at__lte=due_by
+        ).order_by("courtesy_call_due_at")
+    else:
+        qs = ArrivalRecord.objects.filter(
+            models.Q(status__iexact="In-House") | models.Q(status__iexact="in house")
+        ).order_by("room")
+    qs = qs.select_related("in_house_by", "first_courtesy_by", "second_courtesy_by")
 
     data = []
     for a in qs:
-        # First courtesy status
-        first_status = "Not Scheduled"
-        if a.first_courtesy_due_at:
-            if a.first_courtesy_done_at:
-                first_status = "Completed"
-            elif a.first_courtesy_due_at <= now:
-                first_status = "Overdue"
-            else:
-                first_status = "Pending"
-
-        # Second courtesy status
-        second_status = "Not Scheduled"
-        if a.second_courtesy_due_at:
-            if a.second_courtesy_done_at:
-                second_status = "Completed"
-            elif a.second_courtesy_due_at <= now:
-                second_status = "Overdue"
-            else:
-                second_status = "Pending"
-
         data.append(
             {
                 "room": a.room,
@@ -967,16 +911,17 @@ def courtesy_calls_api(request):
                 "nights": a.nights,
                 "in_house_since": a.in_house_since.isoformat() if a.in_house_since else None,
                 "in_house_by": a.in_house_by.username if a.in_house_by else None,
+                "courtesy_call_due_at": a.courtesy_call_due_at.isoformat() if a.courtesy_call_due_at else None,
                 "first_courtesy_due_at": a.first_courtesy_due_at.isoformat() if a.first_courtesy_due_at else None,
                 "first_courtesy_done_at": a.first_courtesy_done_at.isoformat() if a.first_courtesy_done_at else None,
                 "first_courtesy_by": a.first_courtesy_by.username if a.first_courtesy_by else None,
-                "first_courtesy_status": first_status,
+                "first_courtesy_status": a.courtesy_status("first", now),
                 "first_courtesy_outcome": a.first_courtesy_outcome,
                 "first_courtesy_notes": a.first_courtesy_notes,
                 "second_courtesy_due_at": a.second_courtesy_due_at.isoformat() if a.second_courtesy_due_at else None,
                 "second_courtesy_done_at": a.second_courtesy_done_at.isoformat() if a.second_courtesy_done_at else None,
                 "second_courtesy_by": a.second_courtesy_by.username if a.second_courtesy_by else None,
-                "second_courtesy_status": second_status,
+                "second_courtesy_status": a.courtesy_status("second", now),
                 "second_courtesy_outcome": a.second_courtesy_outcome,
                 "second_courtesy_notes": a.second_courtesy_notes,
             }
@@ -985,6 +930,38 @@ def courtesy_calls_api(request):
     return JsonResponse({"results": data})
 
 
+def _courtesy_due_by(request, now):
+    """End of the ?due_within=<minutes> window, or None when it is not a valid number."""
+    try:
+        minutes = int(request.GET.get("due_within") or 0)
+    except ValueError:
+        return None
+    if minutes < 0:
+        return None
+    return now + timedelta(minutes=minutes)
+
+
+@login_required
+@permission_required("accounts.view_hotel_management", raise_exception=True)
+def courtesy_calls_count_api(request):
+    """
+    Number of outstanding courtesy calls, for the badge poll: overdue now and
+    due within ?due_within=<minutes> (default 0, i.e. due now).
+    """
+    now = timezone.now()
+    due_by = _courtesy_due_by(request, now)
+    if due_by is None:
+        return JsonResponse({"error": "due_within must be a whole number of minutes"}, status=400)
+
+    counts = ArrivalRecord.objects.filter(
+        courtesy_call_status=COURTESY_PENDING, courtesy_call_due_at__lte=due_by
+    ).aggregate(
+        due=Count("id"),
+        overdue=Count("id", filter=Q(courtesy_call_due_at__lte=now)),
+    )
+    return JsonResponse(counts)
+
+
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 def travel_agents_api(request):
@@ -992,9 +969,9 @@ def travel_agents_api(request):
     API endpoint to get all unique travel agents from the database.
     Returns a list of all travel agent names, sorted alphabetically.
     """
+    # The rollups hold every agent in far fewer rows than the arrivals
     agents = (
-        ArrivalRecord.objects.exclude(travel_agent_name__isnull=True)
-        .exclude(travel_agent_name="")
+        ArrivalRollup.objects.exclude(travel_agent_name="")
         .values_list("travel_agent_name", flat=True)
         .order_by("travel_agent_name")
         .distinct()
@@ -1002,6 +979,50 @@ def travel_agents_api(request):
     return JsonResponse({"agents": list(agents)})
 
 
+@login_required
+@permission_required("accounts.view_hotel_management", raise_exception=True)
+def travel_agent_analytics_api(request):
+    """
+    API endpoint for travel agent analytics over whole months.
+    ?start= and ?end= are YYYY-MM months (the last 12 months by default);
+    returns the ?top= agents (10 by default) by ?sort= (arrivals or
+    room_nights) with their monthly trend, compared with the months just
+    before or, with ?compare=year, with the same months a year earlier.
+    Ranges that would reach outside 0001-01..9999-12 are rejected with a 400.
+    """
+    def parse_month(value):
+        return datetime.strptime(value, '%Y-%m').date()
+
+    this_month = timezone.localdate().replace(day=1)
+    try:
+        last = parse_month(request.GET['end']) if request.GET.get('end') else this_month
+        first = parse_month(request.GET['start']) if request.GET.get('start') else None
+    except ValueError:
+        return JsonResponse({"error": "Invalid month format, expected YYYY-MM."}, status=400)
+    if first and first > last:
+        return JsonResponse({"error": "start must not be after end."}, status=400)
+    try:
+        top = min(max(int(request.GET.get("top", AGENT_TOP_DEFAULT)), 1), AGENT_TOP_MAX)
+    except ValueError:
+        return JsonResponse({"error": "Invalid top, expected a number."}, status=400)
+    sort = request.GET.get("sort", "arrivals")
+    if sort not in AGENT_SORT_METRICS:
+        return JsonResponse({"error": f"sort must be one of {', '.join(AGENT_SORT_METRICS)}"}, status=400)
+    compare = request.GET.get("compare", "previous")
+    if compare not in AGENT_COMPARISONS:
+        return JsonResponse({"error": f"compare must be one of {', '.join(AGENT_COMPARISONS)}"}, status=400)
+
+    try:
+        # The period and the one it is compared with must stay within 0001-01..9999-12
+        first = first or add_months(last, 1 - AGENT_PERIOD_MONTHS)
+        end = add_months(last, 1)
+        compared_period(first, end, compare)
+    except ValueError:
+        return JsonResponse({"error": "Months out of range, including the compared period."}, status=400)
+
+    return JsonResponse(agent_analytics(first, end, top=top, sort=sort, compare=compare))
+
+
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 @require_POST
@@ -1053,6 +1074,8 @@ def mark_courtesy_done(request):
         record.updated_by = request.user
         record.updated_at = now
         record.save()
+        bump_dashboard_version()
+        publish_arrivals("courtesy_done", [record.pk])
 
         return JsonResponse({"success": True})
     except Exception as exc:
@@ -1065,6 +1088,7 @@ def mark_courtesy_done(request):
 def dashboard_api(request):
     """
     API endpoint for dashboard data including metrics and chart data.
+    Cached for a few seconds per filter set; see dashboard.py.
     """
     today = timezone.localdate()
     
@@ -1083,6 +1107,13 @@ def dashboard_api(request):
         start_date = today - timedelta(days=30)
         end_date = today
     
+    cache_key = dashboard_cache_key(
+        start_date, end_date, status_filter, country_filter, travel_agent_filter, search_query
+    )
+    payload = cache.get(cache_key)
+    if payload is not None:
+        return JsonResponse(payload)
+    
     # Base queryset
     qs = ArrivalRecord.objects.filter(
         arrival_date__gte=start_date,
@@ -1100,17 +1131,7 @@ def dashboard_api(request):
         qs = qs.filter(travel_agent_name__icontains=travel_agent_filter)
     
     if search_query:
-        qs = qs.filter(
-            Q(guest_name__icontains=search_query) |
-            Q(confirmation_number__icontains=search_query) |
-            Q(room__icontains=search_query) |
-            Q(phone__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(travel_agent_name__icontains=search_query)
-        )
-    
-    # Calculate metrics
-    total_arrivals = qs.count()
+        qs = qs.filter(search_filter(search_query))
     
     # Status breakdown
     status_breakdown = qs.values('status').annotate(count=Count('id')).order_by('-count')
@@ -1123,11 +1144,9 @@ def dashboard_api(request):
     country_data = {item['country']: item['count'] for item in country_breakdown}
     
     # Daily arrivals trend
-    daily_trend = qs.annotate(date=TruncDate('arrival_date')).values('date').annotate(
-        count=Count('id')
-    ).order_by('date')
+    daily_trend = qs.values('arrival_date').annotate(count=Count('id')).order_by('arrival_date')
     daily_trend_data = {
-        'labels': [item['date'].isoformat() if item['date'] else '' for item in daily_trend],
+        'labels': [item['arrival_date'].isoformat() if item['arrival_date'] else '' for item in daily_trend],
         'data': [item['count'] for item in daily_trend]
     }
     
@@ -1143,26 +1162,8 @@ def dashboard_api(request):
     ).order_by('-count')[:10]
     agent_data = {item['travel_agent_name']: item['count'] for item in agent_breakdown}
     
-    # Expected vs In-House vs Departed
-    expected_count = qs.filter(status__iexact='Expected').count()
-    in_house_count = qs.filter(
-        models.Q(status__iexact='In-House') | models.Q(status__iexact='in house')
-    ).count()
-    departed_count = qs.filter(status__iexact='Departed').count()
-    
-    # Average nights
-    avg_nights = qs.exclude(nights__isnull=True).aggregate(
-        avg_nights=models.Avg('nights')
-    )['avg_nights'] or 0
-    
-    return JsonResponse({
-        'metrics': {
-            'total_arrivals': total_arrivals,
-            'expected': expected_count,
-            'in_house': in_house_count,
-            'departed': departed_count,
-            'avg_nights': round(avg_nights, 1) if avg_nights else 0,
-        },
+    payload = {
+        'metrics': dashboard_counters(qs, today, timezone.now()),
         'charts': {
             'status_breakdown': status_data,
             'country_breakdown': country_data,
@@ -1170,7 +1171,9 @@ def dashboard_api(request):
             'agent_breakdown': agent_data,
             'daily_trend': daily_trend_data,
         }
-    })
+    }
+    cache.set(cache_key, payload, GUEST_DASHBOARD_CACHE_TIMEOUT)
+    return JsonResponse(payload)
 
 
 # ==================== REPORTS ====================
@@ -1469,6 +1472,115 @@ def report_departure_outcomes(request):
     return render(request, "guest_experience/reports/departure_outcomes.html", context)
 
 
+# Agent actions on ArrivalRecord: (action, user field, date field)
+AGENT_ACTIONS = (
+    ('created', 'created_by', 'created_at'),
+    ('updated', 'updated_by', 'updated_at'),
+    ('in_house', 'in_house_by', 'in_house_since'),
+    ('first_courtesy', 'first_courtesy_by', 'first_courtesy_done_at'),
+    ('second_courtesy', 'second_courtesy_by', 'second_courtesy_done_at'),
+    ('departed', 'departed_by', 'departed_at'),
+)
+
+
+class LocalDayStart(Func):
+    """Start of a date in the current time zone, as a timestamp with time zone (PostgreSQL)."""
+    arg_joiner = '::timestamp AT TIME ZONE '
+    template = '(%(expressions)s)'
+    output_field = DateTimeField()
+
+    def __init__(self, expression, **extra):
+        super().__init__(expression, Value(timezone.get_current_timezone_name()), **extra)
+
+
+def agent_action_durations():
+    """The (end, start) timestamps of each action's time-to-action, for actions that have one."""
+    return {
+        # From the start of the arrival day, local time, to the guest being marked in-house
+        'in_house': (F('in_house_since'), LocalDayStart('arrival_date')),
+        # From the call falling due to it being made
+        'first_courtesy': (F('first_courtesy_done_at'), F('first_courtesy_due_at')),
+        'second_courtesy': (F('second_courtesy_done_at'), F('second_courtesy_due_at')),
+    }
+
+
+def _average_minutes(parts):
+    """Count-weighted average of (count, average timedelta) pairs, in minutes."""
+    parts = [(count, duration) for count, duration in parts if duration is not None]
+    total = sum(count for count, _ in parts)
+    if not total:
+        return None
+    return round(sum(count * duration.total_seconds() for count, duration in parts) / total / 60, 1)
+
+
+def _agent_performance(start_date_str, end_date_str, property_filter, user_filter):
+    """
+    Per-agent action counts and average time-to-action for the agent
+    performance report and its export, busiest agent first.
+
+    Each of the six user fields is grouped by user in its own branch of one
+    UNION ALL query, so the cost does not grow with the number of agents.
+    Invalid dates are ignored and agents without an action matching the
+    filters are left out, as before.
+    """
+    from django.contrib.auth.models import User
+
+    def parse(value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+        except (ValueError, TypeError):
+            return None
+
+    start_date = parse(start_date_str)
+    end_date = parse(end_date_str)
+
+    durations = agent_action_durations()
+    branches = []
+    for action, user_field, date_field in AGENT_ACTIONS:
+        qs = ArrivalRecord.objects.filter(**{f'{user_field}__isnull': False})
+        if user_filter:
+            qs = qs.filter(**{f'{user_field}__username__icontains': user_filter})
+        if property_filter:
+            qs = qs.filter(property_name__icontains=property_filter)
+        if start_date:
+            qs = qs.filter(**{f'{date_field}__date__gte': start_date})
+        if end_date:
+            qs = qs.filter(**{f'{date_field}__date__lte': end_date})
+
+        if action in durations:
+            end, start = durations[action]
+            duration = Avg(ExpressionWrapper(end - start, output_field=DurationField()))
+        else:
+            # Typed NULL, so the UNION column types match on PostgreSQL
+            duration = Cast(Value(None), DurationField())
+        branches.append(qs.order_by().values(agent=F(user_field)).annotate(
+            action=Value(action), actions=Count('id'), duration=duration,
+        ))
+
+    stats = defaultdict(dict)
+    for row in branches[0].union(*branches[1:], all=True):
+        stats[row['agent']][row['action']] = (row['actions'], row['duration'])
+
+    users = User.objects.in_bulk(list(stats))
+    performance_data = []
+    for user in sorted(users.values(), key=lambda user: user.username):
+        actions = stats[user.pk]
+        counts = {action: actions.get(action, (0, None))[0] for action, _, _ in AGENT_ACTIONS}
+        performance_data.append({
+            'user': user,
+            **{f'{action}_count': count for action, count in counts.items()},
+            'total_actions': sum(counts.values()),
+            'avg_minutes_to_in_house': _average_minutes([actions.get('in_house', (0, None))]),
+            'avg_courtesy_delay_minutes': _average_minutes(
+                [actions.get('first_courtesy', (0, None)), actions.get('second_courtesy', (0, None))]
+            ),
+        })
+
+    # Sort by total actions descending
+    performance_data.sort(key=lambda x: x['total_actions'], reverse=True)
+    return performance_data
+
+
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 def report_agent_performance(request):
@@ -1482,102 +1594,7 @@ def report_agent_performance(request):
     property_filter = request.GET.get('property', '')
     user_filter = request.GET.get('user', '')
     
-    # Get all users who have handled records (with optional user filter)
-    users_query = User.objects.filter(
-        Q(arrival_records_created__isnull=False) |
-        Q(arrival_records_updated__isnull=False) |
-        Q(arrival_records_in_house__isnull=False) |
-        Q(arrival_records_first_courtesy__isnull=False) |
-        Q(arrival_records_second_courtesy__isnull=False) |
-        Q(arrival_records_departed__isnull=False)
-    )
-    
-    if user_filter:
-        users_query = users_query.filter(username__icontains=user_filter)
-    
-    users = users_query.distinct().order_by('username')
-    
-    performance_data = []
-    for user in users:
-        # Build querysets for each action type
-        created_qs = ArrivalRecord.objects.filter(created_by=user)
-        updated_qs = ArrivalRecord.objects.filter(updated_by=user)
-        in_house_qs = ArrivalRecord.objects.filter(in_house_by=user)
-        first_courtesy_qs = ArrivalRecord.objects.filter(first_courtesy_by=user)
-        second_courtesy_qs = ArrivalRecord.objects.filter(second_courtesy_by=user)
-        departed_qs = ArrivalRecord.objects.filter(departed_by=user)
-        
-        # Apply property filter
-        if property_filter:
-            created_qs = created_qs.filter(property_name__icontains=property_filter)
-            updated_qs = updated_qs.filter(property_name__icontains=property_filter)
-            in_house_qs = in_house_qs.filter(property_name__icontains=property_filter)
-            first_courtesy_qs = first_courtesy_qs.filter(property_name__icontains=property_filter)
-            second_courtesy_qs = second_courtesy_qs.filter(property_name__icontains=property_filter)
-            departed_qs = departed_qs.filter(property_name__icontains=property_filter)
-        
-        # Apply date filters
-        if start_date_str:
-            try:
-                start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-                created_qs = created_qs.filter(created_at__date__gte=start_date)
-                updated_qs = updated_qs.filter(updated_at__date__gte=start_date)
-                in_house_qs = in_house_qs.filter(in_house_since__date__gte=start_date)
-                first_courtesy_qs = first_courtesy_qs.filter(first_courtesy_done_at__date__gte=start_date)
-                second_courtesy_qs = second_courtesy_qs.filter(second_courtesy_done_at__date__gte=start_date)
-                departed_qs = departed_qs.filter(departed_at__date__gte=start_date)
-            except (ValueError, TypeError):
-                pass
-        
-        if end_date_str:
-            try:
-                end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-                created_qs = created_qs.filter(created_at__date__lte=end_date)
-                updated_qs = updated_qs.filter(updated_at__date__lte=end_date)
-                in_house_qs = in_house_qs.filter(in_house_since__date__lte=end_date)
-                first_courtesy_qs = first_courtesy_qs.filter(first_courtesy_done_at__date__lte=end_date)
-                second_courtesy_qs = second_courtesy_qs.filter(second_courtesy_done_at__date__lte=end_date)
-                departed_qs = departed_qs.filter(departed_at__date__lte=end_date)
-            except (ValueError, TypeError):
-                pass
-        
-        created_count = created_qs.count()
-        updated_count = updated_qs.count()
-        in_house_count = in_house_qs.count()
-        first_courtesy_count = first_courtesy_qs.count()
-        second_courtesy_count = second_courtesy_qs.count()
-        departed_count = departed_qs.count()
-        
-        total_actions = created_count + updated_count + in_house_count + first_courtesy_count + second_courtesy_count + departed_count
-        
-        # Only include users with at least one action (if filters are applied)
-        if not start_date_str and not end_date_str and not property_filter and not user_filter:
-            # No filters - show all users
-            performance_data.append({
-                'user': user,
-                'created_count': created_count,
-                'updated_count': updated_count,
-                'in_house_count': in_house_count,
-                'first_courtesy_count': first_courtesy_count,
-                'second_courtesy_count': second_courtesy_count,
-                'departed_count': departed_count,
-                'total_actions': total_actions,
-            })
-        elif total_actions > 0:
-            # Filters applied - only show users with actions in filtered period
-            performance_data.append({
-                'user': user,
-                'created_count': created_count,
-                'updated_count': updated_count,
-                'in_house_count': in_house_count,
-                'first_courtesy_count': first_courtesy_count,
-                'second_courtesy_count': second_courtesy_count,
-                'departed_count': departed_count,
-                'total_actions': total_actions,
-            })
-    
-    # Sort by total actions descending
-    performance_data.sort(key=lambda x: x['total_actions'], reverse=True)
+    performance_data = _agent_performance(start_date_str, end_date_str, property_filter, user_filter)
     
     # Get unique properties and users for filter dropdowns
     properties = ArrivalRecord.objects.exclude(property_name__isnull=True).exclude(
@@ -1632,122 +1649,36 @@ def report_overdue_actions(request):
         start_date = start_date_obj.isoformat()
         end_date = end_date_obj.isoformat()
     
-    # Convert end date to next day for inclusive filtering
-    end_date_obj_inclusive = end_date_obj + timedelta(days=1)
-    
-    # Build base queryset for overdue first courtesy calls
-    overdue_first_qs = ArrivalRecord.objects.filter(
-        first_courtesy_due_at__lt=now,
-        first_courtesy_done_at__isnull=True,
-        arrival_date__gte=start_date_obj,
-        arrival_date__lte=end_date_obj
-    ).exclude(status__iexact='Departed')
-    
-    # Build base queryset for overdue second courtesy calls
-    overdue_second_qs = ArrivalRecord.objects.filter(
-        second_courtesy_due_at__lt=now,
-        second_courtesy_done_at__isnull=True,
-        arrival_date__gte=start_date_obj,
-        arrival_date__lte=end_date_obj
-    ).exclude(status__iexact='Departed')
-    
-    # Build base queryset for overdue departures
-    overdue_departures_qs = ArrivalRecord.objects.filter(
-        departure_date__lt=now.date(),
-        departure_date__gte=start_date_obj,
-        departure_date__lte=end_date_obj
-    ).filter(
-        Q(status__iexact='In-House') | Q(status__iexact='in house')
-    )
-    
-    # Apply property filter
-    if property_filter:
-        overdue_first_qs = overdue_first_qs.filter(property_name__icontains=property_filter)
-        overdue_second_qs = overdue_second_qs.filter(property_name__icontains=property_filter)
-        overdue_departures_qs = overdue_departures_qs.filter(property_name__icontains=property_filter)
-    
-    # Apply search filter (room, guest name)
-    if search_filter:
-        overdue_first_qs = overdue_first_qs.filter(
-            Q(room__icontains=search_filter) |
-            Q(guest_name__icontains=search_filter) |
-            Q(confirmation_number__icontains=search_filter)
-        )
-        overdue_second_qs = overdue_second_qs.filter(
-            Q(room__icontains=search_filter) |
-            Q(guest_name__icontains=search_filter) |
-            Q(confirmation_number__icontains=search_filter)
-        )
-        overdue_departures_qs = overdue_departures_qs.filter(
-            Q(room__icontains=search_filter) |
-            Q(guest_name__icontains=search_filter) |
-            Q(confirmation_number__icontains=search_filter)
-        )
+    overdue = _overdue_actions(now, start_date_obj, end_date_obj, property_filter, search_filter, min_overdue_hours)
     
     # Calculate how overdue
-    overdue_first_list = []
-    for record in overdue_first_qs:
-        if record.first_courtesy_due_at:
-            delta = now - record.first_courtesy_due_at
-            overdue_hours = delta.total_seconds() / 3600
-            
-            # Apply minimum overdue hours filter
-            if min_overdue_hours:
-                try:
-                    min_hours = float(min_overdue_hours)
-                    if overdue_hours < min_hours:
-                        continue
-                except (ValueError, TypeError):
-                    pass
-            
-            overdue_first_list.append({
+    def overdue_items(qs, due_field):
+        items = []
+        for record in qs:
+            delta = now - getattr(record, due_field)
+            items.append({
                 'record': record,
                 'overdue_minutes': delta.total_seconds() / 60,
-                'overdue_hours': overdue_hours,
-                'overdue_days': delta.days,
-            })
-    
-    overdue_second_list = []
-    for record in overdue_second_qs:
-        if record.second_courtesy_due_at:
-            delta = now - record.second_courtesy_due_at
-            overdue_hours = delta.total_seconds() / 3600
-            
-            # Apply minimum overdue hours filter
-            if min_overdue_hours:
-                try:
-                    min_hours = float(min_overdue_hours)
-                    if overdue_hours < min_hours:
-                        continue
-                except (ValueError, TypeError):
-                    pass
-            
-            overdue_second_list.append({
-                'record': record,
-                'overdue_minutes': delta.total_seconds() / 60,
-                'overdue_hours': overdue_hours,
+                'overdue_hours': delta.total_seconds() / 3600,
                 'overdue_days': delta.days,
             })
+        return items
+    
+    overdue_in_house_list = overdue_items(overdue['in_house'], 'in_house_deadline')
+    overdue_first_list = overdue_items(overdue['first_courtesy'], 'first_courtesy_due_at')
+    overdue_second_list = overdue_items(overdue['second_courtesy'], 'second_courtesy_due_at')
+    overdue_departures_list = [
+        {'record': record, 'overdue_days': (today - record.departure_date).days}
+        for record in overdue['departures']
+    ]
     
-    overdue_departures_list = []
-    for record in overdue_departures_qs:
-        if record.departure_date:
-            delta = now.date() - record.departure_date
-            overdue_hours = delta.days * 24  # Convert days to hours
-            
-            # Apply minimum overdue hours filter
-            if min_overdue_hours:
-                try:
-                    min_hours = float(min_overdue_hours)
-                    if overdue_hours < min_hours:
-                        continue
-                except (ValueError, TypeError):
-                    pass
-            
-            overdue_departures_list.append({
-                'record': record,
-                'overdue_days': delta.days,
-            })
+    # Overdue counts over the report period, from the periodic snapshots
+    trend_start = timezone.make_aware(datetime.combine(start_date_obj, datetime.min.time()))
+    trend_end = timezone.make_aware(datetime.combine(end_date_obj + timedelta(days=1), datetime.min.time()))
+    overdue_trend_points = [
+        {**point, 'taken_at': timezone.localtime(point['taken_at']).strftime('%Y-%m-%d %H:%M')}
+        for point in overdue_trend(trend_start, trend_end, property_filter)
+    ]
     
     # Get unique properties for filter dropdown
     properties = ArrivalRecord.objects.exclude(property_name__isnull=True).exclude(
@@ -1758,9 +1689,11 @@ def report_overdue_actions(request):
         "section": "guest_experience",
         "subsection": "reports",
         "page_title": "Overdue Actions & Service Lapses",
+        "overdue_in_house": overdue_in_house_list,
         "overdue_first": overdue_first_list,
         "overdue_second": overdue_second_list,
         "overdue_departures": overdue_departures_list,
+        "overdue_trend": overdue_trend_points,
         "property_filter": property_filter,
         "search_filter": search_filter,
         "min_overdue_hours": min_overdue_hours,
@@ -1862,6 +1795,36 @@ def report_guest_feedback(request):
     return render(request, "guest_experience/reports/guest_feedback.html", context)
 
 
+def _report_date(value):
+    """A YYYY-MM-DD report filter as a date; None when empty or invalid, which the reports ignore."""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except (ValueError, TypeError):
+        return None
+
+
+def _nationality_breakdown(start_date_str, end_date_str):
+    """
+    Arrival counts by nationality, country and travel agent for the
+    nationality report and its export, largest first, from the monthly
+    arrival rollups. Nationalities are grouped by their normalized code.
+    """
+    start_date = _report_date(start_date_str)
+    end_date = _report_date(end_date_str)
+
+    def breakdown(field, name):
+        return [
+            {name: total[field], 'count': total['arrivals']}
+            for total in arrival_totals([field], start_date, end_date) if total[field]
+        ]
+
+    return (
+        breakdown('nationality_code', 'nationality'),
+        breakdown('country', 'country'),
+        breakdown('travel_agent_name', 'travel_agent_name'),
+    )
+
+
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 def report_nationality_country_breakdown(request):
@@ -1870,42 +1833,7 @@ def report_nationality_country_breakdown(request):
     start_date_str = request.GET.get('start_date', '')
     end_date_str = request.GET.get('end_date', '')
     
-    qs = ArrivalRecord.objects.all()
-    
-    if start_date_str:
-        try:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-            qs = qs.filter(arrival_date__gte=start_date)
-        except (ValueError, TypeError):
-            pass
-    
-    if end_date_str:
-        try:
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-            qs = qs.filter(arrival_date__lte=end_date)
-        except (ValueError, TypeError):
-            pass
-    
-    # Nationality breakdown
-    nationality_breakdown = qs.exclude(nationality__isnull=True).exclude(
-        nationality=''
-    ).values('nationality').annotate(
-        count=Count('id')
-    ).order_by('-count')
-    
-    # Country breakdown
-    country_breakdown = qs.exclude(country__isnull=True).exclude(
-        country=''
-    ).values('country').annotate(
-        count=Count('id')
-    ).order_by('-count')
-    
-    # Travel agent breakdown
-    agent_breakdown = qs.exclude(travel_agent_name__isnull=True).exclude(
-        travel_agent_name=''
-    ).values('travel_agent_name').annotate(
-        count=Count('id')
-    ).order_by('-count')
+    nationality_breakdown, country_breakdown, agent_breakdown = _nationality_breakdown(start_date_str, end_date_str)
     
     context = {
         "section": "guest_experience",
@@ -1920,6 +1848,47 @@ def report_nationality_country_breakdown(request):
     return render(request, "guest_experience/reports/nationality_country_breakdown.html", context)
 
 
+def _length_of_stay(property_filter, nationality_filter, start_date_str, end_date_str):
+    """
+    Overall, per-property and per-nationality stay statistics and the
+    distribution of nights for the length of stay report and its export,
+    from the monthly arrival rollups, which keep stays to the exact night.
+    """
+    filters = {'stay_nights__isnull': False}
+    if property_filter:
+        filters['property_name__icontains'] = property_filter
+    if nationality_filter:
+        filters['nationality_code__icontains'] = nationality_filter
+    start_date = _report_date(start_date_str)
+    end_date = _report_date(end_date_str)
+
+    def stats(total):
+        return {
+            'avg_nights': total['nights_total'] / total['arrivals'],
+            'min_nights': total['min_nights'],
+            'max_nights': total['max_nights'],
+        }
+
+    def grouped(field, name):
+        return [
+            {name: total[field], **stats(total), 'count': total['arrivals']}
+            for total in arrival_totals([field], start_date, end_date, filters) if total[field]
+        ]
+
+    overall = arrival_totals((), start_date, end_date, filters)
+    if overall:
+        overall_stats = {**stats(overall[0]), 'total_guests': overall[0]['arrivals']}
+    else:
+        overall_stats = {'avg_nights': None, 'min_nights': None, 'max_nights': None, 'total_guests': 0}
+
+    distribution = sorted(
+        ({'nights': total['stay_nights'], 'count': total['arrivals']}
+         for total in arrival_totals(['stay_nights'], start_date, end_date, filters)),
+        key=lambda item: item['nights'],
+    )
+    return overall_stats, grouped('property_name', 'property_name'), grouped('nationality_code', 'nationality'), distribution
+
+
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 def report_length_of_stay(request):
@@ -1930,60 +1899,10 @@ def report_length_of_stay(request):
     start_date_str = request.GET.get('start_date', '')
     end_date_str = request.GET.get('end_date', '')
     
-    qs = ArrivalRecord.objects.exclude(nights__isnull=True)
-    
-    if property_filter:
-        qs = qs.filter(property_name__icontains=property_filter)
-    if nationality_filter:
-        qs = qs.filter(nationality__icontains=nationality_filter)
-    if start_date_str:
-        try:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-            qs = qs.filter(arrival_date__gte=start_date)
-        except (ValueError, TypeError):
-            pass
-    if end_date_str:
-        try:
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-            qs = qs.filter(arrival_date__lte=end_date)
-        except (ValueError, TypeError):
-            pass
-    
-    # Calculate statistics
-    from django.db.models import Avg, Min, Max, Count
-    
-    overall_stats = qs.aggregate(
-        avg_nights=Avg('nights'),
-        min_nights=Min('nights'),
-        max_nights=Max('nights'),
-        total_guests=Count('id')
+    overall_stats, by_property, by_nationality, distribution_raw = _length_of_stay(
+        property_filter, nationality_filter, start_date_str, end_date_str
     )
     
-    # By property
-    by_property = qs.exclude(property_name__isnull=True).exclude(
-        property_name=''
-    ).values('property_name').annotate(
-        avg_nights=Avg('nights'),
-        min_nights=Min('nights'),
-        max_nights=Max('nights'),
-        count=Count('id')
-    ).order_by('-count')
-    
-    # By nationality
-    by_nationality = qs.exclude(nationality__isnull=True).exclude(
-        nationality=''
-    ).values('nationality').annotate(
-        avg_nights=Avg('nights'),
-        min_nights=Min('nights'),
-        max_nights=Max('nights'),
-        count=Count('id')
-    ).order_by('-count')
-    
-    # Distribution (1 night, 2 nights, etc.)
-    distribution_raw = qs.values('nights').annotate(
-        count=Count('id')
-    ).order_by('nights')
-    
     # Calculate percentages for distribution
     total_guests = overall_stats['total_guests'] or 1
     distribution = []
@@ -1995,13 +1914,13 @@ def report_length_of_stay(request):
             'percentage': round(percentage, 1),
         })
     
-    properties = ArrivalRecord.objects.exclude(property_name__isnull=True).exclude(
-        property_name=''
-    ).values_list('property_name', flat=True).distinct().order_by('property_name')
+    properties = ArrivalRollup.objects.exclude(property_name='').values_list(
+        'property_name', flat=True
+    ).distinct().order_by('property_name')
     
-    nationalities = ArrivalRecord.objects.exclude(nationality__isnull=True).exclude(
-        nationality=''
-    ).values_list('nationality', flat=True).distinct().order_by('nationality')
+    nationalities = ArrivalRollup.objects.exclude(nationality_code='').values_list(
+        'nationality_code', flat=True
+    ).distinct().order_by('nationality_code')
     
     context = {
         "section": "guest_experience",
@@ -2051,21 +1970,18 @@ def report_contact_completeness(request):
         Q(email__isnull=True) | Q(email='')
     )
     
-    # Validate email format (basic check)
-    import re
-    email_pattern = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+    # Email format is checked by the database (basic check)
+    invalid_email = all_records.filter(INVALID_EMAIL)
     
-    invalid_email = []
-    for record in all_records.exclude(email__isnull=True).exclude(email=''):
-        if not email_pattern.match(record.email):
-            invalid_email.append(record)
-    
-    total_count = all_records.count()
-    missing_phone_count = missing_phone.count()
-    missing_email_count = missing_email.count()
-    missing_both_count = missing_both.count()
-    has_both_count = has_both.count()
-    invalid_email_count = len(invalid_email)
+    # Counts come from the monthly rollups rather than counting every record
+    totals = arrival_totals()
+    totals = totals[0] if totals else dict.fromkeys(ROLLUP_MEASURES, 0)
+    total_count = totals['arrivals']
+    missing_phone_count = totals['missing_phone']
+    missing_email_count = totals['missing_email']
+    missing_both_count = totals['missing_both']
+    has_both_count = total_count - missing_phone_count - missing_email_count + missing_both_count
+    invalid_email_count = totals['invalid_email']
     
     context = {
         "section": "guest_experience",
@@ -2090,33 +2006,54 @@ def report_contact_completeness(request):
 
 # ==================== EXPORT FUNCTIONS ====================
 
-def _create_excel_workbook():
-    """Helper function to create a styled Excel workbook."""
-    if not OPENPYXL_AVAILABLE:
-        raise ImportError("openpyxl is not installed. Please install it to use Excel export.")
-    
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    
-    # Define styles
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    return wb, ws, header_fill, header_font, border
+EXCEL_UNAVAILABLE_MESSAGE = "Excel export requires xlsxwriter. Please install it."
+
+
+def _overdue_actions(now, start_date, end_date, property_filter, search_filter, min_overdue_hours):
+    """
+    Overdue querysets by action for the overdue actions report and export:
+    arrivals in the date range, or departures for departures.
+    """
+    try:
+        min_hours = float(min_overdue_hours) if min_overdue_hours else None
+    except (ValueError, TypeError):
+        min_hours = None
+    overdue = overdue_querysets(now, min_hours)
+    for action, qs in overdue.items():
+        date_field = 'departure_date' if action == 'departures' else 'arrival_date'
+        qs = qs.filter(**{f'{date_field}__gte': start_date, f'{date_field}__lte': end_date})
+        if property_filter:
+            qs = qs.filter(property_name__icontains=property_filter)
+        if search_filter:
+            qs = qs.filter(
+                Q(room__icontains=search_filter) |
+                Q(guest_name__icontains=search_filter) |
+                Q(confirmation_number__icontains=search_filter)
+            )
+        overdue[action] = qs
+    return overdue
+
+
+def _iter_overdue_calls(qs, due_field, now):
+    """Yield overdue rows, timed from ``due_field``."""
+    for room, guest_name, due_at in qs.values_list('room', 'guest_name', due_field).iterator():
+        delta = now - due_at
+        yield [
+            room or '',
+            guest_name or '',
+            due_at.strftime('%Y-%m-%d %H:%M'),
+            delta.days,
+            round(delta.total_seconds() / 3600, 1),
+            round(delta.total_seconds() / 60, 1),
+        ]
 
 
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 def export_arrivals_departures(request):
     """Export Arrivals & Departures Report to Excel"""
-    if not OPENPYXL_AVAILABLE:
-        return HttpResponse("Excel export requires openpyxl. Please install it.", status=500)
+    if not XLSXWRITER_AVAILABLE:
+        return HttpResponse(EXCEL_UNAVAILABLE_MESSAGE, status=500)
     
     today = timezone.localdate()
     start_date_str = request.GET.get('start_date', (today - timedelta(days=7)).isoformat())
@@ -2146,52 +2083,22 @@ def export_arrivals_departures(request):
     
     records = qs.order_by('arrival_date', 'room')
     
-    wb, ws, header_fill, header_font, border = _create_excel_workbook()
-    ws.title = "Arrivals & Departures"
-    
-    # Headers
+    book = StreamingWorkbook()
     headers = ['Property', 'Room', 'Guest Name', 'Arrival Date', 'Departure Date', 'Status']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    # Data
-    for row_idx, record in enumerate(records, 2):
-        ws.cell(row=row_idx, column=1, value=record.property_name or '')
-        ws.cell(row=row_idx, column=2, value=record.room or '')
-        ws.cell(row=row_idx, column=3, value=record.guest_name or '')
-        ws.cell(row=row_idx, column=4, value=record.arrival_date.strftime('%Y-%m-%d') if record.arrival_date else '')
-        ws.cell(row=row_idx, column=5, value=record.departure_date.strftime('%Y-%m-%d') if record.departure_date else '')
-        ws.cell(row=row_idx, column=6, value=record.status or '')
-    
-    # Auto-adjust column widths
-    for col in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(col)].width = 20
-    
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="arrivals_departures_{start_date}_{end_date}.xlsx"'
-    return response
+    book.add_sheet("Arrivals & Departures", headers, iter_queryset_rows(
+        records, ['property_name', 'room', 'guest_name', 'arrival_date', 'departure_date', 'status']
+    ))
+    return book.as_response(f"arrivals_departures_{start_date}_{end_date}.xlsx")
 
 
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 def export_courtesy_call_completion(request):
     """Export Courtesy Call Completion Report to Excel"""
-    if not OPENPYXL_AVAILABLE:
-        return HttpResponse("Excel export requires openpyxl. Please install it.", status=500)
+    if not XLSXWRITER_AVAILABLE:
+        return HttpResponse(EXCEL_UNAVAILABLE_MESSAGE, status=500)
     
     today = timezone.localdate()
-    now = timezone.now()
     start_date_str = request.GET.get('start_date', (today - timedelta(days=30)).isoformat())
     end_date_str = request.GET.get('end_date', today.isoformat())
     property_filter = request.GET.get('property', '')
@@ -2217,66 +2124,46 @@ def export_courtesy_call_completion(request):
             Q(second_courtesy_by__username__icontains=courtesy_by_filter)
         )
     
-    wb, ws, header_fill, header_font, border = _create_excel_workbook()
-    ws.title = "Courtesy Call Completion"
+    fields = [
+        'room', 'guest_name', 'first_courtesy_due_at', 'first_courtesy_done_at', 'first_courtesy_outcome',
+        'second_courtesy_due_at', 'second_courtesy_done_at', 'second_courtesy_outcome',
+        'first_courtesy_notes', 'second_courtesy_notes',
+    ]
     
+    def rows():
+        for (room, guest_name, first_due, first_done, first_outcome,
+             second_due, second_done, second_outcome, first_notes, second_notes) in iter_queryset_rows(qs, fields):
+            first_time_minutes = None
+            if first_done and first_due:
+                first_time_minutes = (first_done - first_due).total_seconds() / 60
+            first_status = "Completed" if first_done else ("Pending" if first_due else "Not Scheduled")
+            second_status = "Completed" if second_done else ("Pending" if second_due else "Not Scheduled")
+            yield [
+                room or '',
+                guest_name or '',
+                first_status,
+                round(first_time_minutes, 1) if first_time_minutes else '',
+                round(first_time_minutes / 60, 1) if first_time_minutes else '',
+                first_outcome or '',
+                second_status,
+                second_outcome or '',
+                first_notes or '',
+                second_notes or '',
+            ]
+    
+    book = StreamingWorkbook()
     headers = ['Room', 'Guest Name', 'First Call Status', 'First Call Time (min)', 'First Call Time (hrs)', 
                'First Outcome', 'Second Call Status', 'Second Outcome', 'First Notes', 'Second Notes']
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    for record in qs:
-        first_completed = record.first_courtesy_done_at is not None
-        second_completed = record.second_courtesy_done_at is not None
-        first_time_minutes = None
-        first_time_hours = None
-        if first_completed and record.first_courtesy_due_at:
-            delta = record.first_courtesy_done_at - record.first_courtesy_due_at
-            first_time_minutes = delta.total_seconds() / 60
-            first_time_hours = first_time_minutes / 60
-        
-        first_status = "Completed" if first_completed else ("Pending" if record.first_courtesy_due_at else "Not Scheduled")
-        second_status = "Completed" if second_completed else ("Pending" if record.second_courtesy_due_at else "Not Scheduled")
-        
-        ws.cell(row=row_idx, column=1, value=record.room or '')
-        ws.cell(row=row_idx, column=2, value=record.guest_name or '')
-        ws.cell(row=row_idx, column=3, value=first_status)
-        ws.cell(row=row_idx, column=4, value=round(first_time_minutes, 1) if first_time_minutes else '')
-        ws.cell(row=row_idx, column=5, value=round(first_time_hours, 1) if first_time_hours else '')
-        ws.cell(row=row_idx, column=6, value=record.first_courtesy_outcome or '')
-        ws.cell(row=row_idx, column=7, value=second_status)
-        ws.cell(row=row_idx, column=8, value=record.second_courtesy_outcome or '')
-        ws.cell(row=row_idx, column=9, value=record.first_courtesy_notes or '')
-        ws.cell(row=row_idx, column=10, value=record.second_courtesy_notes or '')
-        row_idx += 1
-    
-    for col in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(col)].width = 20
-    
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="courtesy_call_completion_{start_date}_{end_date}.xlsx"'
-    return response
+    book.add_sheet("Courtesy Call Completion", headers, rows())
+    return book.as_response(f"courtesy_call_completion_{start_date}_{end_date}.xlsx")
 
 
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 def export_in_house_guests(request):
     """Export In-House Guests Report to Excel"""
-    if not OPENPYXL_AVAILABLE:
-        return HttpResponse("Excel export requires openpyxl. Please install it.", status=500)
+    if not XLSXWRITER_AVAILABLE:
+        return HttpResponse(EXCEL_UNAVAILABLE_MESSAGE, status=500)
     
     property_filter = request.GET.get('property', '')
     start_date_str = request.GET.get('in_house_since_start', '')
@@ -2302,55 +2189,33 @@ def export_in_house_guests(request):
             pass
     
     records = qs.order_by('room')
+    now = timezone.now()
     
-    wb, ws, header_fill, header_font, border = _create_excel_workbook()
-    ws.title = "In-House Guests"
-    
+    def rows():
+        for room, guest_name, in_house_since, nights, status in iter_queryset_rows(
+            records, ['room', 'guest_name', 'in_house_since', 'nights', 'status']
+        ):
+            yield [
+                room or '',
+                guest_name or '',
+                in_house_since,
+                (now - in_house_since).days if in_house_since else '',
+                nights if nights else '',
+                status or '',
+            ]
+    
+    book = StreamingWorkbook()
     headers = ['Room', 'Guest Name', 'In-House Since', 'Nights In-House', 'Total Nights', 'Status']
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    for record in records:
-        nights_in_house = None
-        if record.in_house_since:
-            delta = timezone.now() - record.in_house_since
-            nights_in_house = delta.days
-        
-        ws.cell(row=row_idx, column=1, value=record.room or '')
-        ws.cell(row=row_idx, column=2, value=record.guest_name or '')
-        ws.cell(row=row_idx, column=3, value=record.in_house_since.strftime('%Y-%m-%d %H:%M') if record.in_house_since else '')
-        ws.cell(row=row_idx, column=4, value=nights_in_house if nights_in_house is not None else '')
-        ws.cell(row=row_idx, column=5, value=record.nights if record.nights else '')
-        ws.cell(row=row_idx, column=6, value=record.status or '')
-        row_idx += 1
-    
-    for col in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(col)].width = 20
-    
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename="in_house_guests.xlsx"'
-    return response
+    book.add_sheet("In-House Guests", headers, rows())
+    return book.as_response("in_house_guests.xlsx")
 
 
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 def export_departure_outcomes(request):
     """Export Departure Outcomes Report to Excel"""
-    if not OPENPYXL_AVAILABLE:
-        return HttpResponse("Excel export requires openpyxl. Please install it.", status=500)
+    if not XLSXWRITER_AVAILABLE:
+        return HttpResponse(EXCEL_UNAVAILABLE_MESSAGE, status=500)
     
     today = timezone.localdate()
     start_date_str = request.GET.get('start_date', (today - timedelta(days=30)).isoformat())
@@ -2378,52 +2243,33 @@ def export_departure_outcomes(request):
     
     records = qs.order_by('-departed_at')
     
-    wb, ws, header_fill, header_font, border = _create_excel_workbook()
-    ws.title = "Departure Outcomes"
-    
+    def rows():
+        for departed_at, departed_by, room, guest_name, method, message_sent, notes in iter_queryset_rows(
+            records, ['departed_at', 'departed_by__username', 'room', 'guest_name',
+                      'departure_method', 'message_sent_to_guest', 'departure_notes']
+        ):
+            yield [
+                departed_at,
+                departed_by or '',
+                room or '',
+                guest_name or '',
+                method or '',
+                'Yes' if message_sent else 'No',
+                notes or '',
+            ]
+    
+    book = StreamingWorkbook()
     headers = ['Departed At', 'Departed By', 'Room', 'Guest Name', 'Departure Method', 'Message Sent', 'Notes']
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    for record in records:
-        ws.cell(row=row_idx, column=1, value=record.departed_at.strftime('%Y-%m-%d %H:%M') if record.departed_at else '')
-        ws.cell(row=row_idx, column=2, value=record.departed_by.username if record.departed_by else '')
-        ws.cell(row=row_idx, column=3, value=record.room or '')
-        ws.cell(row=row_idx, column=4, value=record.guest_name or '')
-        ws.cell(row=row_idx, column=5, value=record.departure_method or '')
-        ws.cell(row=row_idx, column=6, value='Yes' if record.message_sent_to_guest else 'No')
-        ws.cell(row=row_idx, column=7, value=record.departure_notes or '')
-        row_idx += 1
-    
-    for col in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(col)].width = 20
-    
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="departure_outcomes_{start_date}_{end_date}.xlsx"'
-    return response
+    book.add_sheet("Departure Outcomes", headers, rows())
+    return book.as_response(f"departure_outcomes_{start_date}_{end_date}.xlsx")
 
 
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 def export_agent_performance(request):
     """Export Agent Performance Report to Excel"""
-    if not OPENPYXL_AVAILABLE:
-        return HttpResponse("Excel export requires openpyxl. Please install it.", status=500)
-    
-    from django.contrib.auth.models import User
+    if not XLSXWRITER_AVAILABLE:
+        return HttpResponse(EXCEL_UNAVAILABLE_MESSAGE, status=500)
     
     # Get filters
     start_date_str = request.GET.get('start_date', '')
@@ -2431,130 +2277,34 @@ def export_agent_performance(request):
     property_filter = request.GET.get('property', '')
     user_filter = request.GET.get('user', '')
     
-    # Get users with optional filter
-    users_query = User.objects.filter(
-        Q(arrival_records_created__isnull=False) |
-        Q(arrival_records_updated__isnull=False) |
-        Q(arrival_records_in_house__isnull=False) |
-        Q(arrival_records_first_courtesy__isnull=False) |
-        Q(arrival_records_second_courtesy__isnull=False) |
-        Q(arrival_records_departed__isnull=False)
-    )
-    
-    if user_filter:
-        users_query = users_query.filter(username__icontains=user_filter)
-    
-    users = users_query.distinct().order_by('username')
-    
-    wb, ws, header_fill, header_font, border = _create_excel_workbook()
-    ws.title = "Agent Performance"
-    
-    headers = ['Agent', 'Created', 'Updated', 'Marked In-House', 'First Courtesy', 'Second Courtesy', 'Departed', 'Total Actions']
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    for user in users:
-        # Build querysets with filters
-        created_qs = ArrivalRecord.objects.filter(created_by=user)
-        updated_qs = ArrivalRecord.objects.filter(updated_by=user)
-        in_house_qs = ArrivalRecord.objects.filter(in_house_by=user)
-        first_courtesy_qs = ArrivalRecord.objects.filter(first_courtesy_by=user)
-        second_courtesy_qs = ArrivalRecord.objects.filter(second_courtesy_by=user)
-        departed_qs = ArrivalRecord.objects.filter(departed_by=user)
-        
-        # Apply property filter
-        if property_filter:
-            created_qs = created_qs.filter(property_name__icontains=property_filter)
-            updated_qs = updated_qs.filter(property_name__icontains=property_filter)
-            in_house_qs = in_house_qs.filter(property_name__icontains=property_filter)
-            first_courtesy_qs = first_courtesy_qs.filter(property_name__icontains=property_filter)
-            second_courtesy_qs = second_courtesy_qs.filter(property_name__icontains=property_filter)
-            departed_qs = departed_qs.filter(property_name__icontains=property_filter)
-        
-        # Apply date filters
-        if start_date_str:
-            try:
-                start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-                created_qs = created_qs.filter(created_at__date__gte=start_date)
-                updated_qs = updated_qs.filter(updated_at__date__gte=start_date)
-                in_house_qs = in_house_qs.filter(in_house_since__date__gte=start_date)
-                first_courtesy_qs = first_courtesy_qs.filter(first_courtesy_done_at__date__gte=start_date)
-                second_courtesy_qs = second_courtesy_qs.filter(second_courtesy_done_at__date__gte=start_date)
-                departed_qs = departed_qs.filter(departed_at__date__gte=start_date)
-            except (ValueError, TypeError):
-                pass
-        
-        if end_date_str:
-            try:
-                end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-                created_qs = created_qs.filter(created_at__date__lte=end_date)
-                updated_qs = updated_qs.filter(updated_at__date__lte=end_date)
-                in_house_qs = in_house_qs.filter(in_house_since__date__lte=end_date)
-                first_courtesy_qs = first_courtesy_qs.filter(first_courtesy_done_at__date__lte=end_date)
-                second_courtesy_qs = second_courtesy_qs.filter(second_courtesy_done_at__date__lte=end_date)
-                departed_qs = departed_qs.filter(departed_at__date__lte=end_date)
-            except (ValueError, TypeError):
-                pass
-        
-        created_count = created_qs.count()
-        updated_count = updated_qs.count()
-        in_house_count = in_house_qs.count()
-        first_courtesy_count = first_courtesy_qs.count()
-        second_courtesy_count = second_courtesy_qs.count()
-        departed_count = departed_qs.count()
-        total_actions = created_count + updated_count + in_house_count + first_courtesy_count + second_courtesy_count + departed_count
-        
-        # Only include users with actions (if filters are applied)
-        if not start_date_str and not end_date_str and not property_filter and not user_filter:
-            # No filters - show all users
-            ws.cell(row=row_idx, column=1, value=user.username)
-            ws.cell(row=row_idx, column=2, value=created_count)
-            ws.cell(row=row_idx, column=3, value=updated_count)
-            ws.cell(row=row_idx, column=4, value=in_house_count)
-            ws.cell(row=row_idx, column=5, value=first_courtesy_count)
-            ws.cell(row=row_idx, column=6, value=second_courtesy_count)
-            ws.cell(row=row_idx, column=7, value=departed_count)
-            ws.cell(row=row_idx, column=8, value=total_actions)
-            row_idx += 1
-        elif total_actions > 0:
-            # Filters applied - only show users with actions in filtered period
-            ws.cell(row=row_idx, column=1, value=user.username)
-            ws.cell(row=row_idx, column=2, value=created_count)
-            ws.cell(row=row_idx, column=3, value=updated_count)
-            ws.cell(row=row_idx, column=4, value=in_house_count)
-            ws.cell(row=row_idx, column=5, value=first_courtesy_count)
-            ws.cell(row=row_idx, column=6, value=second_courtesy_count)
-            ws.cell(row=row_idx, column=7, value=departed_count)
-            ws.cell(row=row_idx, column=8, value=total_actions)
-            row_idx += 1
-    
-    for col in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(col)].width = 18
-    
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename="agent_performance.xlsx"'
-    return response
+    def rows():
+        for item in _agent_performance(start_date_str, end_date_str, property_filter, user_filter):
+            yield [
+                item['user'].username,
+                item['created_count'],
+                item['updated_count'],
+                item['in_house_count'],
+                item['first_courtesy_count'],
+                item['second_courtesy_count'],
+                item['departed_count'],
+                item['total_actions'],
+                item['avg_minutes_to_in_house'],
+                item['avg_courtesy_delay_minutes'],
+            ]
+    
+    book = StreamingWorkbook()
+    headers = ['Agent', 'Created', 'Updated', 'Marked In-House', 'First Courtesy', 'Second Courtesy', 'Departed', 'Total Actions',
+               'Avg Minutes to In-House', 'Avg Courtesy Delay (Minutes)']
+    book.add_sheet("Agent Performance", headers, rows())
+    return book.as_response("agent_performance.xlsx")
 
 
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 def export_overdue_actions(request):
     """Export Overdue Actions Report to Excel"""
-    if not OPENPYXL_AVAILABLE:
-        return HttpResponse("Excel export requires openpyxl. Please install it.", status=500)
+    if not XLSXWRITER_AVAILABLE:
+        return HttpResponse(EXCEL_UNAVAILABLE_MESSAGE, status=500)
     
     now = timezone.now()
     today = timezone.localdate()
@@ -2574,174 +2324,37 @@ def export_overdue_actions(request):
         start_date_obj = today - timedelta(days=30)
         end_date_obj = today
     
-    overdue_first_qs = ArrivalRecord.objects.filter(
-        first_courtesy_due_at__lt=now,
-        first_courtesy_done_at__isnull=True,
-        arrival_date__gte=start_date_obj,
-        arrival_date__lte=end_date_obj
-    ).exclude(status__iexact='Departed')
+    overdue = _overdue_actions(now, start_date_obj, end_date_obj, property_filter, search_filter, min_overdue_hours)
     
-    overdue_second_qs = ArrivalRecord.objects.filter(
-        second_courtesy_due_at__lt=now,
-        second_courtesy_done_at__isnull=True,
-        arrival_date__gte=start_date_obj,
-        arrival_date__lte=end_date_obj
-    ).exclude(status__iexact='Departed')
-    
-    overdue_departures_qs = ArrivalRecord.objects.filter(
-        departure_date__lt=now.date(),
-        departure_date__gte=start_date_obj,
-        departure_date__lte=end_date_obj
-    ).filter(
-        Q(status__iexact='In-House') | Q(status__iexact='in house')
-    )
-    
-    # Apply filters
-    if property_filter:
-        overdue_first_qs = overdue_first_qs.filter(property_name__icontains=property_filter)
-        overdue_second_qs = overdue_second_qs.filter(property_name__icontains=property_filter)
-        overdue_departures_qs = overdue_departures_qs.filter(property_name__icontains=property_filter)
-    
-    if search_filter:
-        overdue_first_qs = overdue_first_qs.filter(
-            Q(room__icontains=search_filter) |
-            Q(guest_name__icontains=search_filter) |
-            Q(confirmation_number__icontains=search_filter)
-        )
-        overdue_second_qs = overdue_second_qs.filter(
-            Q(room__icontains=search_filter) |
-            Q(guest_name__icontains=search_filter) |
-            Q(confirmation_number__icontains=search_filter)
-        )
-        overdue_departures_qs = overdue_departures_qs.filter(
-            Q(room__icontains=search_filter) |
-            Q(guest_name__icontains=search_filter) |
-            Q(confirmation_number__icontains=search_filter)
-        )
-    
-    wb, ws, header_fill, header_font, border = _create_excel_workbook()
-    ws.title = "Overdue First Calls"
+    def departure_rows():
+        for room, guest_name, departure_date in overdue['departures'].values_list(
+            'room', 'guest_name', 'departure_date'
+        ).iterator():
+            yield [room or '', guest_name or '', departure_date, (today - departure_date).days]
     
-    # First sheet - Overdue First Calls
+    book = StreamingWorkbook()
     headers = ['Room', 'Guest Name', 'Due At', 'Overdue (days)', 'Overdue (hours)', 'Overdue (minutes)']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    # Iterate directly over queryset - Django will evaluate it
-    for record in overdue_first_qs:
-        if record.first_courtesy_due_at:
-            delta = now - record.first_courtesy_due_at
-            overdue_hours = delta.total_seconds() / 3600
-            
-            # Apply minimum overdue hours filter
-            if min_overdue_hours:
-                try:
-                    min_hours = float(min_overdue_hours)
-                    if overdue_hours < min_hours:
-                        continue
-                except (ValueError, TypeError):
-                    pass
-            
-            ws.cell(row=row_idx, column=1, value=record.room or '')
-            ws.cell(row=row_idx, column=2, value=record.guest_name or '')
-            ws.cell(row=row_idx, column=3, value=record.first_courtesy_due_at.strftime('%Y-%m-%d %H:%M'))
-            ws.cell(row=row_idx, column=4, value=delta.days)
-            ws.cell(row=row_idx, column=5, value=round(delta.total_seconds() / 3600, 1))
-            ws.cell(row=row_idx, column=6, value=round(delta.total_seconds() / 60, 1))
-            row_idx += 1
-    
-    # Second sheet - Overdue Second Calls
-    ws2 = wb.create_sheet("Overdue Second Calls")
-    for col, header in enumerate(headers, 1):
-        cell = ws2.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    # Iterate directly over queryset - Django will evaluate it
-    for record in overdue_second_qs:
-        if record.second_courtesy_due_at:
-            delta = now - record.second_courtesy_due_at
-            overdue_hours = delta.total_seconds() / 3600
-            
-            # Apply minimum overdue hours filter
-            if min_overdue_hours:
-                try:
-                    min_hours = float(min_overdue_hours)
-                    if overdue_hours < min_hours:
-                        continue
-                except (ValueError, TypeError):
-                    pass
-            
-            ws2.cell(row=row_idx, column=1, value=record.room or '')
-            ws2.cell(row=row_idx, column=2, value=record.guest_name or '')
-            ws2.cell(row=row_idx, column=3, value=record.second_courtesy_due_at.strftime('%Y-%m-%d %H:%M'))
-            ws2.cell(row=row_idx, column=4, value=delta.days)
-            ws2.cell(row=row_idx, column=5, value=round(delta.total_seconds() / 3600, 1))
-            ws2.cell(row=row_idx, column=6, value=round(delta.total_seconds() / 60, 1))
-            row_idx += 1
-    
-    # Third sheet - Overdue Departures
-    ws3 = wb.create_sheet("Overdue Departures")
-    headers3 = ['Room', 'Guest Name', 'Departure Date', 'Overdue (days)']
-    for col, header in enumerate(headers3, 1):
-        cell = ws3.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    # Iterate directly over queryset - Django will evaluate it
-    for record in overdue_departures_qs:
-        if record.departure_date:
-            delta = now.date() - record.departure_date
-            overdue_hours = delta.days * 24  # Convert days to hours
-            
-            # Apply minimum overdue hours filter
-            if min_overdue_hours:
-                try:
-                    min_hours = float(min_overdue_hours)
-                    if overdue_hours < min_hours:
-                        continue
-                except (ValueError, TypeError):
-                    pass
-            
-            ws3.cell(row=row_idx, column=1, value=record.room or '')
-            ws3.cell(row=row_idx, column=2, value=record.guest_name or '')
-            ws3.cell(row=row_idx, column=3, value=record.departure_date.strftime('%Y-%m-%d'))
-            ws3.cell(row=row_idx, column=4, value=delta.days)
-            row_idx += 1
-    
-    for sheet in [ws, ws2, ws3]:
-        for col in range(1, 7):
-            sheet.column_dimensions[get_column_letter(col)].width = 20
-    
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename="overdue_actions.xlsx"'
-    return response
+    widths = [20] * len(headers)
+    book.add_sheet("Overdue In-House", headers, _iter_overdue_calls(
+        overdue['in_house'], 'in_house_deadline', now
+    ), widths=widths)
+    book.add_sheet("Overdue First Calls", headers, _iter_overdue_calls(
+        overdue['first_courtesy'], 'first_courtesy_due_at', now
+    ), widths=widths)
+    book.add_sheet("Overdue Second Calls", headers, _iter_overdue_calls(
+        overdue['second_courtesy'], 'second_courtesy_due_at', now
+    ), widths=widths)
+    book.add_sheet("Overdue Departures", ['Room', 'Guest Name', 'Departure Date', 'Overdue (days)'],
+                   departure_rows(), widths=widths)
+    return book.as_response("overdue_actions.xlsx")
 
 
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 def export_guest_feedback(request):
     """Export Guest Feedback Report to Excel"""
-    if not OPENPYXL_AVAILABLE:
-        return HttpResponse("Excel export requires openpyxl. Please install it.", status=500)
+    if not XLSXWRITER_AVAILABLE:
+        return HttpResponse(EXCEL_UNAVAILABLE_MESSAGE, status=500)
     
     today = timezone.localdate()
     
@@ -2757,368 +2370,115 @@ def export_guest_feedback(request):
         start_date_obj = today - timedelta(days=30)
         end_date_obj = today
     
-    records_with_first_notes = ArrivalRecord.objects.filter(
-        arrival_date__gte=start_date_obj,
-        arrival_date__lte=end_date_obj
-    ).exclude(
-        first_courtesy_notes__isnull=True
-    ).exclude(first_courtesy_notes='')
-    
-    records_with_second_notes = ArrivalRecord.objects.filter(
+    base_qs = ArrivalRecord.objects.filter(
         arrival_date__gte=start_date_obj,
         arrival_date__lte=end_date_obj
-    ).exclude(
-        second_courtesy_notes__isnull=True
-    ).exclude(second_courtesy_notes='')
+    )
     
-    records_with_departure_notes = ArrivalRecord.objects.filter(
-        arrival_date__gte=start_date_obj,
-        arrival_date__lte=end_date_obj
-    ).exclude(
-        departure_notes__isnull=True
-    ).exclude(departure_notes='')
+    # Each note type becomes a (date, type, room, guest, outcome, notes) row
+    first_notes = base_qs.exclude(first_courtesy_notes='').values_list(
+        'first_courtesy_done_at', models.Value('First Courtesy'), 'room', 'guest_name',
+        'first_courtesy_outcome', 'first_courtesy_notes'
+    )
+    second_notes = base_qs.exclude(second_courtesy_notes='').values_list(
+        'second_courtesy_done_at', models.Value('Second Courtesy'), 'room', 'guest_name',
+        'second_courtesy_outcome', 'second_courtesy_notes'
+    )
+    departure_notes = base_qs.exclude(departure_notes='').values_list(
+        'departed_at', models.Value('Departure'), 'room', 'guest_name',
+        models.Value(''), 'departure_notes'
+    )
     
-    wb, ws, header_fill, header_font, border = _create_excel_workbook()
-    ws.title = "Guest Feedback"
+    # Undated notes sort as if written now, i.e. first
+    all_notes = sorted(
+        list(first_notes) + list(second_notes) + list(departure_notes),
+        key=lambda x: x[0] if x[0] else timezone.now(),
+        reverse=True
+    )
     
+    book = StreamingWorkbook()
     headers = ['Date', 'Type', 'Room', 'Guest Name', 'Outcome', 'Notes']
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    all_notes = []
-    
-    for record in records_with_first_notes:
-        if record.first_courtesy_notes:
-            all_notes.append({
-                'date': record.first_courtesy_done_at,
-                'type': 'First Courtesy',
-                'room': record.room,
-                'guest': record.guest_name,
-                'outcome': record.first_courtesy_outcome,
-                'notes': record.first_courtesy_notes,
-            })
-    
-    for record in records_with_second_notes:
-        if record.second_courtesy_notes:
-            all_notes.append({
-                'date': record.second_courtesy_done_at,
-                'type': 'Second Courtesy',
-                'room': record.room,
-                'guest': record.guest_name,
-                'outcome': record.second_courtesy_outcome,
-                'notes': record.second_courtesy_notes,
-            })
-    
-    for record in records_with_departure_notes:
-        if record.departure_notes:
-            all_notes.append({
-                'date': record.departed_at,
-                'type': 'Departure',
-                'room': record.room,
-                'guest': record.guest_name,
-                'outcome': None,
-                'notes': record.departure_notes,
-            })
-    
-    all_notes.sort(key=lambda x: x['date'] if x['date'] else timezone.now(), reverse=True)
-    
-    for note in all_notes:
-        ws.cell(row=row_idx, column=1, value=note['date'].strftime('%Y-%m-%d %H:%M') if note['date'] else '')
-        ws.cell(row=row_idx, column=2, value=note['type'])
-        ws.cell(row=row_idx, column=3, value=note['room'] or '')
-        ws.cell(row=row_idx, column=4, value=note['guest'] or '')
-        ws.cell(row=row_idx, column=5, value=note['outcome'] or '')
-        ws.cell(row=row_idx, column=6, value=note['notes'])
-        row_idx += 1
-    
-    for col in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(col)].width = 25
-    
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename="guest_feedback.xlsx"'
-    return response
+    book.add_sheet("Guest Feedback", headers, all_notes)
+    return book.as_response("guest_feedback.xlsx")
 
 
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 def export_nationality_country_breakdown(request):
     """Export Nationality, Country & Market Source Breakdown to Excel"""
-    if not OPENPYXL_AVAILABLE:
-        return HttpResponse("Excel export requires openpyxl. Please install it.", status=500)
+    if not XLSXWRITER_AVAILABLE:
+        return HttpResponse(EXCEL_UNAVAILABLE_MESSAGE, status=500)
     
     start_date_str = request.GET.get('start_date', '')
     end_date_str = request.GET.get('end_date', '')
     
-    qs = ArrivalRecord.objects.all()
+    nationality_breakdown, country_breakdown, agent_breakdown = _nationality_breakdown(start_date_str, end_date_str)
     
-    if start_date_str:
-        try:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-            qs = qs.filter(arrival_date__gte=start_date)
-        except (ValueError, TypeError):
-            pass
-    
-    if end_date_str:
-        try:
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-            qs = qs.filter(arrival_date__lte=end_date)
-        except (ValueError, TypeError):
-            pass
-    
-    nationality_breakdown = qs.exclude(nationality__isnull=True).exclude(
-        nationality=''
-    ).values('nationality').annotate(
-        count=Count('id')
-    ).order_by('-count')
-    
-    country_breakdown = qs.exclude(country__isnull=True).exclude(
-        country=''
-    ).values('country').annotate(
-        count=Count('id')
-    ).order_by('-count')
-    
-    agent_breakdown = qs.exclude(travel_agent_name__isnull=True).exclude(
-        travel_agent_name=''
-    ).values('travel_agent_name').annotate(
-        count=Count('id')
-    ).order_by('-count')
-    
-    wb, ws, header_fill, header_font, border = _create_excel_workbook()
-    ws.title = "Nationality Breakdown"
+    def breakdown(rows, field):
+        return ([row[field], row['count']] for row in rows)
     
+    book = StreamingWorkbook()
     headers = ['Nationality', 'Count']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    for item in nationality_breakdown:
-        ws.cell(row=row_idx, column=1, value=item['nationality'])
-        ws.cell(row=row_idx, column=2, value=item['count'])
-        row_idx += 1
-    
-    ws2 = wb.create_sheet("Country Breakdown")
-    for col, header in enumerate(headers, 1):
-        cell = ws2.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    for item in country_breakdown:
-        ws2.cell(row=row_idx, column=1, value=item['country'])
-        ws2.cell(row=row_idx, column=2, value=item['count'])
-        row_idx += 1
-    
-    ws3 = wb.create_sheet("Travel Agent Breakdown")
-    for col, header in enumerate(headers, 1):
-        cell = ws3.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    for item in agent_breakdown:
-        ws3.cell(row=row_idx, column=1, value=item['travel_agent_name'])
-        ws3.cell(row=row_idx, column=2, value=item['count'])
-        row_idx += 1
-    
-    for sheet in [ws, ws2, ws3]:
-        for col in range(1, 3):
-            sheet.column_dimensions[get_column_letter(col)].width = 30
-    
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename="nationality_country_breakdown.xlsx"'
-    return response
+    widths = [30, 30]
+    book.add_sheet("Nationality Breakdown", headers, breakdown(nationality_breakdown, 'nationality'), widths=widths)
+    book.add_sheet("Country Breakdown", headers, breakdown(country_breakdown, 'country'), widths=widths)
+    book.add_sheet("Travel Agent Breakdown", headers, breakdown(agent_breakdown, 'travel_agent_name'), widths=widths)
+    return book.as_response("nationality_country_breakdown.xlsx")
 
 
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 def export_length_of_stay(request):
     """Export Length of Stay Analysis to Excel"""
-    if not OPENPYXL_AVAILABLE:
-        return HttpResponse("Excel export requires openpyxl. Please install it.", status=500)
+    if not XLSXWRITER_AVAILABLE:
+        return HttpResponse(EXCEL_UNAVAILABLE_MESSAGE, status=500)
     
     property_filter = request.GET.get('property', '')
     nationality_filter = request.GET.get('nationality', '')
     start_date_str = request.GET.get('start_date', '')
     end_date_str = request.GET.get('end_date', '')
     
-    qs = ArrivalRecord.objects.exclude(nights__isnull=True)
-    
-    if property_filter:
-        qs = qs.filter(property_name__icontains=property_filter)
-    if nationality_filter:
-        qs = qs.filter(nationality__icontains=nationality_filter)
-    if start_date_str:
-        try:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-            qs = qs.filter(arrival_date__gte=start_date)
-        except (ValueError, TypeError):
-            pass
-    if end_date_str:
-        try:
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-            qs = qs.filter(arrival_date__lte=end_date)
-        except (ValueError, TypeError):
-            pass
-    
-    overall_stats = qs.aggregate(
-        avg_nights=Avg('nights'),
-        min_nights=Min('nights'),
-        max_nights=Max('nights'),
-        total_guests=Count('id')
+    overall_stats, by_property, by_nationality, distribution_raw = _length_of_stay(
+        property_filter, nationality_filter, start_date_str, end_date_str
     )
     
-    by_property = qs.exclude(property_name__isnull=True).exclude(
-        property_name=''
-    ).values('property_name').annotate(
-        avg_nights=Avg('nights'),
-        min_nights=Min('nights'),
-        max_nights=Max('nights'),
-        count=Count('id')
-    ).order_by('-count')
-    
-    by_nationality = qs.exclude(nationality__isnull=True).exclude(
-        nationality=''
-    ).values('nationality').annotate(
-        avg_nights=Avg('nights'),
-        min_nights=Min('nights'),
-        max_nights=Max('nights'),
-        count=Count('id')
-    ).order_by('-count')
-    
-    distribution_raw = qs.values('nights').annotate(
-        count=Count('id')
-    ).order_by('nights')
+    def grouped_rows(rows, field):
+        for item in rows:
+            yield [
+                item[field],
+                round(item['avg_nights'], 1) if item['avg_nights'] else '',
+                item['min_nights'] if item['min_nights'] else '',
+                item['max_nights'] if item['max_nights'] else '',
+                item['count'],
+            ]
     
     total_guests = overall_stats['total_guests'] or 1
-    distribution = []
-    for item in distribution_raw:
-        percentage = (item['count'] / total_guests * 100) if total_guests > 0 else 0
-        distribution.append({
-            'nights': item['nights'],
-            'count': item['count'],
-            'percentage': round(percentage, 1),
-        })
+    distribution = (
+        [item['nights'], item['count'], round(item['count'] / total_guests * 100, 1)]
+        for item in distribution_raw
+    )
     
-    wb, ws, header_fill, header_font, border = _create_excel_workbook()
-    ws.title = "Overall Statistics"
-    
-    ws.cell(row=1, column=1, value="Metric")
-    ws.cell(row=1, column=2, value="Value")
-    ws.cell(row=1, column=1).fill = header_fill
-    ws.cell(row=1, column=1).font = header_font
-    ws.cell(row=1, column=2).fill = header_fill
-    ws.cell(row=1, column=2).font = header_font
-    
-    ws.cell(row=2, column=1, value="Average Nights")
-    ws.cell(row=2, column=2, value=round(overall_stats['avg_nights'], 1) if overall_stats['avg_nights'] else '')
-    ws.cell(row=3, column=1, value="Minimum Nights")
-    ws.cell(row=3, column=2, value=overall_stats['min_nights'] if overall_stats['min_nights'] else '')
-    ws.cell(row=4, column=1, value="Maximum Nights")
-    ws.cell(row=4, column=2, value=overall_stats['max_nights'] if overall_stats['max_nights'] else '')
-    ws.cell(row=5, column=1, value="Total Guests")
-    ws.cell(row=5, column=2, value=overall_stats['total_guests'] or 0)
-    
-    ws2 = wb.create_sheet("By Property")
+    book = StreamingWorkbook()
+    widths = [20] * 5
+    book.add_sheet("Overall Statistics", ['Metric', 'Value'], [
+        ["Average Nights", round(overall_stats['avg_nights'], 1) if overall_stats['avg_nights'] else ''],
+        ["Minimum Nights", overall_stats['min_nights'] if overall_stats['min_nights'] else ''],
+        ["Maximum Nights", overall_stats['max_nights'] if overall_stats['max_nights'] else ''],
+        ["Total Guests", overall_stats['total_guests'] or 0],
+    ], widths=widths)
     headers = ['Property', 'Avg Nights', 'Min Nights', 'Max Nights', 'Count']
-    for col, header in enumerate(headers, 1):
-        cell = ws2.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    for item in by_property:
-        ws2.cell(row=row_idx, column=1, value=item['property_name'])
-        ws2.cell(row=row_idx, column=2, value=round(item['avg_nights'], 1) if item['avg_nights'] else '')
-        ws2.cell(row=row_idx, column=3, value=item['min_nights'] if item['min_nights'] else '')
-        ws2.cell(row=row_idx, column=4, value=item['max_nights'] if item['max_nights'] else '')
-        ws2.cell(row=row_idx, column=5, value=item['count'])
-        row_idx += 1
-    
-    ws3 = wb.create_sheet("By Nationality")
-    for col, header in enumerate(headers, 1):
-        cell = ws3.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    for item in by_nationality:
-        ws3.cell(row=row_idx, column=1, value=item['nationality'])
-        ws3.cell(row=row_idx, column=2, value=round(item['avg_nights'], 1) if item['avg_nights'] else '')
-        ws3.cell(row=row_idx, column=3, value=item['min_nights'] if item['min_nights'] else '')
-        ws3.cell(row=row_idx, column=4, value=item['max_nights'] if item['max_nights'] else '')
-        ws3.cell(row=row_idx, column=5, value=item['count'])
-        row_idx += 1
-    
-    ws4 = wb.create_sheet("Distribution")
-    headers_dist = ['Nights', 'Count', 'Percentage']
-    for col, header in enumerate(headers_dist, 1):
-        cell = ws4.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    for item in distribution:
-        ws4.cell(row=row_idx, column=1, value=item['nights'])
-        ws4.cell(row=row_idx, column=2, value=item['count'])
-        ws4.cell(row=row_idx, column=3, value=item['percentage'])
-        row_idx += 1
-    
-    for sheet in [ws, ws2, ws3, ws4]:
-        for col in range(1, 6):
-            sheet.column_dimensions[get_column_letter(col)].width = 20
-    
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename="length_of_stay.xlsx"'
-    return response
+    book.add_sheet("By Property", headers, grouped_rows(by_property, 'property_name'), widths=widths)
+    book.add_sheet("By Nationality", ['Nationality'] + headers[1:], grouped_rows(by_nationality, 'nationality'), widths=widths)
+    book.add_sheet("Distribution", ['Nights', 'Count', 'Percentage'], distribution, widths=widths)
+    return book.as_response("length_of_stay.xlsx")
 
 
 @login_required
 @permission_required("accounts.view_hotel_management", raise_exception=True)
 def export_contact_completeness(request):
     """Export Contact Data Completeness Report to Excel"""
-    if not OPENPYXL_AVAILABLE:
-        return HttpResponse("Excel export requires openpyxl. Please install it.", status=500)
+    if not XLSXWRITER_AVAILABLE:
+        return HttpResponse(EXCEL_UNAVAILABLE_MESSAGE, status=500)
     
     all_records = ArrivalRecord.objects.all()
     missing_phone = all_records.filter(Q(phone__isnull=True) | Q(phone=''))
@@ -3128,97 +2488,22 @@ def export_contact_completeness(request):
         (Q(email__isnull=True) | Q(email=''))
     )
     
-    import re
-    email_pattern = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
-    invalid_email = []
-    for record in all_records.exclude(email__isnull=True).exclude(email=''):
-        if not email_pattern.match(record.email):
-            invalid_email.append(record)
-    
-    wb, ws, header_fill, header_font, border = _create_excel_workbook()
-    ws.title = "Missing Phone"
-    
-    headers = ['Room', 'Guest Name', 'Arrival Date', 'Email']
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    # Iterate directly over queryset - Django will evaluate it
-    for record in missing_phone.order_by('arrival_date'):
-        ws.cell(row=row_idx, column=1, value=record.room or '')
-        ws.cell(row=row_idx, column=2, value=record.guest_name or '')
-        ws.cell(row=row_idx, column=3, value=record.arrival_date.strftime('%Y-%m-%d') if record.arrival_date else '')
-        ws.cell(row=row_idx, column=4, value=record.email or '')
-        row_idx += 1
-    
-    ws2 = wb.create_sheet("Missing Email")
-    for col, header in enumerate(headers, 1):
-        cell = ws2.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    # Iterate directly over queryset - Django will evaluate it
-    for record in missing_email.order_by('arrival_date'):
-        ws2.cell(row=row_idx, column=1, value=record.room or '')
-        ws2.cell(row=row_idx, column=2, value=record.guest_name or '')
-        ws2.cell(row=row_idx, column=3, value=record.arrival_date.strftime('%Y-%m-%d') if record.arrival_date else '')
-        ws2.cell(row=row_idx, column=4, value=record.phone or '')
-        row_idx += 1
-    
-    ws3 = wb.create_sheet("Missing Both")
-    headers3 = ['Room', 'Guest Name', 'Arrival Date', 'Confirmation #']
-    for col, header in enumerate(headers3, 1):
-        cell = ws3.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    # Iterate directly over queryset - Django will evaluate it
-    for record in missing_both.order_by('arrival_date'):
-        ws3.cell(row=row_idx, column=1, value=record.room or '')
-        ws3.cell(row=row_idx, column=2, value=record.guest_name or '')
-        ws3.cell(row=row_idx, column=3, value=record.arrival_date.strftime('%Y-%m-%d') if record.arrival_date else '')
-        ws3.cell(row=row_idx, column=4, value=record.confirmation_number or '')
-        row_idx += 1
-    
-    ws4 = wb.create_sheet("Invalid Email")
-    headers4 = ['Room', 'Guest Name', 'Invalid Email', 'Phone']
-    for col, header in enumerate(headers4, 1):
-        cell = ws4.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = border
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row_idx = 2
-    # invalid_email is already a list, so no need to convert
-    for record in invalid_email:
-        ws4.cell(row=row_idx, column=1, value=record.room or '')
-        ws4.cell(row=row_idx, column=2, value=record.guest_name or '')
-        ws4.cell(row=row_idx, column=3, value=record.email)
-        ws4.cell(row=row_idx, column=4, value=record.phone or '')
-        row_idx += 1
-    
-    for sheet in [ws, ws2, ws3, ws4]:
-        for col in range(1, 5):
-            sheet.column_dimensions[get_column_letter(col)].width = 25
-    
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename="contact_completeness.xlsx"'
-    return response
+    def invalid_email_rows():
+        for room, guest_name, email, phone in iter_queryset_rows(
+            all_records.filter(INVALID_EMAIL), ['room', 'guest_name', 'email', 'phone']
+        ):
+            yield [room or '', guest_name or '', email, phone or '']
+    
+    book = StreamingWorkbook()
+    widths = [25] * 4
+    book.add_sheet("Missing Phone", ['Room', 'Guest Name', 'Arrival Date', 'Email'], iter_queryset_rows(
+        missing_phone.order_by('arrival_date'), ['room', 'guest_name', 'arrival_date', 'email']
+    ), widths=widths)
+    book.add_sheet("Missing Email", ['Room', 'Guest Name', 'Arrival Date', 'Phone'], iter_queryset_rows(
+        missing_email.order_by('arrival_date'), ['room', 'guest_name', 'arrival_date', 'phone']
+    ), widths=widths)
+    book.add_sheet("Missing Both", ['Room', 'Guest Name', 'Arrival Date', 'Confirmation #'], iter_queryset_rows(
+        missing_both.order_by('arrival_date'), ['room', 'guest_name', 'arrival_date', 'confirmation_number']
+    ), widths=widths)
+    book.add_sheet("Invalid Email", ['Room', 'Guest Name', 'Invalid Email', 'Phone'], invalid_email_rows(), widths=widths)
+    return book.as_response("contact_completeness.xlsx")
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class HotelManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hotel_management'
+
+    def ready(self):
+        # Keep the cached KPI series in step with DailyData/CompetitorData/PerformanceIndex
+        from . import signals  # noqa: F401
@@ -0,0 +1,14 @@
+from .registry import get_hotels, request_hotel
+
+
+def properties(request):
+    """
+    Context processor that adds the group's hotels and the one the user is
+    working on, for the property switcher in the navigation bar.
+    """
+    if not request.user.is_authenticated:
+        return {}
+    return {
+        'properties': get_hotels(),
+        'current_property': request_hotel(request),
+    }
@@ -0,0 +1,272 @@
+"""
+Precomputed figures for the home dashboard.
+
+``DashboardSnapshot`` reads each table once, with the current period and
+the same period last year split by conditional aggregation, and resolves
+the budget goal from a single fetch of the fiscal year's goals. Snapshots
+are cached per hotel, range and data version. Each hotel has its own
+version: once a transaction commits, the signal handlers bump the version
+of the hotel a change belongs to and rebuild that hotel's default
+current-month snapshot, so the landing page is normally a cache hit and
+other properties keep their snapshots.
+"""
+import uuid
+from calendar import monthrange
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from .goals import MONTH_NAMES
+from .matrix import average_positions
+from .models import BudgetGoal, DailyData, PerformanceIndex
+from .registry import active_competitor_count, get_hotel
+
+DASHBOARD_SNAPSHOT_CACHE_TIMEOUT = 60 * 60 * 24
+DASHBOARD_VERSION_KEY = 'dashboard_snapshot_version'
+
+
+def default_dashboard_range(today=None):
+    """First and last day of the current month."""
+    today = today or timezone.now().date()
+    _, last_day = monthrange(today.year, today.month)
+    return date(today.year, today.month, 1), date(today.year, today.month, last_day)
+
+
+def prior_year_range(start_date, end_date):
+    """Same period last year, keeping the length of the range."""
+    try:
+        prior_start = start_date.replace(year=start_date.year - 1)
+    except ValueError:
+        # 29 February maps to the 28th
+        prior_start = start_date.replace(year=start_date.year - 1, day=28)
+    return prior_start, prior_start + timedelta(days=(end_date - start_date).days)
+
+
+def percent_change(current, previous):
+    return ((current - previous) / previous * 100) if previous != 0 else 0
+
+
+class AggregateGoal:
+    """Day-weighted blend of the monthly goals covering a multi-month range."""
+
+    period_type = 'monthly_aggregate'
+    is_aggregate = True
+
+    def __init__(self, fiscal_year, period_detail, occ, adr, revpar):
+        self.fiscal_year = fiscal_year
+        self.period_detail = period_detail
+        self.occupancy_goal = occ
+        self.adr_goal = adr
+        self.revpar_goal = revpar
+
+    def get_period_type_display(self):
+        return 'Monthly Aggregate'
+
+
+def resolve_budget_goal(goals, start_date, end_date):
+    """
+    Pick the budget goal for a date range from the hotel's goals for the
+    start date's fiscal year: the month's goal, a day-weighted blend of
+    monthly goals for multi-month ranges, the quarter, then the year.
+    """
+    days_diff = (end_date - start_date).days
+    fiscal_year = start_date.year
+    goals_by_period = {}
+    for goal in goals:
+        if goal.fiscal_year == fiscal_year:
+            goals_by_period.setdefault((goal.period_type, goal.period_detail), goal)
+
+    # Priority 1: monthly goal when the range sits inside one month
+    if days_diff <= 31 and start_date.month == end_date.month and start_date.year == end_date.year:
+        budget_goal = goals_by_period.get(('monthly', MONTH_NAMES[start_date.month - 1]))
+        if budget_goal:
+            return budget_goal
+
+    # Ranges spanning several months of one year blend the monthly goals,
+    # weighted by the days of each month inside the range
+    if start_date.year == end_date.year and start_date.month != end_date.month:
+        weighted_occ_sum = 0.0
+        weighted_adr_sum = 0.0
+        covered_days = 0
+        months_covered_labels = []
+        for month in range(start_date.month, end_date.month + 1):
+            overlap_start = max(start_date, date(start_date.year, month, 1))
+            overlap_end = min(end_date, date(start_date.year, month, monthrange(start_date.year, month)[1]))
+            if overlap_start > overlap_end:
+                continue
+            overlap_days = (overlap_end - overlap_start).days + 1
+            period_detail = MONTH_NAMES[month - 1]
+            months_covered_labels.append(period_detail)
+            goal = goals_by_period.get(('monthly', period_detail))
+            if goal and goal.occupancy_goal and goal.adr_goal:
+                weighted_occ_sum += float(goal.occupancy_goal) * overlap_days
+                weighted_adr_sum += float(goal.adr_goal) * overlap_days
+                covered_days += overlap_days
+        if covered_days > 0:
+            agg_occ = weighted_occ_sum / covered_days
+            agg_adr = weighted_adr_sum / covered_days
+            label = f"{months_covered_labels[0]}–{months_covered_labels[-1]}"
+            return AggregateGoal(fiscal_year, label, agg_occ, agg_adr, (agg_occ / 100.0) * agg_adr)
+
+    quarter_goal = goals_by_period.get(('quarter', f'Q{(start_date.month - 1) // 3 + 1}'))
+
+    # Priority 2: quarterly goal
+    if days_diff <= 93 and quarter_goal:
+        return quarter_goal
+
+    # Priority 3: annual goal
+    return goals_by_period.get(('annual', ''))
+
+
+class DashboardSnapshot:
+    """
+    Everything the home dashboard shows for one hotel and date range.
+
+    Builds in four queries: hotel daily data, performance indices grouped
+    by competitor, matrix positions grouped by competitor, and the fiscal
+    year's budget goals. The active competitor count comes from the registry.
+    """
+
+    def __init__(self, hotel, start_date, end_date):
+        self.hotel = hotel
+        self.start_date = start_date
+        self.end_date = end_date
+        self.prior_start_date, self.prior_end_date = prior_year_range(start_date, end_date)
+
+        current = Q(date__gte=start_date, date__lte=end_date)
+        prior = Q(date__gte=self.prior_start_date, date__lte=self.prior_end_date)
+        self._build_summary(current, prior)
+        self._build_indices(current, prior)
+        self._build_matrix()
+        self.budget_goal = resolve_budget_goal(
+            BudgetGoal.objects.filter(hotel=hotel, fiscal_year=start_date.year),
+            start_date, end_date,
+        )
+
+        self.goal_comparison = {}
+        current_occ = self.summary['current_occ']
+        if self.budget_goal and self.budget_goal.occupancy_goal and current_occ:
+            self.goal_comparison['occupancy_diff'] = float(self.budget_goal.occupancy_goal) - float(current_occ)
+            self.goal_comparison['occupancy_met'] = float(current_occ) >= float(self.budget_goal.occupancy_goal)
+
+    def _build_summary(self, current, prior):
+        aggregates = {}
+        for period, period_filter in (('current', current), ('prior', prior)):
+            aggregates[f'{period}_occ'] = Avg('occupancy_percentage', filter=period_filter)
+            aggregates[f'{period}_adr'] = Avg('average_rate', filter=period_filter)
+            aggregates[f'{period}_revpar'] = Avg('revpar', filter=period_filter)
+        values = DailyData.objects.filter(current | prior, hotel=self.hotel).aggregate(**aggregates)
+
+        summary = {}
+        for metric in ('occ', 'adr', 'revpar'):
+            summary[f'current_{metric}'] = values[f'current_{metric}'] or 0
+            summary[f'prior_year_{metric}'] = values[f'prior_{metric}'] or 0
+            summary[f'{metric}_change'] = percent_change(summary[f'current_{metric}'], summary[f'prior_year_{metric}'])
+        self.summary = summary
+
+    def _build_indices(self, current, prior):
+        # Sums and counts per competitor (None for the hotel's own rows): the
+        # dashboard averages every index row, and ranks the hotel against
+        # each competitor's own average for the current period.
+        aggregates = {}
+        for period, period_filter in (('current', current), ('prior', prior)):
+            for index in ('mpi', 'ari', 'rgi'):
+                aggregates[f'{period}_{index}_sum'] = Sum(index, filter=period_filter)
+                aggregates[f'{period}_{index}_count'] = Count(index, filter=period_filter)
+        rows = list(PerformanceIndex.objects.filter(current | prior, hotel=self.hotel).order_by().values(
+            'competitor_id'
+        ).annotate(**aggregates))
+
+        indices = {}
+        for index in ('mpi', 'ari', 'rgi'):
+            for period, key in (('current', f'current_{index}'), ('prior', f'prior_year_{index}')):
+                total = sum(row[f'{period}_{index}_sum'] or 0 for row in rows)
+                count = sum(row[f'{period}_{index}_count'] for row in rows)
+                indices[key] = total / count if count else 0
+            indices[f'{index}_change'] = percent_change(indices[f'current_{index}'], indices[f'prior_year_{index}'])
+
+            competitor_values = [
+                row[f'current_{index}_sum'] / row[f'current_{index}_count']
+                for row in rows
+                if row['competitor_id'] is not None and row[f'current_{index}_count']
+            ]
+            # Rank: one plus the number of competitors averaging higher
+            value = float(indices[f'current_{index}'])
+            indices[f'{index}_rank'] = sum(1 for c in competitor_values if float(c) > value) + 1
+        self.indices = indices
+
+    def _build_matrix(self):
+        self.indices['total_competitors'] = active_competitor_count(self.hotel.pk)
+
+        positions = average_positions(self.hotel, {
+            'current': (self.start_date, self.end_date),
+            'prior': (self.prior_start_date, self.prior_end_date),
+        })
+        self.competitor_data = positions['current']
+        self.prev_year_competitor_data = positions['prior']
+        self.hotel_data = {
+            'occupancy_index': self.indices['current_mpi'],
+            'adr_index': self.indices['current_ari'],
+        }
+        self.prev_year_hotel_data = {
+            'occupancy_index': self.indices['prior_year_mpi'],
+            'adr_index': self.indices['prior_year_ari'],
+        }
+
+    def context(self):
+        """Template context for hotel_management/home.html, minus the JSON encoding."""
+        return {
+            'summary': self.summary,
+            'indices': self.indices,
+            'hotel_data': self.hotel_data,
+            'competitor_data': self.competitor_data,
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'prev_year_start_date': self.prior_start_date,
+            'prev_year_end_date': self.prior_end_date,
+            'prev_year_hotel_data': self.prev_year_hotel_data,
+            'prev_year_competitor_data': self.prev_year_competitor_data,
+            'budget_goal': self.budget_goal,
+            'goal_comparison': self.goal_comparison,
+        }
+
+
+def _version_key(hotel_id):
+    return f'{DASHBOARD_VERSION_KEY}:{hotel_id}'
+
+
+def dashboard_version(hotel_id):
+    """Token that changes whenever data shown on the hotel's dashboard changes."""
+    key = _version_key(hotel_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def bump_dashboard_version(hotel_id):
+    # A fresh random token, so a lost version key can never resurrect old snapshots
+    cache.set(_version_key(hotel_id), uuid.uuid4().hex, None)
+
+
+def get_dashboard_snapshot(hotel, start_date, end_date):
+    """Cached DashboardSnapshot for the hotel and range at the current data version."""
+    cache_key = 'dashboard_snapshot:{}:{}:{}:{}'.format(
+        hotel.pk, start_date.isoformat(), end_date.isoformat(), dashboard_version(hotel.pk)
+    )
+    snapshot = cache.get(cache_key)
+    if snapshot is None:
+        snapshot = DashboardSnapshot(hotel, start_date, end_date)
+        cache.set(cache_key, snapshot, DASHBOARD_SNAPSHOT_CACHE_TIMEOUT)
+    return snapshot
+
+
+def precompute_default_snapshot(hotel_id):
+    """Warm the current-month snapshot the landing page shows the hotel by default."""
+    hotel = get_hotel(hotel_id)
+    if hotel:
+        get_dashboard_snapshot(hotel, *default_dashboard_range())
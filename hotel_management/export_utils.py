@@ -0,0 +1,455 @@
+"""
+Streaming export helpers shared by the hotel_management, hotelkit and
+guest_experience apps.
+
+Workbooks are written with xlsxwriter in ``constant_memory`` mode: each row is
+flushed to a temporary file as soon as the next one starts, so peak memory
+depends on the width of a row rather than the number of rows. The finished
+file is spooled to disk and handed to Django as a ``StreamingHttpResponse``.
+
+CSV is streamed row by row and Parquet is written one record batch per
+queryset chunk, so none of the formats instantiate model objects.
+
+PDF tables are laid out in page-sized ``LongTable`` chunks that are pulled
+from the row iterator while reportlab builds the document, so layout time is
+linear in the number of rows and only a few chunks are alive at once.
+"""
+import csv
+import tempfile
+from functools import lru_cache
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import chain, islice
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+try:
+    import xlsxwriter
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    XLSXWRITER_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_CONTENT_TYPE = 'text/csv'
+PARQUET_CONTENT_TYPE = 'application/vnd.apache.parquet'
+
+# Column widths are estimated from the first rows of each sheet instead of
+# re-reading every cell once the sheet is complete.
+WIDTH_SAMPLE_ROWS = 200
+MIN_COLUMN_WIDTH = 8
+MAX_COLUMN_WIDTH = 50
+
+STREAM_CHUNK_SIZE = 64 * 1024
+QUERYSET_CHUNK_SIZE = 2000
+
+PDF_CONTENT_TYPE = 'application/pdf'
+PDF_FONT_SIZE = 8
+PDF_CELL_PADDING = 2
+PDF_ROW_HEIGHT = PDF_FONT_SIZE * 1.2 + 2 * PDF_CELL_PADDING
+
+
+def excel_value(value):
+    """Convert a Python value into something xlsxwriter can write as-is."""
+    if value is None:
+        return ''
+    if isinstance(value, timedelta):
+        return str(value)
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def estimate_column_widths(headers, sample_rows):
+    """Estimate column widths from the headers and a sample of rows."""
+    widths = [len(str(h)) for h in headers]
+    for row in sample_rows:
+        for idx, value in enumerate(row):
+            length = len(str(value)) if value not in (None, '') else 0
+            if idx >= len(widths):
+                widths.append(length)
+            elif length > widths[idx]:
+                widths[idx] = length
+    return [min(max(w + 2, MIN_COLUMN_WIDTH), MAX_COLUMN_WIDTH) for w in widths]
+
+
+def iter_queryset_rows(queryset, fields, chunk_size=QUERYSET_CHUNK_SIZE):
+    """Yield tuples for ``fields`` straight from the database, chunk by chunk."""
+    return queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def iter_queryset_chunks(queryset, fields, chunk_size=QUERYSET_CHUNK_SIZE):
+    """Yield lists of up to ``chunk_size`` tuples for ``fields``."""
+    rows = iter_queryset_rows(queryset, fields, chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def _attachment(response, filename):
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _iter_file(handle, chunk_size=STREAM_CHUNK_SIZE):
+    try:
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        handle.close()
+
+
+class StreamingSheet:
+    """A single worksheet that can only be written top to bottom."""
+
+    def __init__(self, book, worksheet):
+        self.book = book
+        self.worksheet = worksheet
+        self.row = 0
+
+    def set_widths(self, widths):
+        for idx, width in enumerate(widths):
+            self.worksheet.set_column(idx, idx, width)
+
+    def append(self, values, style=None):
+        cell_format = self.book.formats.get(style) if style else None
+        self.worksheet.write_row(self.row, 0, [excel_value(v) for v in values], cell_format)
+        self.row += 1
+
+    def skip(self, count=1):
+        self.row += count
+
+    def write_rows(self, headers, rows, widths=None):
+        """
+        Write a header row followed by every row from ``rows``.
+
+        ``rows`` may be any iterable (typically ``queryset.iterator()`` or a
+        generator); only ``WIDTH_SAMPLE_ROWS`` rows are held in memory at once.
+        """
+        rows = iter(rows)
+        sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+        if widths is None:
+            widths = estimate_column_widths(headers, sample)
+        self.set_widths(widths)
+        if headers:
+            self.append(headers, style='header')
+        for row in chain(sample, rows):
+            self.append(row)
+        return self.row
+
+
+class StreamingWorkbook:
+    """
+    Constant-memory XLSX workbook that is streamed back to the client.
+
+    Usage::
+
+        book = StreamingWorkbook()
+        book.add_sheet('Guest Requests', headers, rows)
+        return book.as_response('guest_requests.xlsx')
+    """
+
+    def __init__(self):
+        if not XLSXWRITER_AVAILABLE:
+            raise ImportError("xlsxwriter is not installed. Please install it to use Excel export.")
+        self._handle = tempfile.TemporaryFile()
+        self.workbook = xlsxwriter.Workbook(self._handle, {
+            'constant_memory': True,
+            'strings_to_urls': False,
+            'strings_to_formulas': False,
+        })
+        self.formats = {
+            'header': self.workbook.add_format({
+                'bold': True, 'font_color': '#FFFFFF', 'bg_color': '#366092',
+                'border': 1, 'align': 'center', 'valign': 'vcenter',
+            }),
+            'title': self.workbook.add_format({'bold': True, 'font_size': 16}),
+            'subtitle': self.workbook.add_format({'font_size': 12}),
+            'section': self.workbook.add_format({'bold': True, 'font_size': 14}),
+            'subheader': self.workbook.add_format({'bold': True, 'bg_color': '#CCCCCC'}),
+        }
+
+    def create_sheet(self, title):
+        # Excel limits sheet names to 31 characters
+        return StreamingSheet(self, self.workbook.add_worksheet(title[:31]))
+
+    def add_sheet(self, title, headers, rows, widths=None):
+        sheet = self.create_sheet(title)
+        sheet.write_rows(headers, rows, widths=widths)
+        return sheet
+
+    def _close(self):
+        self.workbook.close()
+        size = self._handle.tell()
+        self._handle.seek(0)
+        return size
+
+    def to_bytes(self):
+        self._close()
+        try:
+            return self._handle.read()
+        finally:
+            self._handle.close()
+
+    def as_response(self, filename):
+        size = self._close()
+        response = StreamingHttpResponse(_iter_file(self._handle), content_type=XLSX_CONTENT_TYPE)
+        response['Content-Length'] = size
+        return _attachment(response, filename)
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def stream_csv_response(filename, headers, rows):
+    """Stream ``rows`` as CSV without building the file in memory."""
+    writer = csv.writer(_Echo())
+
+    def generate():
+        yield writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow([csv_value(v) for v in row])
+
+    return _attachment(StreamingHttpResponse(generate(), content_type=CSV_CONTENT_TYPE), filename)
+
+
+def arrow_type_for_field(field):
+    """Map a Django model field to the matching Arrow type."""
+    from django.db import models
+
+    if field.is_relation:
+        field = field.target_field
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, (models.AutoField, models.IntegerField)):
+        return pa.int64()
+    if isinstance(field, models.DecimalField):
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    if isinstance(field, models.DurationField):
+        return pa.duration('us')
+    return pa.string()
+
+
+def resolve_model_field(model, path):
+    """Follow a ``related__field`` lookup path to the final model field."""
+    parts = path.split('__')
+    for part in parts[:-1]:
+        model = model._meta.get_field(part).related_model
+    return model._meta.get_field(parts[-1])
+
+
+def arrow_schema(model, fields):
+    """Build an Arrow schema for ``values_list(*fields)`` on ``model``."""
+    return pa.schema([
+        pa.field(name, arrow_type_for_field(resolve_model_field(model, name))) for name in fields
+    ])
+
+
+def write_parquet(handle, schema, chunks, compression='zstd'):
+    """Write each chunk of row tuples to ``handle`` as one Parquet row group."""
+    with pq.ParquetWriter(handle, schema, compression=compression) as writer:
+        for chunk in chunks:
+            columns = list(zip(*chunk))
+            arrays = [pa.array(column, type=schema.field(i).type) for i, column in enumerate(columns)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+
+
+def stream_parquet_response(filename, schema, chunks):
+    """Write ``chunks`` to a spooled Parquet file and stream it back."""
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow is not installed. Please install it to use Parquet export.")
+    handle = tempfile.TemporaryFile()
+    write_parquet(handle, schema, chunks)
+    size = handle.tell()
+    handle.seek(0)
+    response = StreamingHttpResponse(_iter_file(handle), content_type=PARQUET_CONTENT_TYPE)
+    response['Content-Length'] = size
+    return _attachment(response, filename)
+
+
+def pdf_value(value):
+    if value is None or value == '':
+        return '-'
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return str(value)
+
+
+@lru_cache(maxsize=None)
+def pdf_styles():
+    """Paragraph and table styles, created once per process."""
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.platypus import TableStyle
+
+    styles = getSampleStyleSheet()
+    # Long cells are wrapped in paragraphs that look like the plain cells around them
+    styles.add(ParagraphStyle('TableCell', fontName='Helvetica', fontSize=PDF_FONT_SIZE,
+                              leading=PDF_FONT_SIZE * 1.2))
+    styles.add(ParagraphStyle('TableHeader', parent=styles['TableCell'], fontName='Helvetica-Bold',
+                              textColor=colors.whitesmoke))
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), PDF_FONT_SIZE),
+        ('LEADING', (0, 0), (-1, -1), PDF_FONT_SIZE * 1.2),
+        ('TOPPADDING', (0, 0), (-1, -1), PDF_CELL_PADDING),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), PDF_CELL_PADDING),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ])
+    return styles, table_style
+
+
+def _pdf_column_widths(headers, sample_rows, available_width):
+    """Share the frame width between columns in proportion to sampled text length."""
+    lengths = estimate_column_widths(headers, sample_rows)
+    total = sum(lengths) or 1
+    return [available_width * length / total for length in lengths]
+
+
+def _cell(text, width, style):
+    """``text`` as is when it fits the column, otherwise a paragraph wrapped to it."""
+    from reportlab.platypus import Paragraph
+
+    # Helvetica averages about half the font size per character
+    max_chars = max(int(width / (PDF_FONT_SIZE * 0.5)) - 1, 3)
+    return text if len(text) <= max_chars else Paragraph(escape(text), style)
+
+
+def _iter_table_chunks(headers, rows, col_widths, rows_per_chunk):
+    from reportlab.platypus import LongTable
+
+    styles, table_style = pdf_styles()
+    cell_style = styles['TableCell']
+    header_row = [_cell(str(h), w, styles['TableHeader']) for h, w in zip(headers, col_widths)]
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, rows_per_chunk))
+        if not chunk:
+            break
+        body = [[_cell(pdf_value(v), w, cell_style) for v, w in zip(row, col_widths)] for row in chunk]
+        table = LongTable([header_row] + body, colWidths=col_widths, repeatRows=1)
+        table.setStyle(table_style)
+        yield table
+
+
+class _LazyStory(list):
+    """
+    Flowable list that refills itself from an iterator as reportlab consumes it.
+
+    ``BaseDocTemplate.build`` checks ``len(flowables)`` before handling each
+    flowable, so topping the list up there keeps only a couple of table chunks
+    in memory at any time.
+    """
+
+    def __init__(self, flowables):
+        super().__init__()
+        self._source = iter(flowables)
+
+    def __len__(self):
+        while list.__len__(self) < 2:
+            flowable = next(self._source, None)
+            if flowable is None:
+                break
+            self.append(flowable)
+        return list.__len__(self)
+
+
+def write_table_pdf(handle, title, sections, subtitle=None, landscape_pages=True, rows_per_chunk=None):
+    """
+    Write a PDF of one or more tables to ``handle``.
+
+    ``sections`` is an iterable of ``(heading, headers, rows)``; ``heading`` may
+    be ``None`` and ``rows`` may be any iterable of sequences. By default each
+    table chunk holds one page worth of rows, so chunks rarely need splitting.
+    """
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+    pagesize = landscape(A4) if landscape_pages else A4
+    doc = SimpleDocTemplate(handle, pagesize=pagesize, leftMargin=36, rightMargin=36,
+                            topMargin=36, bottomMargin=36, title=title, pageCompression=1)
+    styles, _ = pdf_styles()
+    if rows_per_chunk is None:
+        # Leave room for the repeated header row
+        rows_per_chunk = max(int(doc.height // PDF_ROW_HEIGHT) - 1, 1)
+
+    def story():
+        yield Paragraph(title, styles['Title'])
+        if subtitle:
+            yield Paragraph(subtitle, styles['Normal'])
+        yield Spacer(1, 12)
+        for heading, headers, rows in sections:
+            if heading:
+                yield Paragraph(heading, styles['Heading2'])
+                yield Spacer(1, 6)
+            rows = iter(rows)
+            sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+            if not sample:
+                yield Paragraph('No data', styles['Normal'])
+                yield Spacer(1, 12)
+                continue
+            col_widths = _pdf_column_widths(
+                headers, [[pdf_value(v) for v in row] for row in sample], doc.width
+            )
+            yield from _iter_table_chunks(headers, chain(sample, rows), col_widths, rows_per_chunk)
+            yield Spacer(1, 12)
+
+    doc.build(_LazyStory(story()))
+
+
+def stream_pdf_response(filename, title, sections, **kwargs):
+    """Render ``sections`` to a spooled PDF file and stream it back."""
+    handle = tempfile.TemporaryFile()
+    write_table_pdf(handle, title, sections, **kwargs)
+    size = handle.tell()
+    handle.seek(0)
+    response = StreamingHttpResponse(_iter_file(handle), content_type=PDF_CONTENT_TYPE)
+    response['Content-Length'] = size
+    return _attachment(response, filename)
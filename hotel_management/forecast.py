@@ -0,0 +1,201 @@
+"""
+Budget pacing and forecast engine.
+
+For every BudgetGoal of a hotel the period is split into days already on
+the books (DailyData rows, including future-dated ones) and missing days,
+which are projected three ways:
+
+- run_rate: the average of the trailing 28 days with data before today
+- sply: the same days last year (364 days back, so weekdays line up),
+  scaled by how the trailing 28 days compare with the same days last year
+- ses: the level of a simple exponential smoothing of the daily series
+
+The daily series is loaded once into numpy arrays and every goal is
+answered from their prefix sums, so all goals and methods come out of one
+pass. Results are cached per day and the hotel's data version.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+
+from .dashboard import dashboard_version
+from .goals import goal_period
+from .models import BudgetGoal, DailyData
+
+BUDGET_FORECAST_CACHE_TIMEOUT = 60 * 60 * 24
+
+FORECAST_METHODS = ('run_rate', 'sply', 'ses')
+TRAILING_DAYS = 28
+SPLY_OFFSET_DAYS = 364
+SES_ALPHA = 0.3
+
+
+def _prefix(values):
+    return np.concatenate(([0.0], np.cumsum(values)))
+
+
+def _span_sum(prefix, starts, ends):
+    """Sum over inclusive index spans, vectorised over goals."""
+    return prefix[ends + 1] - prefix[starts]
+
+
+def _ratio(numerator, denominator, scale=1.0):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1) * scale, 0.0)
+
+
+def _smoothed_level(values, has_data, upto):
+    """
+    Simple exponential smoothing level at index ``upto``, skipping days
+    without data. The recursion is unrolled into its closed-form weights.
+    """
+    observed = values[:upto + 1][has_data[:upto + 1]]
+    if not len(observed):
+        return 0.0
+    weights = SES_ALPHA * (1 - SES_ALPHA) ** np.arange(len(observed) - 1, -1, -1)
+    weights[0] = (1 - SES_ALPHA) ** (len(observed) - 1)
+    return float(weights @ observed)
+
+
+def compute_budget_forecast(hotel, today=None):
+    """Pacing and month/quarter/year-end projections for every goal of the hotel."""
+    today = today or timezone.now().date()
+    goals = []
+    for goal in BudgetGoal.objects.filter(hotel=hotel).order_by('-fiscal_year', 'period_type', 'period_detail'):
+        period = goal_period(goal)
+        if period:
+            goals.append((goal, period[0], period[1]))
+    if not goals:
+        return {'as_of': today.isoformat(), 'goals': []}
+
+    # One dense daily series covering every goal, last year and the trailing
+    # window; starting no later than today's window keeps it before today even
+    # when every goal is in the future
+    first_day = min(min(start for _, start, _ in goals), today) - timedelta(days=SPLY_OFFSET_DAYS + TRAILING_DAYS)
+    last_day = max(max(end for _, _, end in goals), today)
+    size = (last_day - first_day).days + 1
+    rooms = np.zeros(size)
+    revenue = np.zeros(size)
+    capacity = np.full(size, float(hotel.total_rooms))
+    has_data = np.zeros(size, dtype=bool)
+    for day, rooms_sold, total_revenue, total_rooms in DailyData.objects.filter(
+        hotel=hotel, date__gte=first_day, date__lte=last_day
+    ).values_list('date', 'rooms_sold', 'total_revenue', 'total_rooms'):
+        index = (day - first_day).days
+        rooms[index] += rooms_sold or 0
+        revenue[index] += float(total_revenue or 0)
+        capacity[index] = total_rooms or hotel.total_rooms
+        has_data[index] = True
+    missing = ~has_data
+
+    # Last year's value for each day, aligned on the same index
+    ly_rooms = np.zeros(size)
+    ly_revenue = np.zeros(size)
+    ly_has_data = np.zeros(size, dtype=bool)
+    ly_rooms[SPLY_OFFSET_DAYS:] = rooms[:-SPLY_OFFSET_DAYS]
+    ly_revenue[SPLY_OFFSET_DAYS:] = revenue[:-SPLY_OFFSET_DAYS]
+    ly_has_data[SPLY_OFFSET_DAYS:] = has_data[:-SPLY_OFFSET_DAYS]
+
+    # Trailing window before today: run rate, SPLY ratio and SES level are shared by every goal
+    today_index = (today - first_day).days
+    window = slice(max(today_index - TRAILING_DAYS, 0), today_index)
+    window_days = has_data[window].sum()
+    run_rate_rooms = rooms[window].sum() / window_days if window_days else 0.0
+    run_rate_revenue = revenue[window].sum() / window_days if window_days else 0.0
+    both = has_data[window] & ly_has_data[window]
+    ly_window_rooms = ly_rooms[window][both].sum()
+    ly_window_revenue = ly_revenue[window][both].sum()
+    sply_rooms_ratio = rooms[window][both].sum() / ly_window_rooms if ly_window_rooms else 1.0
+    sply_revenue_ratio = revenue[window][both].sum() / ly_window_revenue if ly_window_revenue else 1.0
+    ses_rooms = _smoothed_level(rooms, has_data, today_index - 1)
+    ses_revenue = _smoothed_level(revenue, has_data, today_index - 1)
+
+    starts = np.array([(start - first_day).days for _, start, _ in goals])
+    ends = np.array([(end - first_day).days for _, _, end in goals])
+    total_days = ends - starts + 1
+
+    otb_rooms = _span_sum(_prefix(rooms), starts, ends)
+    otb_revenue = _span_sum(_prefix(revenue), starts, ends)
+    otb_capacity = _span_sum(_prefix(np.where(has_data, capacity, 0.0)), starts, ends)
+    otb_days = _span_sum(_prefix(has_data), starts, ends)
+    missing_days = total_days - otb_days
+    room_nights = otb_capacity + missing_days * float(hotel.total_rooms)
+
+    # Missing days with a last-year value follow last year; the rest fall back to the run rate
+    sply_days = missing & ly_has_data
+    sply_known_days = _span_sum(_prefix(sply_days), starts, ends)
+    projected = {
+        'run_rate': (missing_days * run_rate_rooms, missing_days * run_rate_revenue),
+        'sply': (
+            _span_sum(_prefix(np.where(sply_days, ly_rooms, 0.0)), starts, ends) * sply_rooms_ratio
+            + (missing_days - sply_known_days) * run_rate_rooms,
+            _span_sum(_prefix(np.where(sply_days, ly_revenue, 0.0)), starts, ends) * sply_revenue_ratio
+            + (missing_days - sply_known_days) * run_rate_revenue,
+        ),
+        'ses': (missing_days * ses_rooms, missing_days * ses_revenue),
+    }
+
+    def metrics(rooms_sold, room_revenue):
+        return {
+            'rooms_sold': np.round(rooms_sold),
+            'revenue': np.round(room_revenue, 2),
+            'occupancy': np.round(_ratio(rooms_sold, room_nights, 100), 2),
+            'adr': np.round(_ratio(room_revenue, rooms_sold), 2),
+            'revpar': np.round(_ratio(room_revenue, room_nights), 2),
+        }
+
+    on_the_books = metrics(otb_rooms, otb_revenue)
+    projections = {
+        method: metrics(otb_rooms + extra_rooms, otb_revenue + extra_revenue)
+        for method, (extra_rooms, extra_revenue) in projected.items()
+    }
+
+    results = []
+    for position, (goal, start, end) in enumerate(goals):
+        targets = {
+            'occupancy': goal.occupancy_goal,
+            'adr': goal.adr_goal,
+            'revpar': goal.revpar_goal,
+            'revenue': goal.total_revenue_budget,
+        }
+        targets = {key: float(value) if value is not None else None for key, value in targets.items()}
+
+        forecasts = {}
+        for method in FORECAST_METHODS:
+            values = {key: float(array[position]) for key, array in projections[method].items()}
+            values['achievement'] = {
+                key: round(values[key] / target * 100, 2) if target else None
+                for key, target in targets.items()
+            }
+            forecasts[method] = values
+
+        results.append({
+            'id': goal.id,
+            'fiscal_year': goal.fiscal_year,
+            'period_type': goal.period_type,
+            'period_label': goal.get_period_type_display(),
+            'period_detail': goal.period_detail,
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            'days': int(total_days[position]),
+            'days_on_books': int(otb_days[position]),
+            'elapsed_days': max(0, min((today - start).days, int(total_days[position]))),
+            'targets': targets,
+            'on_the_books': {key: float(array[position]) for key, array in on_the_books.items()},
+            'projections': forecasts,
+        })
+
+    return {'as_of': today.isoformat(), 'goals': results}
+
+
+def budget_forecast(hotel):
+    """compute_budget_forecast, cached for the day and the current data version."""
+    today = timezone.now().date()
+    cache_key = f'budget_forecast:{hotel.pk}:{today.isoformat()}:{dashboard_version(hotel.pk)}'
+    forecast = cache.get(cache_key)
+    if forecast is None:
+        forecast = compute_budget_forecast(hotel, today)
+        cache.set(cache_key, forecast, BUDGET_FORECAST_CACHE_TIMEOUT)
+    return forecast
@@ -0,0 +1,179 @@
+"""
+Day-level goal calendar derived from BudgetGoal.
+
+Annual, quarterly and monthly goals overlap; ``rebuild_goal_calendar``
+flattens them into one BudgetGoalDay row per date so that goal-vs-actual
+for any range is a single aggregate and pacing can be compared day by day.
+"""
+from calendar import monthrange
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Avg, Count, Sum
+
+from .models import BudgetGoal, BudgetGoalDay
+from .timeseries import get_series
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+               'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+RATE_TARGETS = ('occupancy_goal', 'adr_goal', 'revpar_goal', 'mpi_goal', 'ari_goal', 'rgi_goal')
+
+# Longest range goal_pacing reports day by day
+GOAL_PACING_MAX_DAYS = 366
+
+# Most specific first
+PERIOD_PRECEDENCE = (BudgetGoal.PERIOD_MONTHLY, BudgetGoal.PERIOD_QUARTER, BudgetGoal.PERIOD_ANNUAL)
+
+
+def goal_period(goal):
+    """First and last day covered by a goal, or None for an unrecognised period."""
+    year = goal.fiscal_year
+    if goal.period_type == BudgetGoal.PERIOD_ANNUAL:
+        return date(year, 1, 1), date(year, 12, 31)
+    if goal.period_type == BudgetGoal.PERIOD_QUARTER and goal.period_detail in ('Q1', 'Q2', 'Q3', 'Q4'):
+        first_month = (int(goal.period_detail[1]) - 1) * 3 + 1
+        last_month = first_month + 2
+        return date(year, first_month, 1), date(year, last_month, monthrange(year, last_month)[1])
+    if goal.period_type == BudgetGoal.PERIOD_MONTHLY and goal.period_detail in MONTH_NAMES:
+        month = MONTH_NAMES.index(goal.period_detail) + 1
+        return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+    return None
+
+
+def _period_key(goal_type, day):
+    if goal_type == BudgetGoal.PERIOD_MONTHLY:
+        return MONTH_NAMES[day.month - 1]
+    if goal_type == BudgetGoal.PERIOD_QUARTER:
+        return f'Q{(day.month - 1) // 3 + 1}'
+    return ''
+
+
+def build_goal_calendar(fiscal_year, goals):
+    """
+    Calendar fields for every day of the fiscal year covered by a goal, as
+    dicts ready for ``BudgetGoalDay(hotel_id=..., **fields)``.
+    """
+    goals_by_period = {(goal.period_type, goal.period_detail): goal for goal in goals}
+    # Equal cent shares of each revenue budget, the rounding remainder on the
+    # period's last day so the days add up to the budget
+    daily_revenue = {}
+    for goal in goals_by_period.values():
+        period = goal_period(goal)
+        if period and goal.total_revenue_budget is not None:
+            days = (period[1] - period[0]).days + 1
+            share = (goal.total_revenue_budget / days).quantize(Decimal('0.01'), ROUND_HALF_UP)
+            daily_revenue[goal.pk] = (share, period[1], goal.total_revenue_budget - share * (days - 1))
+
+    rows = []
+    day = date(fiscal_year, 1, 1)
+    while day.year == fiscal_year:
+        covering = [
+            goals_by_period[key]
+            for key in ((goal_type, _period_key(goal_type, day)) for goal_type in PERIOD_PRECEDENCE)
+            if key in goals_by_period
+        ]
+        if covering:
+            fields = {'date': day, 'goal_id': covering[0].pk}
+            for field in RATE_TARGETS:
+                fields[field] = next((getattr(goal, field) for goal in covering if getattr(goal, field) is not None), None)
+            fields['revenue_goal'] = None
+            revenue = next((daily_revenue[goal.pk] for goal in covering if goal.pk in daily_revenue), None)
+            if revenue:
+                share, last_day, last_share = revenue
+                fields['revenue_goal'] = last_share if day == last_day else share
+            rows.append(fields)
+        day += timedelta(days=1)
+    return rows
+
+
+def rebuild_goal_calendar(hotel_id, fiscal_year):
+    """Replace a hotel's calendar rows for one fiscal year from its current goals."""
+    goals = list(BudgetGoal.objects.filter(hotel_id=hotel_id, fiscal_year=fiscal_year))
+    with transaction.atomic():
+        BudgetGoalDay.objects.filter(hotel_id=hotel_id, date__year=fiscal_year).delete()
+        BudgetGoalDay.objects.bulk_create(
+            BudgetGoalDay(hotel_id=hotel_id, **fields) for fields in build_goal_calendar(fiscal_year, goals)
+        )
+
+
+def goal_vs_actual(hotel, start_date, end_date):
+    """
+    Calendar targets against actuals for a range: averaged rate targets,
+    summed revenue target, and the matching actuals from the KPI series.
+    """
+    targets = BudgetGoalDay.objects.filter(hotel=hotel, date__gte=start_date, date__lte=end_date).aggregate(
+        days_with_goals=Count('id'),
+        occupancy_goal=Avg('occupancy_goal'),
+        adr_goal=Avg('adr_goal'),
+        revpar_goal=Avg('revpar_goal'),
+        revenue_goal=Sum('revenue_goal'),
+        mpi_goal=Avg('mpi_goal'),
+        ari_goal=Avg('ari_goal'),
+        rgi_goal=Avg('rgi_goal'),
+    )
+    series = get_series('hotel', hotel.id)
+    indices = get_series('index', hotel.id)
+    actuals = {
+        'occupancy': series.avg('occupancy_percentage', start_date, end_date),
+        'adr': series.avg('average_rate', start_date, end_date),
+        'revpar': series.avg('revpar', start_date, end_date),
+        'revenue': series.sum('total_revenue', start_date, end_date),
+        'mpi': indices.avg('mpi', start_date, end_date),
+        'ari': indices.avg('ari', start_date, end_date),
+        'rgi': indices.avg('rgi', start_date, end_date),
+    }
+
+    result = {'days_with_goals': targets.pop('days_with_goals')}
+    for metric, actual in actuals.items():
+        target = targets[f'{metric}_goal']
+        result[metric] = {
+            'actual': round(actual, 2),
+            'goal': round(float(target), 2) if target is not None else None,
+            'variance': round(actual - float(target), 2) if target is not None else None,
+            'achievement': round(actual / float(target) * 100, 2) if target else None,
+        }
+    return result
+
+
+def goal_pacing(hotel, start_date, end_date):
+    """
+    Day-by-day actuals against the calendar, with running revenue and
+    revenue target so pacing can be read off any day.
+    """
+    calendar = {
+        row['date']: row
+        for row in BudgetGoalDay.objects.filter(hotel=hotel, date__gte=start_date, date__lte=end_date).values(
+            'date', 'occupancy_goal', 'adr_goal', 'revpar_goal', 'revenue_goal'
+        )
+    }
+    series = get_series('hotel', hotel.id)
+
+    days = []
+    revenue_to_date = 0.0
+    revenue_goal_to_date = 0.0
+    for offset in range((end_date - start_date).days + 1):
+        day = start_date + timedelta(days=offset)
+        goal = calendar.get(day, {})
+        has_actuals = bool(series.count('rooms_sold', day, day))
+        revenue = series.sum('total_revenue', day, day)
+        revenue_goal = float(goal['revenue_goal']) if goal.get('revenue_goal') is not None else None
+        revenue_to_date += revenue
+        revenue_goal_to_date += revenue_goal or 0
+        days.append({
+            'date': day.isoformat(),
+            'has_actuals': has_actuals,
+            'occupancy': round(series.avg('occupancy_percentage', day, day), 2) if has_actuals else None,
+            'occupancy_goal': float(goal['occupancy_goal']) if goal.get('occupancy_goal') is not None else None,
+            'adr': round(series.avg('average_rate', day, day), 2) if has_actuals else None,
+            'adr_goal': float(goal['adr_goal']) if goal.get('adr_goal') is not None else None,
+            'revpar': round(series.avg('revpar', day, day), 2) if has_actuals else None,
+            'revpar_goal': float(goal['revpar_goal']) if goal.get('revpar_goal') is not None else None,
+            'revenue': round(revenue, 2),
+            'revenue_goal': revenue_goal,
+            'revenue_to_date': round(revenue_to_date, 2),
+            'revenue_goal_to_date': round(revenue_goal_to_date, 2),
+            'pace': round(revenue_to_date / revenue_goal_to_date * 100, 2) if revenue_goal_to_date else None,
+        })
+    return days
@@ -0,0 +1,79 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from hotel_management.recompute import DEFAULT_CHUNK_DAYS, recompute_hotels
+
+
+class Command(BaseCommand):
+    help = 'Recompute market summaries, performance indices and ranks for historical dates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', type=str, help='Only dates on or after YYYY-MM-DD')
+        parser.add_argument('--end-date', type=str, help='Only dates on or before YYYY-MM-DD')
+        parser.add_argument('--hotel', type=int, action='append', dest='hotels',
+                            help='Only this hotel id (repeat for several; default all hotels)')
+        parser.add_argument('--chunk-days', type=int, default=DEFAULT_CHUNK_DAYS,
+                            help=f'Days recomputed per task (default {DEFAULT_CHUNK_DAYS})')
+        parser.add_argument('--processes', type=int, help='Worker processes (default one per CPU)')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+
+    def _parse_date(self, value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid date "{value}". Please use YYYY-MM-DD format.')
+
+    def handle(self, *args, **options):
+        start_date = self._parse_date(options['start_date'])
+        end_date = self._parse_date(options['end_date'])
+        if start_date and end_date and start_date > end_date:
+            raise CommandError('--start-date must not be after --end-date.')
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days must be at least 1.')
+        dry_run = options['dry_run']
+        started = time.monotonic()
+
+        def progress(result, done, total):
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'[{done}/{total}] hotel {result["hotel_id"]} {result["start_date"]}..{result["end_date"]}: '
+                f'{result["days"]} days, {result["summaries_created"] + result["summaries_updated"]} summaries, '
+                f'{result["indices_created"] + result["indices_updated"] + result["indices_removed"]} indices changed '
+                f'({elapsed:.1f}s)'
+            )
+            for kind, day, competitor_id, changes in result['changes']:
+                subject = f'{kind} {day}' + (f' competitor {competitor_id}' if competitor_id else '')
+                if isinstance(changes, str):
+                    self.stdout.write(f'    {subject}: {changes}')
+                    continue
+                details = ', '.join(f'{field} {old} -> {new}' for field, (old, new) in changes.items())
+                self.stdout.write(f'    {subject}: {details}')
+
+        results = recompute_hotels(
+            hotel_ids=options['hotels'],
+            start_date=start_date,
+            end_date=end_date,
+            processes=options['processes'],
+            chunk_days=options['chunk_days'],
+            dry_run=dry_run,
+            progress=progress,
+        )
+        elapsed = time.monotonic() - started
+
+        totals = {key: sum(result[key] for result in results) for key in (
+            'days', 'summaries_created', 'summaries_updated', 'indices_created', 'indices_updated',
+            'indices_removed', 'competitor_data_updated',
+        )}
+        self.stdout.write(
+            f'{totals["days"]} days recomputed{" (dry run)" if dry_run else ""}: {totals["summaries_created"]} summaries created, '
+            f'{totals["summaries_updated"]} updated; {totals["indices_created"]} indices created, '
+            f'{totals["indices_updated"]} updated, {totals["indices_removed"]} removed; '
+            f'{totals["competitor_data_updated"]} competitor data rows updated'
+        )
+        rate = totals['days'] / elapsed if elapsed else totals['days']
+        self.stdout.write(
+            self.style.SUCCESS(f'Recompute {"dry run " if dry_run else ""}completed in {elapsed:.1f}s ({rate:.0f} days/s)')
+        )
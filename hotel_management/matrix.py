@@ -0,0 +1,119 @@
+"""
+RevPAR positioning matrix: occupancy index (x) against ADR index (y) for the
+hotel and each active competitor in its competitive set.
+
+Each function reads competitor positions with a single query, whatever the
+number of competitors: a window query for the latest row per competitor, a
+grouped conditional average for any set of named date windows, and a
+grouped weekly average for the animated view.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Avg, F, Q, Window
+from django.db.models.functions import RowNumber, TruncWeek
+
+from .models import CompetitorData, PerformanceIndex
+
+# Points without an index sit on the market baseline
+BASELINE = 100
+
+
+def _point(x, y):
+    return {
+        'x': float(x) if x else BASELINE,
+        'y': float(y) if y else BASELINE,
+    }
+
+
+def latest_positions(hotel, start_date, end_date):
+    """Each party's most recent position in the range, as the matrix has always shown."""
+    latest_index = PerformanceIndex.objects.filter(
+        hotel=hotel,
+        date__gte=start_date,
+        date__lte=end_date,
+        competitor__isnull=True  # Only get hotel's own indices
+    ).order_by('-date').values('mpi', 'ari').first() or {}
+
+    rows = CompetitorData.objects.filter(
+        competitor__hotel=hotel,
+        competitor__is_active=True,
+        date__gte=start_date,
+        date__lte=end_date,
+    ).annotate(
+        position=Window(RowNumber(), partition_by=[F('competitor_id')], order_by=F('date').desc()),
+    ).filter(position=1).order_by('competitor_id').values('competitor__name', 'occupancy_index', 'adr_index')
+
+    return {
+        'hotel_data': _point(latest_index.get('mpi'), latest_index.get('ari')),
+        'competitor_data': [
+            dict(_point(row['occupancy_index'], row['adr_index']), name=row['competitor__name'])
+            for row in rows
+        ],
+    }
+
+
+def average_positions(hotel, windows):
+    """
+    Average occupancy/ADR index per active competitor of the hotel for
+    several date windows in one query.
+
+    ``windows`` maps a name to ``(start_date, end_date)``. Returns
+    ``{name: [{'x', 'y', 'name'}, ...]}`` in competitor order, leaving out
+    competitors without both averages in that window.
+    """
+    date_filter = Q()
+    aggregates = {}
+    for key, (start_date, end_date) in windows.items():
+        window = Q(date__gte=start_date, date__lte=end_date)
+        date_filter |= window
+        aggregates[f'{key}_x'] = Avg('occupancy_index', filter=window)
+        aggregates[f'{key}_y'] = Avg('adr_index', filter=window)
+
+    rows = CompetitorData.objects.filter(date_filter, competitor__hotel=hotel, competitor__is_active=True).order_by(
+        'competitor_id'
+    ).values('competitor_id', 'competitor__name').annotate(**aggregates)
+
+    positions = {key: [] for key in windows}
+    for row in rows:
+        for key in windows:
+            x, y = row[f'{key}_x'], row[f'{key}_y']
+            if x and y:
+                positions[key].append({'x': x, 'y': y, 'name': row['competitor__name']})
+    return positions
+
+
+def weekly_positions(hotel, start_date, end_date):
+    """
+    Average positions per calendar week (Monday start) for animating the
+    matrix; every frame for the range comes back in one response.
+    """
+    date_range = Q(date__gte=start_date, date__lte=end_date)
+    hotel_weeks = {
+        row['week']: _point(row['x'], row['y'])
+        for row in PerformanceIndex.objects.filter(date_range, hotel=hotel, competitor__isnull=True).annotate(
+            week=TruncWeek('date')
+        ).order_by().values('week').annotate(x=Avg('mpi'), y=Avg('ari'))
+    }
+
+    competitor_weeks = defaultdict(list)
+    for row in CompetitorData.objects.filter(date_range, competitor__hotel=hotel, competitor__is_active=True).annotate(
+        week=TruncWeek('date')
+    ).order_by('week', 'competitor_id').values('week', 'competitor_id', 'competitor__name').annotate(
+        x=Avg('occupancy_index'), y=Avg('adr_index')
+    ):
+        if row['x'] and row['y']:
+            competitor_weeks[row['week']].append(
+                dict(_point(row['x'], row['y']), name=row['competitor__name'])
+            )
+
+    frames = []
+    week = start_date - timedelta(days=start_date.weekday())
+    while week <= end_date:
+        frames.append({
+            'week_start': week.isoformat(),
+            'hotel_data': hotel_weeks.get(week, _point(None, None)),
+            'competitor_data': competitor_weeks.get(week, []),
+        })
+        week += timedelta(days=7)
+    return frames
@@ -0,0 +1,111 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:00
+
+from calendar import monthrange
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+               'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+RATE_TARGETS = ('occupancy_goal', 'adr_goal', 'revpar_goal', 'mpi_goal', 'ari_goal', 'rgi_goal')
+# Most specific first
+PERIOD_PRECEDENCE = ('monthly', 'quarter', 'annual')
+
+
+def goal_period(goal):
+    year = goal.fiscal_year
+    if goal.period_type == 'annual':
+        return date(year, 1, 1), date(year, 12, 31)
+    if goal.period_type == 'quarter' and goal.period_detail in ('Q1', 'Q2', 'Q3', 'Q4'):
+        first_month = (int(goal.period_detail[1]) - 1) * 3 + 1
+        last_month = first_month + 2
+        return date(year, first_month, 1), date(year, last_month, monthrange(year, last_month)[1])
+    if goal.period_type == 'monthly' and goal.period_detail in MONTH_NAMES:
+        month = MONTH_NAMES.index(goal.period_detail) + 1
+        return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+    return None
+
+
+def period_key(goal_type, day):
+    if goal_type == 'monthly':
+        return MONTH_NAMES[day.month - 1]
+    if goal_type == 'quarter':
+        return f'Q{(day.month - 1) // 3 + 1}'
+    return ''
+
+
+def build_goal_calendar(fiscal_year, goals):
+    # Same rules as hotel_management.goals.build_goal_calendar
+    goals_by_period = {(goal.period_type, goal.period_detail): goal for goal in goals}
+    daily_revenue = {}
+    for goal in goals_by_period.values():
+        period = goal_period(goal)
+        if period and goal.total_revenue_budget is not None:
+            days = (period[1] - period[0]).days + 1
+            share = (goal.total_revenue_budget / days).quantize(Decimal('0.01'), ROUND_HALF_UP)
+            daily_revenue[goal.pk] = (share, period[1], goal.total_revenue_budget - share * (days - 1))
+
+    rows = []
+    day = date(fiscal_year, 1, 1)
+    while day.year == fiscal_year:
+        covering = [
+            goals_by_period[key]
+            for key in ((goal_type, period_key(goal_type, day)) for goal_type in PERIOD_PRECEDENCE)
+            if key in goals_by_period
+        ]
+        if covering:
+            fields = {'date': day, 'goal_id': covering[0].pk}
+            for field in RATE_TARGETS:
+                fields[field] = next((getattr(goal, field) for goal in covering if getattr(goal, field) is not None), None)
+            fields['revenue_goal'] = None
+            revenue = next((daily_revenue[goal.pk] for goal in covering if goal.pk in daily_revenue), None)
+            if revenue:
+                share, last_day, last_share = revenue
+                fields['revenue_goal'] = last_share if day == last_day else share
+            rows.append(fields)
+        day += timedelta(days=1)
+    return rows
+
+
+def populate_goal_calendar(apps, schema_editor):
+    BudgetGoal = apps.get_model('hotel_management', 'BudgetGoal')
+    BudgetGoalDay = apps.get_model('hotel_management', 'BudgetGoalDay')
+
+    for hotel_id, fiscal_year in BudgetGoal.objects.values_list('hotel_id', 'fiscal_year').distinct():
+        goals = BudgetGoal.objects.filter(hotel_id=hotel_id, fiscal_year=fiscal_year)
+        BudgetGoalDay.objects.bulk_create(
+            BudgetGoalDay(hotel_id=hotel_id, **fields) for fields in build_goal_calendar(fiscal_year, goals)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel_management', '0017_remove_budgetlineitem_account_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetGoalDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('occupancy_goal', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('adr_goal', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('revpar_goal', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('revenue_goal', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('mpi_goal', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('ari_goal', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('rgi_goal', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('goal', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='calendar_days', to='hotel_management.budgetgoal')),
+                ('hotel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='goal_calendar', to='hotel_management.hotel')),
+            ],
+            options={
+                'ordering': ['date'],
+                'unique_together': {('hotel', 'date')},
+            },
+        ),
+        migrations.RunPython(populate_goal_calendar, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def assign_existing_rows(apps, schema_editor):
+    # Single-property installs: everything so far belongs to the one hotel
+    Hotel = apps.get_model('hotel_management', 'Hotel')
+    Competitor = apps.get_model('hotel_management', 'Competitor')
+    MarketSummary = apps.get_model('hotel_management', 'MarketSummary')
+
+    hotel = Hotel.objects.order_by('pk').first()
+    if hotel:
+        Competitor.objects.filter(hotel__isnull=True).update(hotel=hotel)
+        MarketSummary.objects.filter(hotel__isnull=True).update(hotel=hotel)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel_management', '0018_budgetgoalday'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competitor',
+            name='hotel',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='competitors', to='hotel_management.hotel'),
+        ),
+        migrations.AddField(
+            model_name='marketsummary',
+            name='hotel',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='market_summaries', to='hotel_management.hotel'),
+        ),
+        migrations.AlterField(
+            model_name='marketsummary',
+            name='date',
+            field=models.DateField(),
+        ),
+        migrations.RunPython(assign_existing_rows, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='marketsummary',
+            unique_together={('hotel', 'date')},
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from decimal import Decimal
 import json
@@ -22,6 +22,7 @@ class Competitor(models.Model):
         ('active', 'Active'),
         ('inactive', 'Inactive')
     ]
+    hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name='competitors', null=True, blank=True)
     name = models.CharField(max_length=200)
     address = models.TextField()
     total_rooms = models.IntegerField()
@@ -101,12 +102,15 @@ class DailyData(models.Model):
             print(f"Value of rooms_sold: {self.rooms_sold}")
             raise
         
-        super().save(*args, **kwargs)
-        
-        # After saving, update market summary and performance indices
-        from .utils import update_market_summary
-        # Update market summary and performance indices
-        update_market_summary(self.date, skip_performance_update=False)
+        # One transaction, so the signal handlers refresh the hotel's caches
+        # once for the row and every summary and index it updates
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            # After saving, update market summary and performance indices
+            from .utils import update_market_summary
+            # Update market summary and performance indices
+            update_market_summary(self.date, skip_performance_update=False, hotel_id=self.hotel_id)
 
 class CompetitorData(models.Model):
     date = models.DateField()
@@ -174,15 +178,17 @@ class CompetitorData(models.Model):
             print(f"Value of total_rooms: {self.competitor.total_rooms}")
             raise
             
-        super().save(*args, **kwargs)
-        
-        # After saving, update market summary and performance indices
-        from .utils import update_market_summary
-        # Allow performance update for CompetitorData since it's the final step
-        update_market_summary(self.date, skip_performance_update=False)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            # After saving, update market summary and performance indices
+            from .utils import update_market_summary
+            # Allow performance update for CompetitorData since it's the final step
+            update_market_summary(self.date, skip_performance_update=False, hotel_id=self.competitor.hotel_id)
 
 class MarketSummary(models.Model):
-    date = models.DateField(unique=True)
+    hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name='market_summaries', null=True, blank=True)
+    date = models.DateField()
     total_rooms_available = models.IntegerField()
     total_rooms_sold = models.IntegerField()
     total_revenue = models.DecimalField(max_digits=12, decimal_places=2)
@@ -196,12 +202,20 @@ class MarketSummary(models.Model):
     class Meta:
         ordering = ['-date']
         verbose_name_plural = 'Market Summaries'
+        unique_together = ['hotel', 'date']
     
     def __str__(self):
         return f"Market Summary - {self.date}"
     
     def save(self, *args, **kwargs):
-        # Calculate market metrics
+        self.calculate_metrics()
+        if kwargs.get('update_fields') is not None:
+            # update_or_create only lists the totals it was given
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'market_occupancy', 'market_adr', 'market_revpar'}
+        super().save(*args, **kwargs)
+    
+    def calculate_metrics(self):
+        """Derive occupancy, ADR and RevPAR from the totals; bulk writes call this directly."""
         if self.total_rooms_available > 0:
             self.market_occupancy = (Decimal(self.total_rooms_sold) / Decimal(self.total_rooms_available)) * Decimal('100')
         else:
@@ -216,8 +230,6 @@ class MarketSummary(models.Model):
             self.market_revpar = self.total_revenue / Decimal(self.total_rooms_available)
         else:
             self.market_revpar = Decimal('0.00')
-            
-        super().save(*args, **kwargs)
 
 class PerformanceIndex(models.Model):
     date = models.DateField()
@@ -313,4 +325,32 @@ class BudgetGoal(models.Model):
         label = f"{self.fiscal_year} {self.period_type}"
         if self.period_detail:
             label += f" {self.period_detail}"
-        return f"{self.hotel.name} — {label}"
\ No newline at end of file
+        return f"{self.hotel.name} — {label}"
+
+
+class BudgetGoalDay(models.Model):
+    """
+    One day of the goal calendar. Each target comes from the most specific
+    BudgetGoal covering the day that sets it (monthly, then quarter, then
+    annual); revenue is the goal's budget spread evenly over its period.
+    Rebuilt from BudgetGoal by hotel_management.goals whenever goals change.
+    """
+    hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name='goal_calendar')
+    date = models.DateField()
+    goal = models.ForeignKey(BudgetGoal, null=True, blank=True, on_delete=models.SET_NULL, related_name='calendar_days')
+
+    occupancy_goal = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    adr_goal = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    revpar_goal = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    revenue_goal = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+
+    mpi_goal = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    ari_goal = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    rgi_goal = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        unique_together = ('hotel', 'date')
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.hotel.name} — goals for {self.date}"
@@ -0,0 +1,268 @@
+"""
+Recompute market summaries, performance indices and ranks from the daily
+data, for history as well as today.
+
+The figures for a day depend on the hotel's room count and on which
+competitors are active, so changing either leaves older summaries stale.
+``recompute_chunk`` rebuilds one hotel's figures for a date range in
+memory, with the same arithmetic as the live path in ``utils.py``, and
+writes the rows that changed with bulk_create/bulk_update. Hotels and
+date ranges share no rows, so ``recompute_hotels`` splits the work into
+(hotel, chunk of days) tasks and spreads them across a process pool. The
+parent closes its database connections before the pool starts, so every
+worker opens its own instead of sharing the parent's sockets.
+
+Bulk writes skip the model signals, so once a hotel is done its index
+series and dashboard version are refreshed explicitly.
+"""
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+from django.db import connections, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .dashboard import bump_dashboard_version
+from .models import CompetitorData, DailyData, MarketSummary, PerformanceIndex
+from .registry import get_active_competitors, get_hotel, get_hotels
+from .timeseries import invalidate_series
+from .utils import calculate_performance_indices, rank_performance_indices
+
+DEFAULT_CHUNK_DAYS = 31
+
+CENT = Decimal('0.01')
+SUMMARY_FIELDS = ('total_rooms_available', 'total_rooms_sold', 'total_revenue',
+                  'market_occupancy', 'market_adr', 'market_revpar')
+INDEX_FIELDS = ('market_summary', 'fair_market_share', 'actual_market_share', 'mpi', 'ari', 'rgi',
+                'mpi_rank', 'ari_rank', 'rgi_rank')
+COMPETITOR_INDEX_FIELDS = {'occupancy_index': 'mpi', 'adr_index': 'ari', 'revenue_index': 'rgi'}
+
+# Changed rows listed per chunk in a dry run
+DIFF_SAMPLE_SIZE = 20
+
+
+def _stored(value):
+    """A value as its two-decimal column will hold it."""
+    return value.quantize(CENT) if isinstance(value, Decimal) else value
+
+
+def _changes(instance, values):
+    """{field: (stored, recomputed)} for the fields that differ."""
+    changes = {}
+    for field, value in values.items():
+        old = getattr(instance, field)
+        if _stored(old) != _stored(value):
+            changes[field] = (old, _stored(value))
+    return changes
+
+
+def date_chunks(start_date, end_date, days=DEFAULT_CHUNK_DAYS):
+    """Consecutive (first day, last day) ranges of at most ``days`` days covering the range."""
+    chunks = []
+    while start_date <= end_date:
+        chunk_end = min(start_date + timedelta(days=days - 1), end_date)
+        chunks.append((start_date, chunk_end))
+        start_date = chunk_end + timedelta(days=1)
+    return chunks
+
+
+def recompute_chunk(hotel_id, start_date, end_date, dry_run=False):
+    """
+    Rebuild one hotel's market summaries, indices and ranks for the days in
+    the range that have hotel data.
+
+    Competitor indices without current data behind them (a competitor
+    deactivated since, or a deleted competitor data row) are removed.
+    Returns counts of days and of created, updated and removed rows; a dry
+    run writes nothing and adds a sample of the changes.
+    """
+    result = {
+        'hotel_id': hotel_id, 'start_date': start_date, 'end_date': end_date, 'days': 0,
+        'summaries_created': 0, 'summaries_updated': 0,
+        'indices_created': 0, 'indices_updated': 0, 'indices_removed': 0,
+        'competitor_data_updated': 0, 'changes': [],
+    }
+    hotel = get_hotel(hotel_id)
+    if not hotel:
+        return result
+    competitors = {competitor.id: competitor for competitor in get_active_competitors(hotel_id)}
+
+    date_range = {'date__gte': start_date, 'date__lte': end_date}
+    daily = {row.date: row for row in DailyData.objects.filter(hotel_id=hotel_id, **date_range)}
+    competitor_rows = defaultdict(list)
+    for row in CompetitorData.objects.filter(competitor_id__in=competitors, **date_range).order_by('competitor_id'):
+        competitor_rows[row.date].append(row)
+    summaries = {row.date: row for row in MarketSummary.objects.filter(hotel_id=hotel_id, **date_range)}
+    stored_indices = {
+        (row.date, row.competitor_id): row
+        for row in PerformanceIndex.objects.filter(hotel_id=hotel_id, **date_range)
+    }
+    now = timezone.now()
+
+    def note(kind, day, competitor_id, changes):
+        if dry_run and changes and len(result['changes']) < DIFF_SAMPLE_SIZE:
+            result['changes'].append((kind, day, competitor_id, changes))
+
+    new_summaries, changed_summaries = [], []
+    new_indices, changed_indices, changed_competitor_data = [], [], []
+    for day, hotel_data in sorted(daily.items()):
+        rows = competitor_rows[day]
+        summary = MarketSummary(
+            hotel_id=hotel_id,
+            date=day,
+            total_rooms_available=hotel.total_rooms + sum(competitors[row.competitor_id].total_rooms for row in rows),
+            total_rooms_sold=hotel_data.rooms_sold + sum(row.rooms_sold for row in rows),
+            total_revenue=hotel_data.total_revenue + sum(
+                (Decimal(row.rooms_sold) * Decimal(row.estimated_average_rate) for row in rows), Decimal('0')
+            ),
+        )
+        summary.calculate_metrics()
+        stored = summaries.get(day)
+        if stored is None:
+            summaries[day] = summary
+            new_summaries.append(summary)
+            note('market summary', day, None, 'created')
+        else:
+            changes = _changes(stored, {field: getattr(summary, field) for field in SUMMARY_FIELDS})
+            note('market summary', day, None, changes)
+            if changes:
+                for field in SUMMARY_FIELDS:
+                    setattr(stored, field, getattr(summary, field))
+                stored.updated_at = now
+                changed_summaries.append(stored)
+        result['days'] += 1
+
+        # Indices use the unrounded market metrics, as they do on save
+        day_indices = {None: calculate_performance_indices(
+            hotel.total_rooms, hotel_data.rooms_sold, hotel_data.average_rate, hotel_data.revpar, summary
+        )}
+        for row in rows:
+            day_indices[row.competitor_id] = calculate_performance_indices(
+                competitors[row.competitor_id].total_rooms, row.rooms_sold, Decimal(row.estimated_average_rate),
+                row.revpar, summary
+            )
+        # Ranks compare the stored values, as update_performance_rankings does
+        ranked = [
+            PerformanceIndex(**{metric: _stored(day_indices[row.competitor_id][metric]) for metric in ('mpi', 'ari', 'rgi')})
+            for row in rows
+        ]
+        for row, ranks in zip(rows, rank_performance_indices(ranked, [competitors[row.competitor_id].name for row in rows])):
+            day_indices[row.competitor_id].update(ranks)
+
+        for competitor_id, values in day_indices.items():
+            stored = stored_indices.pop((day, competitor_id), None)
+            if stored is None:
+                new_indices.append(PerformanceIndex(hotel_id=hotel_id, competitor_id=competitor_id, date=day, **values))
+                note('index', day, competitor_id, 'created')
+                continue
+            changes = _changes(stored, values)
+            if stored.market_summary_id != summaries[day].pk:
+                changes['market_summary'] = (stored.market_summary_id, summaries[day].pk)
+            note('index', day, competitor_id, changes)
+            if changes:
+                for field, value in values.items():
+                    setattr(stored, field, value)
+                stored.updated_at = now
+                changed_indices.append(stored)
+        for row in rows:
+            values = {field: day_indices[row.competitor_id][metric] for field, metric in COMPETITOR_INDEX_FIELDS.items()}
+            changes = _changes(row, values)
+            note('competitor data', day, row.competitor_id, changes)
+            if changes:
+                for field, value in values.items():
+                    setattr(row, field, value)
+                changed_competitor_data.append(row)
+
+    # Leftover competitor indices on recomputed days, and those of inactive
+    # competitors on any day, no longer have data behind them
+    stale = [
+        row for (day, competitor_id), row in stored_indices.items()
+        if competitor_id is not None and (day in daily or competitor_id not in competitors)
+    ]
+    for row in stale:
+        note('index', row.date, row.competitor_id, 'removed')
+
+    result.update(
+        summaries_created=len(new_summaries),
+        summaries_updated=len(changed_summaries),
+        indices_created=len(new_indices),
+        indices_updated=len(changed_indices),
+        indices_removed=len(stale),
+        competitor_data_updated=len(changed_competitor_data),
+    )
+    if dry_run:
+        return result
+
+    with transaction.atomic():
+        MarketSummary.objects.bulk_create(new_summaries)
+        MarketSummary.objects.bulk_update(changed_summaries, [*SUMMARY_FIELDS, 'updated_at'])
+        PerformanceIndex.objects.filter(pk__in=[row.pk for row in stale]).delete()
+        # New summaries only have ids once created
+        for index in [*new_indices, *changed_indices]:
+            index.market_summary = summaries[index.date]
+        PerformanceIndex.objects.bulk_update(changed_indices, [*INDEX_FIELDS, 'updated_at'])
+        PerformanceIndex.objects.bulk_create(new_indices)
+        CompetitorData.objects.bulk_update(changed_competitor_data, list(COMPETITOR_INDEX_FIELDS))
+    return result
+
+
+def recompute_tasks(hotel_ids=None, start_date=None, end_date=None, chunk_days=DEFAULT_CHUNK_DAYS):
+    """
+    (hotel_id, first day, last day) tasks covering each hotel's daily data,
+    clamped to the range when one is given.
+    """
+    if hotel_ids is None:
+        hotel_ids = [hotel.pk for hotel in get_hotels()]
+    bounds = {
+        row['hotel_id']: (row['first'], row['last'])
+        for row in DailyData.objects.filter(hotel_id__in=hotel_ids).order_by().values('hotel_id').annotate(
+            first=Min('date'), last=Max('date')
+        )
+    }
+    tasks = []
+    for hotel_id in hotel_ids:
+        if hotel_id not in bounds:
+            continue
+        first, last = bounds[hotel_id]
+        first = max(first, start_date) if start_date else first
+        last = min(last, end_date) if end_date else last
+        tasks.extend((hotel_id, chunk_start, chunk_end) for chunk_start, chunk_end in date_chunks(first, last, chunk_days))
+    return tasks
+
+
+def recompute_hotels(hotel_ids=None, start_date=None, end_date=None, processes=None,
+                     chunk_days=DEFAULT_CHUNK_DAYS, dry_run=False, progress=None):
+    """
+    Recompute several hotels (all of them by default) in chunks of
+    ``chunk_days`` across ``processes`` worker processes, calling
+    ``progress(result, done, total)`` as each chunk finishes. Returns the
+    chunk results.
+    """
+    tasks = recompute_tasks(hotel_ids, start_date, end_date, chunk_days)
+    processes = processes or os.cpu_count() or 1
+    results = []
+
+    def finished(result):
+        results.append(result)
+        if progress:
+            progress(result, len(results), len(tasks))
+
+    if processes == 1 or len(tasks) <= 1:
+        for task in tasks:
+            finished(recompute_chunk(*task, dry_run=dry_run))
+    else:
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=min(processes, len(tasks)), initializer=django.setup) as pool:
+            futures = [pool.submit(recompute_chunk, *task, dry_run=dry_run) for task in tasks]
+            for future in as_completed(futures):
+                finished(future.result())
+
+    if not dry_run:
+        for hotel_id in {task[0] for task in tasks}:
+            invalidate_series('index', hotel_id)
+            bump_dashboard_version(hotel_id)
+    return results
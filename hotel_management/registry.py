@@ -0,0 +1,107 @@
+"""
+Per-process registry of the hotels and their active competitive sets.
+
+Nearly every view starts by looking up its hotel and that hotel's active
+competitors, which rarely change. The registry keeps all properties in
+process memory and checks a single cache key per lookup: the signal
+handlers in ``signals.py`` replace that version token whenever a Hotel or
+Competitor is saved or deleted, so every worker reloads on its next lookup.
+Lookups are dictionary reads, so their cost does not grow with the number
+of properties.
+
+Callers get copies, so a view that edits the instance it was handed
+cannot change what other requests see.
+"""
+import copy
+import threading
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from .models import Competitor, Hotel
+
+REGISTRY_VERSION_KEY = 'hotel_registry_version'
+
+# Session key holding the property the user is working on
+HOTEL_SESSION_KEY = 'hotel_id'
+
+_lock = threading.Lock()
+_state = {'version': None, 'hotels': {}, 'default': None, 'competitors': {}}
+
+
+def registry_version():
+    """Token that changes whenever a hotel or competitor changes."""
+    version = cache.get(REGISTRY_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(REGISTRY_VERSION_KEY, version, None)
+        version = cache.get(REGISTRY_VERSION_KEY, version)
+    return version
+
+
+def bump_registry_version():
+    cache.set(REGISTRY_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _current_state():
+    version = registry_version()
+    if _state['version'] != version:
+        with _lock:
+            if _state['version'] != version:
+                hotels = {hotel.pk: hotel for hotel in Hotel.objects.order_by('pk')}
+                competitors = defaultdict(list)
+                for competitor in Competitor.objects.filter(is_active=True).order_by('pk'):
+                    competitors[competitor.hotel_id].append(competitor)
+                _state.update(
+                    hotels=hotels,
+                    default=next(iter(hotels), None),
+                    competitors={hotel_id: tuple(rows) for hotel_id, rows in competitors.items()},
+                    version=version,
+                )
+    return _state
+
+
+def _resolve(state, hotel_id):
+    if hotel_id is None:
+        return state['default']
+    try:
+        hotel_id = int(hotel_id)
+    except (TypeError, ValueError):
+        return None
+    return hotel_id if hotel_id in state['hotels'] else None
+
+
+def get_hotel(hotel_id=None):
+    """
+    The hotel with ``hotel_id``, or the first hotel when no id is given, as
+    ``Hotel.objects.first()`` would return it. None when there is no match.
+    """
+    state = _current_state()
+    hotel_id = _resolve(state, hotel_id)
+    return copy.copy(state['hotels'][hotel_id]) if hotel_id is not None else None
+
+
+def get_hotels():
+    """Every hotel in id order."""
+    return [copy.copy(hotel) for hotel in _current_state()['hotels'].values()]
+
+
+def get_active_competitors(hotel_id=None):
+    """The hotel's active competitors in id order, as a list."""
+    state = _current_state()
+    hotel_id = _resolve(state, hotel_id)
+    return [copy.copy(competitor) for competitor in state['competitors'].get(hotel_id, ())]
+
+
+def active_competitor_count(hotel_id=None):
+    state = _current_state()
+    return len(state['competitors'].get(_resolve(state, hotel_id), ()))
+
+
+def request_hotel(request):
+    """The hotel selected in the user's session, falling back to the first hotel."""
+    # Requests without a session, and a hotel deleted since it was
+    # selected, fall back as well
+    session = getattr(request, 'session', {})
+    return get_hotel(session.get(HOTEL_SESSION_KEY)) or get_hotel()
@@ -0,0 +1,127 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .dashboard import bump_dashboard_version, precompute_default_snapshot
+from .goals import rebuild_goal_calendar
+from .models import BudgetGoal, Competitor, CompetitorData, DailyData, Hotel, PerformanceIndex
+from .registry import bump_registry_version
+from .timeseries import invalidate_series
+
+
+def _series_entity(instance):
+    """(kind, entity id) of the KPI series a row belongs to, or None."""
+    if isinstance(instance, DailyData):
+        return 'hotel', instance.hotel_id
+    if isinstance(instance, CompetitorData):
+        return 'competitor', instance.competitor_id
+    if isinstance(instance, PerformanceIndex) and instance.competitor_id is None:
+        return 'index', instance.hotel_id
+    return None
+
+
+def _hotel_id(instance):
+    """Id of the hotel a row belongs to, or None."""
+    if isinstance(instance, Hotel):
+        return instance.pk
+    if isinstance(instance, CompetitorData):
+        try:
+            return instance.competitor.hotel_id
+        except Competitor.DoesNotExist:
+            # Deleted along with its competitor, whose own signal covers the hotel
+            return None
+    return instance.hotel_id
+
+
+def _on_commit_once(key, func):
+    """
+    Run ``func`` once the current transaction commits, once however many rows
+    of the transaction ask for the same ``key``.
+    """
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        savepoints = set(connection.savepoint_ids)
+        for callback_savepoints, callback, _ in connection.run_on_commit:
+            # A callback from a savepoint that may still roll back does not count
+            if getattr(callback, 'commit_key', None) == key and callback_savepoints <= savepoints:
+                return
+
+    def callback():
+        func()
+    callback.commit_key = key
+    transaction.on_commit(callback)
+
+
+@receiver(post_save, sender=DailyData)
+@receiver(post_save, sender=CompetitorData)
+@receiver(post_save, sender=PerformanceIndex)
+@receiver(post_delete, sender=DailyData)
+@receiver(post_delete, sender=CompetitorData)
+@receiver(post_delete, sender=PerformanceIndex)
+def refresh_kpi_series(sender, instance, **kwargs):
+    # After commit, so no series is built from rows another transaction may
+    # still roll back, and rebuilt rather than patched, so concurrent writers
+    # cannot lose each other's days
+    entity = _series_entity(instance)
+    if entity is not None:
+        _on_commit_once(('kpi_series', *entity), lambda: invalidate_series(*entity))
+
+
+@receiver(post_save, sender=Hotel)
+@receiver(post_save, sender=Competitor)
+@receiver(post_delete, sender=Hotel)
+@receiver(post_delete, sender=Competitor)
+def refresh_hotel_registry(sender, instance, **kwargs):
+    # Every worker reloads the hotel and competitor set on its next lookup;
+    # bumped again on commit so no worker keeps a load from before it
+    bump_registry_version()
+    transaction.on_commit(bump_registry_version)
+
+
+@receiver(post_save, sender=Hotel)
+@receiver(post_save, sender=Competitor)
+@receiver(post_save, sender=DailyData)
+@receiver(post_save, sender=CompetitorData)
+@receiver(post_save, sender=PerformanceIndex)
+@receiver(post_save, sender=BudgetGoal)
+@receiver(post_delete, sender=Hotel)
+@receiver(post_delete, sender=Competitor)
+@receiver(post_delete, sender=DailyData)
+@receiver(post_delete, sender=CompetitorData)
+@receiver(post_delete, sender=PerformanceIndex)
+@receiver(post_delete, sender=BudgetGoal)
+def refresh_dashboard_snapshot(sender, instance, **kwargs):
+    hotel_id = _hotel_id(instance)
+    if hotel_id is None:
+        return
+
+    # Bumped only on commit: a request served before then would otherwise
+    # cache a snapshot of the old rows under the new version. Once per hotel
+    # per transaction, however many rows it touched
+    def refresh():
+        bump_dashboard_version(hotel_id)
+        precompute_default_snapshot(hotel_id)
+    _on_commit_once(('dashboard', hotel_id), refresh)
+
+
+@receiver(pre_save, sender=BudgetGoal)
+def remember_previous_fiscal_year(sender, instance, **kwargs):
+    # Moving a goal to another year leaves the old year's calendar to rebuild
+    instance._calendar_previous_year = None
+    if instance.pk:
+        instance._calendar_previous_year = sender.objects.filter(pk=instance.pk).values_list('fiscal_year', flat=True).first()
+
+
+@receiver(post_save, sender=BudgetGoal)
+@receiver(post_delete, sender=BudgetGoal)
+def refresh_goal_calendar(sender, instance, update_fields=None, **kwargs):
+    # Saves that only touch the lock or notes leave every target as it was
+    if update_fields and not set(update_fields) - {'lock_targets', 'notes', 'updated_by', 'updated_at'}:
+        return
+    # After commit, so a hotel deleted along with its goals gets no new rows
+    years = {instance.fiscal_year}
+    previous_year = getattr(instance, '_calendar_previous_year', None)
+    if previous_year:
+        years.add(previous_year)
+    for year in years:
+        transaction.on_commit(lambda year=year: rebuild_goal_calendar(instance.hotel_id, year))
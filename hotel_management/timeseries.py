@@ -0,0 +1,161 @@
+"""
+Prefix-sum KPI series kept in the cache.
+
+Each entity (the hotel, a competitor, or the hotel's own performance index
+rows) has one dense day-indexed series per metric: running sums and running
+non-null counts starting at the entity's first day. A total or an average
+over any date range is then two array lookups, so date pickers and chart
+APIs can answer ad-hoc ranges without querying the database.
+
+Series are built lazily with one query per entity and cached per entity
+and data version. Once a transaction that changed an entity's rows
+commits, the signal handlers in ``signals.py`` call ``invalidate_series``,
+which moves the entity to a new version. A series built from data read
+before the commit is stored under the old version and never served again,
+and concurrent writers cannot overwrite each other's changes.
+"""
+import uuid
+from array import array
+from datetime import date, timedelta
+
+from django.core.cache import cache
+
+from .models import CompetitorData, DailyData, PerformanceIndex
+
+KPI_SERIES_CACHE_TIMEOUT = 60 * 60 * 24
+
+# kind -> (model, entity field, extra filters, metrics)
+KPI_SERIES_SOURCES = {
+    'hotel': (DailyData, 'hotel_id', {}, (
+        'rooms_sold', 'total_rooms', 'total_revenue', 'occupancy_percentage', 'average_rate', 'revpar',
+    )),
+    'competitor': (CompetitorData, 'competitor_id', {}, (
+        'rooms_sold', 'total_rooms', 'estimated_occupancy', 'estimated_average_rate', 'revpar',
+    )),
+    # The hotel's own indices; competitor rows are ranked separately
+    'index': (PerformanceIndex, 'hotel_id', {'competitor__isnull': True}, (
+        'mpi', 'ari', 'rgi', 'fair_market_share', 'actual_market_share',
+    )),
+}
+
+
+class KPISeries:
+    """Running sums and non-null counts per metric, indexed by day from ``origin``."""
+
+    def __init__(self, metrics, origin=None, days=0):
+        self.metrics = tuple(metrics)
+        self.origin = origin.toordinal() if origin else None
+        self.sums = {metric: array('d', [0.0] * (days + 1)) for metric in self.metrics}
+        self.counts = {metric: array('l', [0] * (days + 1)) for metric in self.metrics}
+
+    @property
+    def days(self):
+        return len(self.sums[self.metrics[0]]) - 1 if self.metrics else 0
+
+    @property
+    def first_date(self):
+        return date.fromordinal(self.origin) if self.origin is not None else None
+
+    @property
+    def last_date(self):
+        return date.fromordinal(self.origin + self.days - 1) if self.origin is not None and self.days else None
+
+    @classmethod
+    def from_rows(cls, metrics, rows):
+        """Build from ``(date, value, ...)`` rows ordered by date; several rows per day are summed."""
+        rows = list(rows)
+        if not rows:
+            return cls(metrics)
+        first, last = rows[0][0], rows[-1][0]
+        series = cls(metrics, first, (last - first).days + 1)
+        daily = {metric: ([0.0] * series.days, [0] * series.days) for metric in series.metrics}
+        for row in rows:
+            offset = row[0].toordinal() - series.origin
+            for position, metric in enumerate(series.metrics, 1):
+                if row[position] is not None:
+                    daily[metric][0][offset] += float(row[position])
+                    daily[metric][1][offset] += 1
+        for metric in series.metrics:
+            sums, counts = series.sums[metric], series.counts[metric]
+            day_sums, day_counts = daily[metric]
+            for offset in range(series.days):
+                sums[offset + 1] = sums[offset] + day_sums[offset]
+                counts[offset + 1] = counts[offset] + day_counts[offset]
+        return series
+
+    def _bounds(self, start_date, end_date):
+        if self.origin is None:
+            return 0, 0
+        lo = min(max(start_date.toordinal() - self.origin, 0), self.days)
+        hi = min(max(end_date.toordinal() - self.origin + 1, 0), self.days)
+        return lo, max(lo, hi)
+
+    def sum(self, metric, start_date, end_date):
+        lo, hi = self._bounds(start_date, end_date)
+        return self.sums[metric][hi] - self.sums[metric][lo]
+
+    def count(self, metric, start_date, end_date):
+        lo, hi = self._bounds(start_date, end_date)
+        return self.counts[metric][hi] - self.counts[metric][lo]
+
+    def avg(self, metric, start_date, end_date):
+        """Average of non-null values in the range, like SQL AVG; 0 when there are none."""
+        count = self.count(metric, start_date, end_date)
+        return self.sum(metric, start_date, end_date) / count if count else 0
+
+def _version_key(kind, entity_id):
+    return f'kpi_series_version:{kind}:{entity_id}'
+
+
+def series_version(kind, entity_id):
+    """Token that changes whenever the entity's rows change."""
+    key = _version_key(kind, entity_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def _cache_key(kind, entity_id):
+    return f'kpi_series:{kind}:{entity_id}:{series_version(kind, entity_id)}'
+
+
+def _source_queryset(kind, entity_id):
+    model, entity_field, filters, _ = KPI_SERIES_SOURCES[kind]
+    return model.objects.filter(**{entity_field: entity_id}, **filters)
+
+
+def build_series(kind, entity_id):
+    """Read the entity's rows once and return a fresh KPISeries."""
+    metrics = KPI_SERIES_SOURCES[kind][3]
+    rows = _source_queryset(kind, entity_id).order_by('date').values_list('date', *metrics)
+    return KPISeries.from_rows(metrics, rows)
+
+
+def get_series(kind, entity_id):
+    """Cached KPISeries for an entity, built on first use."""
+    key = _cache_key(kind, entity_id)
+    series = cache.get(key)
+    if series is None:
+        series = build_series(kind, entity_id)
+        cache.set(key, series, KPI_SERIES_CACHE_TIMEOUT)
+    return series
+
+
+def invalidate_series(kind, entity_id):
+    """Move the entity to a new version, so its series is rebuilt on next use."""
+    # A fresh random token, so a lost version key can never resurrect an old series
+    cache.set(_version_key(kind, entity_id), uuid.uuid4().hex, None)
+
+
+def month_windows(start_date, end_date):
+    """Calendar-month buckets clamped to the range, as (first day of month, start, end)."""
+    windows = []
+    month = start_date.replace(day=1)
+    while month <= end_date:
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        windows.append((month, max(month, start_date), min(next_month - timedelta(days=1), end_date)))
+        month = next_month
+    return windows
@@ -1,6 +1,7 @@
 from django.urls import path
 from . import views
 from . import views_api
+from . import views_export
 from django.http import JsonResponse
 
 app_name = 'hotel_management'
@@ -8,6 +9,7 @@ app_name = 'hotel_management'
 urlpatterns = [
     path('', views.home, name='home'),
     path('hotel-data/', views.hotel_competitor_management, name='hotel_data'),
+    path('select-hotel/', views.select_hotel, name='select_hotel'),
     
     path('data-entry/', views.data_entry, name='data_entry'),
     path('budget-goals/', views.budget_goals, name='budget_goals'),
@@ -19,4 +21,8 @@ urlpatterns = [
     path('api/hotel/performance_indicators/', views.performance_indicators_api, name='performance-indicators-api'),
     path('api/chart-data/', views_api.chart_data_api, name='chart-data-api'),
     path('api/performance-indices/', views_api.performance_indices_api, name='performance-indices-api'),
+    path('api/kpi-range/', views_api.kpi_range_api, name='kpi-range-api'),
+    path('api/goal-pacing/', views_api.goal_pacing_api, name='goal-pacing-api'),
+    path('api/budget-forecast/', views_api.budget_forecast_api, name='budget-forecast-api'),
+    path('api/export/<slug:dataset>/<str:export_format>/', views_export.data_export_api, name='data-export-api'),
 ]
\ No newline at end of file
@@ -3,7 +3,7 @@ from decimal import Decimal
 from datetime import datetime
 from .models import CompetitorData
 
-def update_market_summary(date, skip_performance_update=False):
+def update_market_summary(date, skip_performance_update=False, hotel_id=None):
     """
     Update or create market summary and performance indices for a specific date
     This function is called after saving DailyData or CompetitorData
@@ -11,9 +11,11 @@ def update_market_summary(date, skip_performance_update=False):
     Args:
         date: The date to update market summary for
         skip_performance_update: If True, skip updating performance indices to prevent recursion
+        hotel_id: The hotel whose market to summarise; defaults to the first hotel
     """
     # Import here to avoid circular imports
-    from .models import Hotel, Competitor, DailyData, CompetitorData, MarketSummary, PerformanceIndex
+    from .models import DailyData, CompetitorData, MarketSummary, PerformanceIndex
+    from .registry import get_active_competitors, get_hotel
     
     # Convert string date to date object if needed
     if isinstance(date, str):
@@ -23,12 +25,11 @@ def update_market_summary(date, skip_performance_update=False):
             print(f"Error: Invalid date format {date}")
             return
     
-    # Get the hotel and active competitors
-    hotel = Hotel.objects.first()
-    competitors = Competitor.objects.filter(is_active=True)
-    
+    # Get the hotel and its active competitors
+    hotel = get_hotel(hotel_id)
     if not hotel:
         return  # No hotel data, can't calculate
+    competitors = get_active_competitors(hotel.id)
     
     # Get hotel data for the date
     hotel_data = DailyData.objects.filter(hotel=hotel, date=date).first()
@@ -36,7 +37,8 @@ def update_market_summary(date, skip_performance_update=False):
         return  # No hotel data for this date
     
     # Get competitor data for the date
-    competitor_data_list = CompetitorData.objects.filter(competitor__in=competitors, date=date)
+    competitors_by_id = {competitor.id: competitor for competitor in competitors}
+    competitor_data_list = CompetitorData.objects.filter(competitor_id__in=competitors_by_id, date=date)
     
     # Calculate totals for market summary
     total_rooms_available = hotel.total_rooms
@@ -44,7 +46,7 @@ def update_market_summary(date, skip_performance_update=False):
     total_revenue = hotel_data.total_revenue
     
     for comp_data in competitor_data_list:
-        total_rooms_available += comp_data.competitor.total_rooms
+        total_rooms_available += competitors_by_id[comp_data.competitor_id].total_rooms
         total_rooms_sold += comp_data.rooms_sold
         # Calculate competitor revenue
         comp_revenue = Decimal(comp_data.rooms_sold) * Decimal(comp_data.estimated_average_rate)
@@ -52,6 +54,7 @@ def update_market_summary(date, skip_performance_update=False):
     
     # Create or update market summary
     market_summary, created = MarketSummary.objects.update_or_create(
+        hotel=hotel,
         date=date,
         defaults={
             'total_rooms_available': total_rooms_available,
@@ -66,17 +69,16 @@ def update_market_summary(date, skip_performance_update=False):
         
         # Calculate and update competitor performance indices
         for comp_data in competitor_data_list:
-            update_competitor_performance_indices(comp_data.competitor, comp_data, market_summary)
+            update_competitor_performance_indices(competitors_by_id[comp_data.competitor_id], comp_data, market_summary)
         
         # Update performance rankings
-        update_performance_rankings(date)
+        update_performance_rankings(date, hotel.id)
 
-def update_hotel_performance_indices(hotel, hotel_data, market_summary):
+def calculate_performance_indices(total_rooms, rooms_sold, average_rate, revpar, market_summary):
     """
-    Update performance indices for the hotel
+    Fair and actual market share, MPI, ARI and RGI of one property (the
+    hotel or a competitor) against a day's market summary
     """
-    from .models import PerformanceIndex
-    
     # Calculate fair and actual market share
     fair_market_share = Decimal('0.00')
     actual_market_share = Decimal('0.00')
@@ -85,10 +87,10 @@ def update_hotel_performance_indices(hotel, hotel_data, market_summary):
     rgi = Decimal('0.00')
     
     if market_summary.total_rooms_available > 0:
-        fair_market_share = (Decimal(hotel.total_rooms) / Decimal(market_summary.total_rooms_available)) * Decimal('100')
+        fair_market_share = (Decimal(total_rooms) / Decimal(market_summary.total_rooms_available)) * Decimal('100')
     
     if market_summary.total_rooms_sold > 0:
-        actual_market_share = (Decimal(hotel_data.rooms_sold) / Decimal(market_summary.total_rooms_sold)) * Decimal('100')
+        actual_market_share = (Decimal(rooms_sold) / Decimal(market_summary.total_rooms_sold)) * Decimal('100')
     
     # Calculate MPI (Market Penetration Index)
     if fair_market_share > 0:
@@ -96,11 +98,25 @@ def update_hotel_performance_indices(hotel, hotel_data, market_summary):
     
     # Calculate ARI (Average Rate Index)
     if market_summary.market_adr > 0:
-        ari = hotel_data.average_rate / market_summary.market_adr * Decimal('100')
+        ari = average_rate / market_summary.market_adr * Decimal('100')
     
     # Calculate RGI (Revenue Generation Index)
     if market_summary.market_revpar > 0:
-        rgi = hotel_data.revpar / market_summary.market_revpar * Decimal('100')
+        rgi = revpar / market_summary.market_revpar * Decimal('100')
+    
+    return {
+        'fair_market_share': fair_market_share,
+        'actual_market_share': actual_market_share,
+        'mpi': mpi,
+        'ari': ari,
+        'rgi': rgi,
+    }
+
+def update_hotel_performance_indices(hotel, hotel_data, market_summary):
+    """
+    Update performance indices for the hotel
+    """
+    from .models import PerformanceIndex
     
     # Create or update performance index for hotel
     PerformanceIndex.objects.update_or_create(
@@ -108,79 +124,45 @@ def update_hotel_performance_indices(hotel, hotel_data, market_summary):
         hotel=hotel,
         competitor=None,  # No competitor for hotel's own index
         market_summary=market_summary,
-        defaults={
-            'fair_market_share': fair_market_share,
-            'actual_market_share': actual_market_share,
-            'mpi': mpi,
-            'ari': ari,
-            'rgi': rgi,
-        }
+        defaults=calculate_performance_indices(
+            hotel.total_rooms, hotel_data.rooms_sold, hotel_data.average_rate, hotel_data.revpar, market_summary
+        )
     )
 
 def update_competitor_performance_indices(competitor, comp_data, market_summary):
     """
     Update performance indices for a competitor
     """
-    from .models import Hotel, PerformanceIndex
+    from .models import PerformanceIndex
     from django.db import transaction
     
-    hotel = Hotel.objects.first()
-    if not hotel:
-        return
-    
-    # Calculate fair and actual market share
-    fair_market_share = Decimal('0.00')
-    actual_market_share = Decimal('0.00')
-    mpi = Decimal('0.00')
-    ari = Decimal('0.00')
-    rgi = Decimal('0.00')
-    
-    if market_summary.total_rooms_available > 0:
-        fair_market_share = (Decimal(competitor.total_rooms) / Decimal(market_summary.total_rooms_available)) * Decimal('100')
-    
-    if market_summary.total_rooms_sold > 0:
-        actual_market_share = (Decimal(comp_data.rooms_sold) / Decimal(market_summary.total_rooms_sold)) * Decimal('100')
-    
-    # Calculate MPI (Market Penetration Index)
-    if fair_market_share > 0:
-        mpi = actual_market_share / fair_market_share * Decimal('100')
-    
-    # Calculate ARI (Average Rate Index)
-    if market_summary.market_adr > 0:
-        ari = Decimal(comp_data.estimated_average_rate) / market_summary.market_adr * Decimal('100')
-    
-    # Calculate RGI (Revenue Generation Index)
-    if market_summary.market_revpar > 0:
-        rgi = comp_data.revpar / market_summary.market_revpar * Decimal('100')
+    indices = calculate_performance_indices(
+        competitor.total_rooms, comp_data.rooms_sold, Decimal(comp_data.estimated_average_rate), comp_data.revpar, market_summary
+    )
     
     with transaction.atomic():
         # Update competitor data with performance indices
         CompetitorData.objects.filter(id=comp_data.id).update(
-            occupancy_index=mpi,
-            adr_index=ari,
-            revenue_index=rgi
+            occupancy_index=indices['mpi'],
+            adr_index=indices['ari'],
+            revenue_index=indices['rgi']
         )
         
         # Create or update performance index for competitor
         PerformanceIndex.objects.update_or_create(
             date=comp_data.date,
-            hotel=hotel,
+            hotel_id=market_summary.hotel_id,
             competitor=competitor,
             market_summary=market_summary,
-            defaults={
-                'fair_market_share': fair_market_share,
-                'actual_market_share': actual_market_share,
-                'mpi': mpi,
-                'ari': ari,
-                'rgi': rgi,
-            }
+            defaults=indices
         )
 
-def update_performance_rankings(date):
+def update_performance_rankings(date, hotel_id=None):
     """
-    Update performance rankings for all competitors on a specific date
+    Update performance rankings for all competitors of a hotel on a specific date
     """
-    from .models import Hotel, PerformanceIndex
+    from .models import PerformanceIndex
+    from .registry import get_hotel
     
     # Convert string date to date object if needed
     if isinstance(date, str):
@@ -190,74 +172,50 @@ def update_performance_rankings(date):
             print(f"Error: Invalid date format {date}")
             return
     
-    hotel = Hotel.objects.first()
+    hotel = get_hotel(hotel_id)
     if not hotel:
         return
     
     # Get all performance indices for the date
-    indices = PerformanceIndex.objects.filter(date=date).exclude(competitor=None)
+    indices = list(PerformanceIndex.objects.filter(date=date, hotel=hotel).exclude(competitor=None).select_related('competitor'))
+    names = [index.competitor.name if index.competitor else '' for index in indices]
     
-    # Sort by MPI, ARI, RGI, handling null values
-    # First, sort by the metric value, then by competitor name for consistent ordering
-    mpi_sorted = sorted(
-        [i for i in indices if i.mpi is not None],
-        key=lambda x: (x.mpi, x.competitor.name if x.competitor else ''),
-        reverse=True
-    )
-    ari_sorted = sorted(
-        [i for i in indices if i.ari is not None],
-        key=lambda x: (x.ari, x.competitor.name if x.competitor else ''),
-        reverse=True
-    )
-    rgi_sorted = sorted(
-        [i for i in indices if i.rgi is not None],
-        key=lambda x: (x.rgi, x.competitor.name if x.competitor else ''),
-        reverse=True
-    )
-    
-    # Add indices with null values at the end
-    mpi_null = sorted([i for i in indices if i.mpi is None], key=lambda x: x.competitor.name if x.competitor else '')
-    ari_null = sorted([i for i in indices if i.ari is None], key=lambda x: x.competitor.name if x.competitor else '')
-    rgi_null = sorted([i for i in indices if i.rgi is None], key=lambda x: x.competitor.name if x.competitor else '')
-    
-    mpi_sorted.extend(mpi_null)
-    ari_sorted.extend(ari_null)
-    rgi_sorted.extend(rgi_null)
-    
-    # Update rankings
-    rank_updates = {}
+    # One save per index with all three rankings
+    for index, ranks in zip(indices, rank_performance_indices(indices, names)):
+        for field, value in ranks.items():
+            setattr(index, field, value)
+        index.save(update_fields=list(ranks))
+
+def rank_performance_indices(indices, names):
+    """
+    MPI, ARI and RGI rankings for one day's competitor indices
     
-    # Helper function to update ranks
-    def update_rank(sorted_indices, rank_field):
-        current_rank = 1
+    ``names`` are the competitor names, in the same order, used for consistent
+    ordering. Returns one ``{'mpi_rank': n, 'ari_rank': n, 'rgi_rank': n}``
+    dict per index, in input order. The same value gets the same rank and
+    indices with null values rank last.
+    """
+    rankings = [{} for _ in indices]
+    for metric in ('mpi', 'ari', 'rgi'):
+        values = [getattr(index, metric) for index in indices]
+        # Sort by the metric value, then by competitor name, nulls at the end
+        ordered = sorted(
+            (position for position, value in enumerate(values) if value is not None),
+            key=lambda position: (values[position], names[position]),
+            reverse=True
+        )
+        ordered.extend(sorted(
+            (position for position, value in enumerate(values) if value is None),
+            key=lambda position: names[position]
+        ))
+        
         prev_value = None
-        for index in sorted_indices:
-            current_value = getattr(index, rank_field.replace('_rank', ''))
+        prev_rank = None
+        for rank, position in enumerate(ordered, 1):
             # Same value gets same rank
-            if prev_value is not None and current_value == prev_value:
-                rank = rank_updates[sorted_indices[current_rank-2].id]['ranks'][rank_field]
-            else:
-                rank = current_rank
-            
-            if index.id not in rank_updates:
-                rank_updates[index.id] = {'index': index, 'ranks': {}}
-            rank_updates[index.id]['ranks'][rank_field] = rank
-            
-            prev_value = current_value
-            current_rank += 1
-    
-    # Update ranks for each metric
-    update_rank(mpi_sorted, 'mpi_rank')
-    update_rank(ari_sorted, 'ari_rank')
-    update_rank(rgi_sorted, 'rgi_rank')
-    
-    # Bulk update all rankings in a single save per index
-    for update_data in rank_updates.values():
-        index = update_data['index']
-        ranks = update_data['ranks']
-        update_fields = []
-        for field, value in ranks.items():
-            setattr(index, field, value)
-            update_fields.append(field)
-        if update_fields:  # Only save if there are fields to update
-            index.save(update_fields=update_fields)
\ No newline at end of file
+            if prev_value is not None and values[position] == prev_value:
+                rank = prev_rank
+            rankings[position][f'{metric}_rank'] = rank
+            prev_value = values[position]
+            prev_rank = rank
+    return rankings
@@ -3,9 +3,13 @@ from django.contrib.auth.decorators import login_required, permission_required
 from django.core.exceptions import PermissionDenied
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Avg, Sum, Q
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.db.models import Avg
 from django.http import JsonResponse
 from .models import Hotel, Competitor, DailyData, CompetitorData, AuditLog, MarketSummary, PerformanceIndex, BudgetGoal
+from .registry import HOTEL_SESSION_KEY, get_hotel, request_hotel
+from .timeseries import get_series
+from .dashboard import default_dashboard_range, get_dashboard_snapshot
 from datetime import timedelta, datetime, date
 from decimal import Decimal
 from django.contrib.auth.decorators import login_required
@@ -17,7 +21,7 @@ import json
 @permission_required('accounts.view_hotel_management', raise_exception=True)
 def budget_goals(request):
     """Simple view to render Budget & KPI Goals template (placeholder backend)."""
-    hotel = Hotel.objects.first()
+    hotel = request_hotel(request)
     if not hotel:
         messages.info(request, 'Please set up your hotel information first')
         return redirect('hotel_management:hotel_data')
@@ -112,14 +116,14 @@ def budget_goals(request):
         except Exception:
             g.can_unlock_for_user = False
 
-    # Quick metrics for header cards
-    from django.db.models import Avg, Sum, Count
-    aggregates = goals_list.aggregate(
-        total_goals=Count('id'),
-        active_goals=Count('id', filter=Q(lock_targets=False)),
-        avg_occupancy=Avg('occupancy_goal'),
-        total_revenue=Sum('total_revenue_budget'),
-    )
+    # Quick metrics for header cards, from the goals already loaded above
+    occupancy_goals = [g.occupancy_goal for g in goals_list if g.occupancy_goal is not None]
+    aggregates = {
+        'total_goals': len(goals_list),
+        'active_goals': sum(1 for g in goals_list if not g.lock_targets),
+        'avg_occupancy': sum(occupancy_goals) / len(occupancy_goals) if occupancy_goals else None,
+        'total_revenue': sum(g.total_revenue_budget for g in goals_list if g.total_revenue_budget is not None),
+    }
 
     context = {
         'hotel': hotel,
@@ -151,7 +155,7 @@ def budget_goals(request):
 @login_required
 @permission_required('accounts.view_hotel_management', raise_exception=True)
 def budget_goals_tracker(request):
-    hotel = Hotel.objects.first()
+    hotel = request_hotel(request)
     if not hotel:
         messages.info(request, 'Please set up your hotel information first')
         return redirect('hotel_management:hotel_data')
@@ -169,24 +173,22 @@ def budget_goals_tracker(request):
 @permission_required('accounts.view_hotel_management', raise_exception=True)
 def ajax_metrics(request):
     """AJAX endpoint for fetching updated dashboard metrics"""
-    hotel = Hotel.objects.first()
+    hotel = request_hotel(request)
     if not hotel:
         return JsonResponse({'error': 'Hotel not found'}, status=404)
     
     # Get recent daily data (last 30 days)
     today = timezone.now().date()
     thirty_days_ago = today - timedelta(days=30)
-    recent_data = DailyData.objects.filter(
-        hotel=hotel,
-        date__gte=thirty_days_ago
-    ).order_by('-date')
+    series = get_series('hotel', hotel.id)
+    last_date = series.last_date or today
     
-    # Calculate summary statistics
+    # Calculate summary statistics from the cached KPI series
     summary = {
-        'total_revenue': recent_data.aggregate(Sum('total_revenue'))['total_revenue__sum'] or 0,
-        'avg_occupancy': recent_data.aggregate(Avg('occupancy_percentage'))['occupancy_percentage__avg'] or 0,
-        'avg_rate': recent_data.aggregate(Avg('average_rate'))['average_rate__avg'] or 0,
-        'avg_revpar': recent_data.aggregate(Avg('revpar'))['revpar__avg'] or 0,
+        'total_revenue': series.sum('total_revenue', thirty_days_ago, last_date),
+        'avg_occupancy': series.avg('occupancy_percentage', thirty_days_ago, last_date),
+        'avg_rate': series.avg('average_rate', thirty_days_ago, last_date),
+        'avg_revpar': series.avg('revpar', thirty_days_ago, last_date),
     }
     
     return JsonResponse(summary)
@@ -195,21 +197,13 @@ def ajax_metrics(request):
 @permission_required('accounts.view_hotel_management', raise_exception=True)
 def performance_indicators_api(request):
     """API endpoint for performance indicators"""
-    hotel = Hotel.objects.first()
+    hotel = request_hotel(request)
     
     if not hotel:
         return JsonResponse({'error': 'Hotel not found'}, status=404)
     
-    # Get date range from request or use current month
-    today = timezone.now().date()
-    
     # Default: first day to last day of current month
-    current_month = today.month
-    current_year = today.year
-    from calendar import monthrange
-    _, last_day = monthrange(current_year, current_month)
-    start_date = date(current_year, current_month, 1)
-    end_date = date(current_year, current_month, last_day)
+    start_date, end_date = default_dashboard_range()
     
     # Get date parameters from request if provided
     if request.GET.get('start_date') and request.GET.get('end_date'):
@@ -252,22 +246,14 @@ def performance_indicators_api(request):
 def home(request):
     """Home page view"""
     # Get the user's hotel
-    hotel = Hotel.objects.first()
+    hotel = request_hotel(request)
     
     if not hotel:
         messages.info(request, 'Please set up your hotel information first')
         return redirect('hotel_management:hotel_data')
     
-    # Get date range from request or use current month
-    today = timezone.now().date()
-    
     # Default: first day to last day of current month
-    current_month = today.month
-    current_year = today.year
-    from calendar import monthrange
-    _, last_day = monthrange(current_year, current_month)
-    start_date = date(current_year, current_month, 1)
-    end_date = date(current_year, current_month, last_day)
+    start_date, end_date = default_dashboard_range()
     
     # Handle date filter form submission
     if request.method == 'POST':
@@ -278,357 +264,41 @@ def home(request):
             # Validate date range
             if start_date > end_date:
                 messages.error(request, 'Start date cannot be after end date')
-                start_date = date(current_year, current_month, 1)
-                end_date = date(current_year, current_month, last_day)
+                start_date, end_date = default_dashboard_range()
         except (ValueError, TypeError):
             messages.error(request, 'Invalid date format')
     
-    # Calculate prior year date range (same period last year)
-    days_diff = (end_date - start_date).days
-    prior_year_start_date = date(start_date.year - 1, start_date.month, start_date.day)
-    prior_year_end_date = prior_year_start_date + timedelta(days=days_diff)
-    
-    # Get aggregated data for current period
-    current_period_data = DailyData.objects.filter(
-        hotel=hotel,
-        date__gte=start_date,
-        date__lte=end_date
-    ).aggregate(
-        avg_occupancy=Avg('occupancy_percentage'),
-        avg_adr=Avg('average_rate'),
-        avg_revpar=Avg('revpar'),
-        total_revenue=Sum('total_revenue'),
-        total_rooms_sold=Sum('rooms_sold')
-    )
-    
-    # Get aggregated data for prior year (same period last year)
-    prior_year_data = DailyData.objects.filter(
-        hotel=hotel,
-        date__gte=prior_year_start_date,
-        date__lte=prior_year_end_date
-    ).aggregate(
-        avg_occupancy=Avg('occupancy_percentage'),
-        avg_adr=Avg('average_rate'),
-        avg_revpar=Avg('revpar'),
-        total_revenue=Sum('total_revenue'),
-        total_rooms_sold=Sum('rooms_sold')
-    )
-    
-    # Safely calculate summary with fallbacks
-    current_occ = current_period_data['avg_occupancy'] or 0
-    prior_year_occ = prior_year_data['avg_occupancy'] or 0
-    current_adr = current_period_data['avg_adr'] or 0
-    prior_year_adr = prior_year_data['avg_adr'] or 0
-    current_revpar = current_period_data['avg_revpar'] or 0
-    prior_year_revpar = prior_year_data['avg_revpar'] or 0
-    
-    # Calculate changes safely
-    occ_change = ((current_occ - prior_year_occ) / prior_year_occ * 100) if prior_year_occ != 0 else 0
-    adr_change = ((current_adr - prior_year_adr) / prior_year_adr * 100) if prior_year_adr != 0 else 0
-    revpar_change = ((current_revpar - prior_year_revpar) / prior_year_revpar * 100) if prior_year_revpar != 0 else 0
-    
-    summary = {
-        'current_occ': current_occ,
-        'prior_year_occ': prior_year_occ,
-        'occ_change': occ_change,
-        'current_adr': current_adr,
-        'prior_year_adr': prior_year_adr,
-        'adr_change': adr_change,
-        'current_revpar': current_revpar,
-        'prior_year_revpar': prior_year_revpar,
-        'revpar_change': revpar_change,
-    }
-    
-    # Get aggregated performance indices for current period
-    current_period_indices = PerformanceIndex.objects.filter(
-        hotel=hotel,
-        date__gte=start_date,
-        date__lte=end_date
-    ).aggregate(
-        avg_mpi=Avg('mpi'),
-        avg_ari=Avg('ari'),
-        avg_rgi=Avg('rgi'),
-        avg_mpi_rank=Avg('mpi_rank'),
-        avg_ari_rank=Avg('ari_rank'),
-        avg_rgi_rank=Avg('rgi_rank')
-    )
-    
-    # Get aggregated performance indices for prior year (same period last year)
-    prior_year_indices = PerformanceIndex.objects.filter(
-        hotel=hotel,
-        date__gte=prior_year_start_date,
-        date__lte=prior_year_end_date
-    ).aggregate(
-        avg_mpi=Avg('mpi'),
-        avg_ari=Avg('ari'),
-        avg_rgi=Avg('rgi'),
-        avg_mpi_rank=Avg('mpi_rank'),
-        avg_ari_rank=Avg('ari_rank'),
-        avg_rgi_rank=Avg('rgi_rank')
-    )
-    
-    # Safely get performance indices with fallbacks
-    current_mpi = current_period_indices['avg_mpi'] or 0
-    prior_year_mpi = prior_year_indices['avg_mpi'] or 0
-    current_ari = current_period_indices['avg_ari'] or 0
-    prior_year_ari = prior_year_indices['avg_ari'] or 0
-    current_rgi = current_period_indices['avg_rgi'] or 0
-    prior_year_rgi = prior_year_indices['avg_rgi'] or 0
-    
-    # Calculate changes safely
-    mpi_change = ((current_mpi - prior_year_mpi) / prior_year_mpi * 100) if prior_year_mpi != 0 else 0
-    ari_change = ((current_ari - prior_year_ari) / prior_year_ari * 100) if prior_year_ari != 0 else 0
-    rgi_change = ((current_rgi - prior_year_rgi) / prior_year_rgi * 100) if prior_year_rgi != 0 else 0
-    
-    # Compute hotel's market rank vs competitors for the selected period
-    competitor_avgs = PerformanceIndex.objects.filter(
-        hotel=hotel,
-        competitor__isnull=False,
-        date__gte=start_date,
-        date__lte=end_date
-    ).values('competitor_id').annotate(
-        c_mpi=Avg('mpi'),
-        c_ari=Avg('ari'),
-        c_rgi=Avg('rgi')
-    )
-
-    competitor_mpi_values = [row['c_mpi'] for row in competitor_avgs if row['c_mpi'] is not None]
-    competitor_ari_values = [row['c_ari'] for row in competitor_avgs if row['c_ari'] is not None]
-    competitor_rgi_values = [row['c_rgi'] for row in competitor_avgs if row['c_rgi'] is not None]
-
-    def compute_rank(value, competitor_values):
-        if value is None:
-            return 0
-        try:
-            v = float(value)
-        except (TypeError, ValueError):
-            return 0
-        higher = sum(1 for c in competitor_values if c is not None and float(c) > v)
-        return higher + 1
-
-    hotel_mpi_rank = compute_rank(current_mpi, competitor_mpi_values)
-    hotel_ari_rank = compute_rank(current_ari, competitor_ari_values)
-    hotel_rgi_rank = compute_rank(current_rgi, competitor_rgi_values)
-
-    indices = {
-        'current_mpi': current_mpi,
-        'prior_year_mpi': prior_year_mpi,
-        'mpi_change': mpi_change,
-        'mpi_rank': hotel_mpi_rank,
-        'current_ari': current_ari,
-        'prior_year_ari': prior_year_ari,
-        'ari_change': ari_change,
-        'ari_rank': hotel_ari_rank,
-        'current_rgi': current_rgi,
-        'prior_year_rgi': prior_year_rgi,
-        'rgi_change': rgi_change,
-        'rgi_rank': hotel_rgi_rank,
-        'total_competitors': Competitor.objects.filter(is_active=True).count()
-    }
-    
-    # Get data for RevPAR positioning matrix - Current Period
-    hotel_data = {
-        'occupancy_index': current_mpi,
-        'adr_index': current_ari
-    }
-    
-    # Get aggregated competitor data for the matrix - Current Period
-    competitor_data = []
-    for comp in Competitor.objects.filter(is_active=True):
-        comp_aggregated = CompetitorData.objects.filter(
-            competitor=comp,
-            date__gte=start_date,
-            date__lte=end_date
-        ).aggregate(
-            avg_occupancy_index=Avg('occupancy_index'),
-            avg_adr_index=Avg('adr_index')
-        )
-        
-        if comp_aggregated['avg_occupancy_index'] and comp_aggregated['avg_adr_index']:
-            competitor_data.append({
-                'x': comp_aggregated['avg_occupancy_index'],
-                'y': comp_aggregated['avg_adr_index'],
-                'name': comp.name
-            })
-    
-    # Get data for RevPAR positioning matrix - Previous Year
-    prev_year_hotel_data = {
-        'occupancy_index': prior_year_mpi,
-        'adr_index': prior_year_ari
-    }
-    
-    # Get aggregated competitor data for the matrix - Previous Year
-    prev_year_competitor_data = []
-    for comp in Competitor.objects.filter(is_active=True):
-        prev_year_comp_aggregated = CompetitorData.objects.filter(
-            competitor=comp,
-            date__gte=prior_year_start_date,
-            date__lte=prior_year_end_date
-        ).aggregate(
-            avg_occupancy_index=Avg('occupancy_index'),
-            avg_adr_index=Avg('adr_index')
-        )
-        
-        if prev_year_comp_aggregated['avg_occupancy_index'] and prev_year_comp_aggregated['avg_adr_index']:
-            prev_year_competitor_data.append({
-                'x': prev_year_comp_aggregated['avg_occupancy_index'],
-                'y': prev_year_comp_aggregated['avg_adr_index'],
-                'name': comp.name
-            })
+    # Every figure on the page comes from one cached snapshot
+    snapshot = get_dashboard_snapshot(hotel, start_date, end_date)
     
     from .json_utils import decimal_safe_dumps
     
-    # Find the appropriate budget goal based on the date range
-    def get_budget_goal_for_date_range(start_date, end_date):
-        """Determine the appropriate budget goal based on date range"""
-        # Calculate the duration of the date range
-        days_diff = (end_date - start_date).days
-        
-        # Get the fiscal year (use the year of the start date)
-        fiscal_year = start_date.year
-        
-        # Try to find the most appropriate budget goal based on date range
-        try:
-            # Get all goals for this hotel and fiscal year
-            existing_goals = BudgetGoal.objects.filter(hotel=hotel, fiscal_year=fiscal_year)
-            
-            # Priority 1: Look for monthly goals that match the month
-            if days_diff <= 31:  # Less than or equal to a month
-                month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                              'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-                # Check if start_date and end_date are in the same month
-                if start_date.month == end_date.month and start_date.year == end_date.year:
-                    period_detail = month_names[start_date.month - 1]
-                    budget_goal = existing_goals.filter(
-                        period_type='monthly',
-                        period_detail=period_detail
-                    ).first()
-                    
-                    if budget_goal:
-                        return budget_goal
-
-            # New: If the range spans multiple months within the same fiscal year, and no quarterly goal exists,
-            # aggregate monthly goals weighted by days in range to form a synthetic goal
-            if start_date.year == end_date.year and start_date.month != end_date.month:
-                # Build list of months covered and the overlapping day counts
-                from calendar import monthrange
-                def month_iter(y, m_start, m_end):
-                    for m in range(m_start, m_end + 1):
-                        yield y, m
-                total_days = (end_date - start_date).days + 1
-                if total_days > 0:
-                    month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                                   'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-                    weighted_occ_sum = 0.0
-                    weighted_adr_sum = 0.0
-                    covered_days = 0
-                    months_covered_labels = []
-                    for y, m in month_iter(start_date.year, start_date.month, end_date.month):
-                        first_day = date(y, m, 1)
-                        last_day = date(y, m, monthrange(y, m)[1])
-                        overlap_start = max(start_date, first_day)
-                        overlap_end = min(end_date, last_day)
-                        if overlap_start <= overlap_end:
-                            overlap_days = (overlap_end - overlap_start).days + 1
-                            period_detail = month_names[m - 1]
-                            goal = existing_goals.filter(period_type='monthly', period_detail=period_detail).first()
-                            months_covered_labels.append(period_detail)
-                            if goal and goal.occupancy_goal and goal.adr_goal:
-                                try:
-                                    weighted_occ_sum += float(goal.occupancy_goal) * overlap_days
-                                    weighted_adr_sum += float(goal.adr_goal) * overlap_days
-                                    covered_days += overlap_days
-                                except (TypeError, ValueError):
-                                    pass
-                    if covered_days > 0:
-                        agg_occ = weighted_occ_sum / covered_days
-                        agg_adr = weighted_adr_sum / covered_days
-                        agg_revpar = (agg_occ / 100.0) * agg_adr
-
-                        class AggregateGoal:
-                            def __init__(self, fiscal_year, period_detail, occ, adr, revpar):
-                                self.fiscal_year = fiscal_year
-                                self.period_type = 'monthly_aggregate'
-                                self.period_detail = period_detail
-                                self.occupancy_goal = occ
-                                self.adr_goal = adr
-                                self.revpar_goal = revpar
-                                self.is_aggregate = True
-                            def get_period_type_display(self):
-                                return 'Monthly Aggregate'
-
-                        label = f"{months_covered_labels[0]}–{months_covered_labels[-1]}"
-                        return AggregateGoal(fiscal_year, label, agg_occ, agg_adr, agg_revpar)
-            
-            # Priority 2: Look for quarterly goals
-            if days_diff <= 93:  # Less than or equal to a quarter
-                quarter_num = (start_date.month - 1) // 3 + 1
-                period_detail = f'Q{quarter_num}'
-                budget_goal = existing_goals.filter(
-                    period_type='quarter',
-                    period_detail=period_detail
-                ).first()
-                
-                if budget_goal:
-                    return budget_goal
-            
-            # Priority 3: Look for annual goals
-            budget_goal = existing_goals.filter(
-                period_type='annual',
-                period_detail=''
-            ).first()
-            
-            if budget_goal:
-                return budget_goal
-            
-            # Priority 4: If no exact match, try to find any goal that could be relevant
-            # For monthly ranges, also check if there's a quarterly goal for that quarter
-            if days_diff <= 31:
-                quarter_num = (start_date.month - 1) // 3 + 1
-                period_detail = f'Q{quarter_num}'
-                budget_goal = existing_goals.filter(
-                    period_type='quarter',
-                    period_detail=period_detail
-                ).first()
-                
-                if budget_goal:
-                    return budget_goal
-            
-            return None
-            
-        except Exception as e:
-            return None
-    
-    # Get the budget goal for the current date range
-    budget_goal = get_budget_goal_for_date_range(start_date, end_date)
-    
-    # Calculate goal comparison metrics
-    goal_comparison = {}
-    if budget_goal and budget_goal.occupancy_goal and current_occ:
-        goal_comparison['occupancy_diff'] = float(budget_goal.occupancy_goal) - float(current_occ)
-        goal_comparison['occupancy_met'] = float(current_occ) >= float(budget_goal.occupancy_goal)
-    
-    context = {
-        'hotel': hotel,
-        'summary': summary,
-        'indices': indices,
-        'hotel_data': hotel_data,
-        'competitor_data': decimal_safe_dumps(competitor_data),
-        'start_date': start_date,
-        'end_date': end_date,
-        'prev_year_start_date': prior_year_start_date,
-        'prev_year_end_date': prior_year_end_date,
-        'prev_year_hotel_data': prev_year_hotel_data,
-        'prev_year_competitor_data': decimal_safe_dumps(prev_year_competitor_data),
-        'budget_goal': budget_goal,
-        'goal_comparison': goal_comparison
-    }
+    context = snapshot.context()
+    context['hotel'] = hotel
+    context['competitor_data'] = decimal_safe_dumps(snapshot.competitor_data)
+    context['prev_year_competitor_data'] = decimal_safe_dumps(snapshot.prev_year_competitor_data)
     
     return render(request, 'hotel_management/home.html', context)
 
 
-def calculate_market_indices(date_str):
-    """Calculate and store market performance indices for a specific date"""
+@login_required
+@require_http_methods(['POST'])
+def select_hotel(request):
+    """Switch the property the user is working on for the rest of the session"""
+    hotel = get_hotel(request.POST.get('hotel_id'))
+    if hotel:
+        request.session[HOTEL_SESSION_KEY] = hotel.id
+    else:
+        messages.error(request, 'Hotel not found')
+    
+    next_url = request.POST.get('next')
+    if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}, require_https=request.is_secure()):
+        return redirect(next_url)
+    return redirect('hotel_management:home')
+
+
+def calculate_market_indices(date_str, hotel_id=None):
+    """Calculate and store market performance indices for a hotel on a specific date"""
     try:
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
         
@@ -636,10 +306,10 @@ def calculate_market_indices(date_str):
         from .utils import update_market_summary, update_performance_rankings
         
         # Update market summary and performance indices
-        update_market_summary(date_obj)
+        update_market_summary(date_obj, hotel_id=hotel_id)
         
         # Update performance rankings
-        update_performance_rankings(date_obj)
+        update_performance_rankings(date_obj, hotel_id)
             
     except Exception as e:
         print(f"Error calculating market indices: {e}")
@@ -654,8 +324,8 @@ def data_entry(request):
         request.user.has_perm('accounts.view_data_entry')
     ):
         raise PermissionDenied
-    hotel = Hotel.objects.first()
-    competitors = Competitor.objects.all().order_by('name')
+    hotel = request_hotel(request)
+    competitors = Competitor.objects.filter(hotel=hotel).order_by('name')
     
     # If no hotel exists yet, redirect to hotel data page
     if not hotel:
@@ -694,7 +364,7 @@ def data_entry(request):
             notes = request.POST.get('notes', '')
             
             try:
-                competitor = Competitor.objects.get(id=competitor_id)
+                competitor = Competitor.objects.get(id=competitor_id, hotel=hotel)
                 # Create the competitor data entry with basic fields
                 comp_data = CompetitorData.objects.create(
                     date=date_str,
@@ -707,7 +377,7 @@ def data_entry(request):
                 )
                 
                 # Calculate and update market performance indices
-                calculate_market_indices(date_str)
+                calculate_market_indices(date_str, hotel.id)
                 
                 messages.success(request, f'Competitor data for {date_str} added successfully')
             except Exception as e:
@@ -721,7 +391,7 @@ def data_entry(request):
             notes = request.POST.get('notes', '')
             
             try:
-                daily_data = DailyData.objects.get(id=data_id)
+                daily_data = DailyData.objects.get(id=data_id, hotel=hotel)
                 changes = {}
                 
                 if str(daily_data.date) != date_str:
@@ -759,7 +429,7 @@ def data_entry(request):
             notes = request.POST.get('notes', '')
             
             try:
-                comp_data = CompetitorData.objects.get(id=data_id)
+                comp_data = CompetitorData.objects.get(id=data_id, competitor__hotel=hotel)
                 changes = {}
                 
                 if str(comp_data.date) != date_str:
@@ -779,7 +449,7 @@ def data_entry(request):
                     comp_data.save()
                     
                     # Calculate and update market performance indices
-                    calculate_market_indices(date_str)
+                    calculate_market_indices(date_str, hotel.id)
                     
                     AuditLog.objects.create(
                         entity_type='competitor_data',
@@ -796,10 +466,10 @@ def data_entry(request):
             data_id = request.POST.get('data_id')
             try:
                 if action == 'delete_hotel_data':
-                    data = DailyData.objects.get(id=data_id)
+                    data = DailyData.objects.get(id=data_id, hotel=hotel)
                     entity_type = 'hotel_data'
                 else:
-                    data = CompetitorData.objects.get(id=data_id)
+                    data = CompetitorData.objects.get(id=data_id, competitor__hotel=hotel)
                     entity_type = 'competitor_data'
                 
                 date_str = str(data.date)
@@ -843,7 +513,7 @@ def data_entry(request):
     
     # Base querysets
     hotel_data = DailyData.objects.filter(hotel=hotel)
-    competitor_data = CompetitorData.objects.all()
+    competitor_data = CompetitorData.objects.filter(competitor__hotel=hotel)
     
     # Apply date filters if provided
     if start_date:
@@ -891,7 +561,7 @@ def hotel_data_api(request, pk):
     ):
         raise PermissionDenied
     try:
-        data = get_object_or_404(DailyData, id=pk)
+        data = get_object_or_404(DailyData, id=pk, hotel=request_hotel(request))
         return JsonResponse({
             'date': data.date.isoformat(),
             'rooms_sold': data.rooms_sold,
@@ -910,7 +580,7 @@ def competitor_data_api(request, pk):
     ):
         raise PermissionDenied
     try:
-        data = get_object_or_404(CompetitorData, id=pk)
+        data = get_object_or_404(CompetitorData, id=pk, competitor__hotel=request_hotel(request))
         return JsonResponse({
             'date': data.date.isoformat(),
             'estimated_occupancy': str(data.estimated_occupancy),
@@ -924,7 +594,7 @@ def competitor_data_api(request, pk):
 @permission_required('accounts.view_hotel_management', raise_exception=True)
 def daily_data(request):
     """View for managing daily hotel data"""
-    hotel = Hotel.objects.first()
+    hotel = request_hotel(request)
     
     # If no hotel exists yet, redirect to hotel data page
     if not hotel:
@@ -984,9 +654,10 @@ def daily_data(request):
 @permission_required('accounts.view_hotel_management', raise_exception=True)
 def hotel_competitor_management(request):
     """View for managing hotel and competitor information with audit logging"""
-    hotel = Hotel.objects.first()
-    competitors = Competitor.objects.all().order_by('name')
-    audit_logs = AuditLog.objects.all().order_by('-performed_at')[:50]  # Get last 50 audit logs
+    hotel = request_hotel(request)
+    competitors = Competitor.objects.filter(hotel=hotel).order_by('name')
+    # Front-desk arrival transitions have their own trail and would bury these
+    audit_logs = AuditLog.objects.exclude(entity_type='arrival').order_by('-performed_at')[:50]  # Get last 50 audit logs
     
     if request.method == 'POST':
         action = request.POST.get('action')
@@ -996,7 +667,7 @@ def hotel_competitor_management(request):
             delete_type = request.POST.get('delete_type', 'soft')
             
             try:
-                competitor = Competitor.objects.get(id=competitor_id)
+                competitor = Competitor.objects.get(id=competitor_id, hotel=hotel)
                 if delete_type == 'soft':
                     competitor.is_active = False
                     competitor.status = 'inactive'
@@ -1029,7 +700,7 @@ def hotel_competitor_management(request):
             except Exception as e:
                 messages.error(request, f'Error deleting competitor: {str(e)}')
         
-        elif action == 'update_hotel':
+        elif action in ('update_hotel', 'add_hotel'):
             name = request.POST.get('name')
             address = request.POST.get('address')
             phone = request.POST.get('phone')
@@ -1042,7 +713,8 @@ def hotel_competitor_management(request):
             else:
                 try:
                     changes = {}
-                    if not hotel:
+                    # add_hotel registers another property in the group
+                    if not hotel or action == 'add_hotel':
                         hotel = Hotel.objects.create(
                             name=name,
                             address=address,
@@ -1053,6 +725,8 @@ def hotel_competitor_management(request):
                         if logo:
                             hotel.logo = logo
                             hotel.save()
+                        request.session[HOTEL_SESSION_KEY] = hotel.id
+                        competitors = Competitor.objects.none()
                         
                         changes = {
                             'name': name,
@@ -1119,6 +793,7 @@ def hotel_competitor_management(request):
             else:
                 try:
                     competitor = Competitor.objects.create(
+                        hotel=hotel,
                         name=name,
                         address=address,
                         total_rooms=total_rooms,
@@ -1157,7 +832,7 @@ def hotel_competitor_management(request):
                 messages.error(request, 'Please fill in all required fields')
             else:
                 try:
-                    competitor = Competitor.objects.get(id=competitor_id)
+                    competitor = Competitor.objects.get(id=competitor_id, hotel=hotel)
                     changes = {}
                     
                     if competitor.name != name:
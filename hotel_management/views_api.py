@@ -1,19 +1,22 @@
 from django.http import JsonResponse
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, permission_required
 from django.utils import timezone
 from datetime import datetime, timedelta, date
 from calendar import monthrange
-from django.db.models import Avg, Sum
-from .models import Hotel, Competitor, DailyData, CompetitorData, PerformanceIndex
+from .forecast import budget_forecast
+from .goals import GOAL_PACING_MAX_DAYS, goal_pacing, goal_vs_actual
+from .matrix import average_positions, latest_positions, weekly_positions
+from .registry import get_active_competitors, request_hotel
+from .timeseries import get_series, month_windows
 
 @login_required
 def revpar_matrix_api(request):
     """
     API endpoint for RevPAR Positioning Matrix data
-    Accepts start_date and end_date parameters to filter data
+    Accepts start_date, end_date and mode (latest, average or animate) parameters
     """
     # Get the user's hotel
-    hotel = Hotel.objects.first()
+    hotel = request_hotel(request)
     
     if not hotel:
         return JsonResponse({'error': 'Hotel not found'}, status=404)
@@ -40,44 +43,72 @@ def revpar_matrix_api(request):
         except ValueError:
             return JsonResponse({'error': 'Invalid date format. Please use YYYY-MM-DD format.'}, status=400)
     
-    # Get performance indices for the hotel in the date range
-    latest_indices = PerformanceIndex.objects.filter(
-        hotel=hotel,
-        date__gte=start_date,
-        date__lte=end_date,
-        competitor__isnull=True  # Only get hotel's own indices
-    ).order_by('-date').first()
-    
-    # Get data for RevPAR positioning matrix
-    hotel_data = {
-        'x': float(latest_indices.mpi) if latest_indices and latest_indices.mpi else 100,
-        'y': float(latest_indices.ari) if latest_indices and latest_indices.ari else 100
+    # latest: most recent position in the range (default)
+    # average: mean position over the range
+    # animate: weekly positions for every week in the range, for playback
+    mode = request.GET.get('mode', 'latest')
+    date_range = {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat()
     }
     
-    # Get competitor data for the matrix
-    competitor_data = []
-    for comp in Competitor.objects.filter(is_active=True):
-        latest_comp_data = CompetitorData.objects.filter(
-            competitor=comp,
-            date__gte=start_date,
-            date__lte=end_date
-        ).order_by('-date').first()
-        
-        if latest_comp_data:
-            competitor_data.append({
-                'x': float(latest_comp_data.occupancy_index) if latest_comp_data.occupancy_index else 100,
-                'y': float(latest_comp_data.adr_index) if latest_comp_data.adr_index else 100,
-                'name': comp.name
-            })
-    
-    return JsonResponse({
-        'hotel_data': hotel_data,
-        'competitor_data': competitor_data,
-        'date_range': {
-            'start_date': start_date.isoformat(),
-            'end_date': end_date.isoformat()
+    if mode == 'animate':
+        return JsonResponse({
+            'frames': weekly_positions(hotel, start_date, end_date),
+            'date_range': date_range
+        })
+    
+    if mode == 'average':
+        indices = get_series('index', hotel.id)
+        data = {
+            'hotel_data': {
+                'x': float(indices.avg('mpi', start_date, end_date) or 100),
+                'y': float(indices.avg('ari', start_date, end_date) or 100)
+            },
+            'competitor_data': [
+                {'x': float(point['x']), 'y': float(point['y']), 'name': point['name']}
+                for point in average_positions(hotel, {'range': (start_date, end_date)})['range']
+            ]
         }
-    })
+    elif mode == 'latest':
+        data = latest_positions(hotel, start_date, end_date)
+    else:
+        return JsonResponse({'error': 'mode must be latest, average or animate.'}, status=400)
+    
+    data['date_range'] = date_range
+    return JsonResponse(data)
+
+def _same_day_prior_year(day):
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:
+        # 29 February maps to the 28th
+        return day.replace(year=day.year - 1, day=28)
+
+def _chart_date_range(request):
+    """start_date/end_date from the query string, defaulting to the current month. Raises ValueError."""
+    today = timezone.now().date()
+    _, last_day = monthrange(today.year, today.month)
+    start_date = date(today.year, today.month, 1)
+    end_date = date(today.year, today.month, last_day)
+
+    start_date_str = request.GET.get('start_date')
+    end_date_str = request.GET.get('end_date')
+    if start_date_str and end_date_str:
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+    return start_date, end_date
+
+def _chart_buckets(start_date, end_date):
+    """(label, first day, last day) per chart point: months for ranges over 90 days, otherwise days."""
+    if (end_date - start_date).days > 90:
+        return [(month.strftime('%b %Y'), first, last) for month, first, last in month_windows(start_date, end_date)]
+    buckets = []
+    current_date = start_date
+    while current_date <= end_date:
+        buckets.append((current_date.strftime('%b %d'), current_date, current_date))
+        current_date += timedelta(days=1)
+    return buckets
 
 @login_required
 def chart_data_api(request):
@@ -85,54 +116,33 @@ def chart_data_api(request):
     API endpoint for chart data (occupancy, ADR, RevPAR)
     Accepts start_date, end_date, and metric_type parameters
     """
-    hotel = Hotel.objects.first()
-    
+    hotel = request_hotel(request)
+
     if not hotel:
         return JsonResponse({'error': 'Hotel not found'}, status=404)
-    
-    # Get parameters from request
-    start_date_str = request.GET.get('start_date')
-    end_date_str = request.GET.get('end_date')
+
     metric_type = request.GET.get('metric_type', 'all')  # occupancy, adr, revpar, or all
-    
+
     # Default to current month if no dates provided
-    today = timezone.now().date()
-    current_month = today.month
-    current_year = today.year
-    _, last_day = monthrange(current_year, current_month)
-    start_date = date(current_year, current_month, 1)
-    end_date = date(current_year, current_month, last_day)
-    
-    # Process custom date range if provided
-    if start_date_str and end_date_str:
-        try:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-        except ValueError:
-            return JsonResponse({'error': 'Invalid date format. Please use YYYY-MM-DD format.'}, status=400)
-    
-    # Get hotel data for the selected period
-    hotel_data = DailyData.objects.filter(
-        hotel=hotel,
-        date__gte=start_date,
-        date__lte=end_date
-    ).order_by('date')
-    
+    try:
+        start_date, end_date = _chart_date_range(request)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date format. Please use YYYY-MM-DD format.'}, status=400)
+
     # Calculate prior year date range (same period last year)
     days_diff = (end_date - start_date).days
-    prior_year_start_date = date(start_date.year - 1, start_date.month, start_date.day)
+    prior_year_start_date = _same_day_prior_year(start_date)
     prior_year_end_date = prior_year_start_date + timedelta(days=days_diff)
-    
-    # Get prior year data
-    prior_year_data = DailyData.objects.filter(
-        hotel=hotel,
-        date__gte=prior_year_start_date,
-        date__lte=prior_year_end_date
-    ).order_by('date')
-    
+    prior_year_offset = start_date - prior_year_start_date
+
+    # Every point is a range average over the cached KPI series, so the
+    # chart costs no queries once the series is warm.
+    series = get_series('hotel', hotel.id)
+    buckets = _chart_buckets(start_date, end_date)
+
     # Prepare response data
     response_data = {
-        'labels': [],
+        'labels': [label for label, _, _ in buckets],
         'current': {},
         'previous': {},
         'date_range': {
@@ -142,123 +152,17 @@ def chart_data_api(request):
             'prior_end_date': prior_year_end_date.isoformat()
         }
     }
-    
-    # Generate date labels (monthly or daily based on date range)
-    if days_diff > 90:  # More than 3 months, use monthly labels
-        current_date = start_date.replace(day=1)
-        while current_date <= end_date:
-            response_data['labels'].append(current_date.strftime('%b %Y'))
-            current_date = (current_date.replace(day=1) + timedelta(days=32)).replace(day=1)
-    else:  # Use daily labels
-        current_date = start_date
-        while current_date <= end_date:
-            response_data['labels'].append(current_date.strftime('%b %d'))
-            current_date += timedelta(days=1)
-    
-    # Get data for each metric type
-    if metric_type in ['occupancy', 'all']:
-        response_data['current']['occupancy'] = []
-        response_data['previous']['occupancy'] = []
-        
-        # Current year data
-        for label in response_data['labels']:
-            if days_diff > 90:  # Monthly data
-                month_year = datetime.strptime(label, '%b %Y')
-                month_data = hotel_data.filter(date__year=month_year.year, date__month=month_year.month)
-                avg_occ = month_data.aggregate(Avg('occupancy_percentage'))['occupancy_percentage__avg'] or 0
-                response_data['current']['occupancy'].append(float(avg_occ))
-            else:  # Daily data
-                # For daily data, we'll use the first available data point for each day
-                # This is a simplified approach - in production you might want more sophisticated date matching
-                if hotel_data.exists():
-                    first_data = hotel_data.first()
-                    response_data['current']['occupancy'].append(float(first_data.occupancy_percentage))
-                else:
-                    response_data['current']['occupancy'].append(0)
-        
-        # Prior year data
-        for label in response_data['labels']:
-            if days_diff > 90:  # Monthly data
-                month_year = datetime.strptime(label, '%b %Y')
-                month_data = prior_year_data.filter(date__year=month_year.year, date__month=month_year.month)
-                avg_occ = month_data.aggregate(Avg('occupancy_percentage'))['occupancy_percentage__avg'] or 0
-                response_data['previous']['occupancy'].append(float(avg_occ))
-            else:  # Daily data
-                # For daily data, we'll use the first available data point for each day
-                if prior_year_data.exists():
-                    first_data = prior_year_data.first()
-                    response_data['previous']['occupancy'].append(float(first_data.occupancy_percentage))
-                else:
-                    response_data['previous']['occupancy'].append(0)
-    
-    if metric_type in ['adr', 'all']:
-        response_data['current']['adr'] = []
-        response_data['previous']['adr'] = []
-        
-        # Current year data
-        for label in response_data['labels']:
-            if days_diff > 90:  # Monthly data
-                month_year = datetime.strptime(label, '%b %Y')
-                month_data = hotel_data.filter(date__year=month_year.year, date__month=month_year.month)
-                avg_adr = month_data.aggregate(Avg('average_rate'))['average_rate__avg'] or 0
-                response_data['current']['adr'].append(float(avg_adr))
-            else:  # Daily data
-                # For daily data, we'll use the first available data point for each day
-                if hotel_data.exists():
-                    first_data = hotel_data.first()
-                    response_data['current']['adr'].append(float(first_data.average_rate))
-                else:
-                    response_data['current']['adr'].append(0)
-        
-        # Prior year data
-        for label in response_data['labels']:
-            if days_diff > 90:  # Monthly data
-                month_year = datetime.strptime(label, '%b %Y')
-                month_data = prior_year_data.filter(date__year=month_year.year, date__month=month_year.month)
-                avg_adr = month_data.aggregate(Avg('average_rate'))['average_rate__avg'] or 0
-                response_data['previous']['adr'].append(float(avg_adr))
-            else:  # Daily data
-                # For daily data, we'll use the first available data point for each day
-                if prior_year_data.exists():
-                    first_data = prior_year_data.first()
-                    response_data['previous']['adr'].append(float(first_data.average_rate))
-                else:
-                    response_data['previous']['adr'].append(0)
-    
-    if metric_type in ['revpar', 'all']:
-        response_data['current']['revpar'] = []
-        response_data['previous']['revpar'] = []
-        
-        # Current year data
-        for label in response_data['labels']:
-            if days_diff > 90:  # Monthly data
-                month_year = datetime.strptime(label, '%b %Y')
-                month_data = hotel_data.filter(date__year=month_year.year, date__month=month_year.month)
-                avg_revpar = month_data.aggregate(Avg('revpar'))['revpar__avg'] or 0
-                response_data['current']['revpar'].append(float(avg_revpar))
-            else:  # Daily data
-                # For daily data, we'll use the first available data point for each day
-                if hotel_data.exists():
-                    first_data = hotel_data.first()
-                    response_data['current']['revpar'].append(float(first_data.revpar))
-                else:
-                    response_data['current']['revpar'].append(0)
-        
-        # Prior year data
-        for label in response_data['labels']:
-            if days_diff > 90:  # Monthly data
-                month_year = datetime.strptime(label, '%b %Y')
-                month_data = prior_year_data.filter(date__year=month_year.year, date__month=month_year.month)
-                avg_revpar = month_data.aggregate(Avg('revpar'))['revpar__avg'] or 0
-                response_data['previous']['revpar'].append(float(avg_revpar))
-            else:  # Daily data
-                # For daily data, we'll use the first available data point for each day
-                if prior_year_data.exists():
-                    first_data = prior_year_data.first()
-                    response_data['previous']['revpar'].append(float(first_data.revpar))
-                else:
-                    response_data['previous']['revpar'].append(0)
-    
+
+    for key, field in (('occupancy', 'occupancy_percentage'), ('adr', 'average_rate'), ('revpar', 'revpar')):
+        if metric_type not in (key, 'all'):
+            continue
+        response_data['current'][key] = [float(series.avg(field, first, last)) for _, first, last in buckets]
+        # Prior year points cover the same days shifted back one year
+        response_data['previous'][key] = [
+            float(series.avg(field, first - prior_year_offset, last - prior_year_offset))
+            for _, first, last in buckets
+        ]
+
     return JsonResponse(response_data)
 
 @login_required
@@ -267,55 +171,28 @@ def performance_indices_api(request):
     API endpoint for performance indices chart data (MPI, ARI, RGI)
     Accepts start_date and end_date parameters
     """
-    hotel = Hotel.objects.first()
-    
+    hotel = request_hotel(request)
+
     if not hotel:
         return JsonResponse({'error': 'Hotel not found'}, status=404)
-    
-    # Get date range from request
-    start_date_str = request.GET.get('start_date')
-    end_date_str = request.GET.get('end_date')
-    
+
     # Default to current month if no dates provided
-    today = timezone.now().date()
-    current_month = today.month
-    current_year = today.year
-    _, last_day = monthrange(current_year, current_month)
-    start_date = date(current_year, current_month, 1)
-    end_date = date(current_year, current_month, last_day)
-    
-    # Process custom date range if provided
-    if start_date_str and end_date_str:
-        try:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-        except ValueError:
-            return JsonResponse({'error': 'Invalid date format. Please use YYYY-MM-DD format.'}, status=400)
-    
-    # Get performance indices for the hotel in the date range
-    performance_indices = PerformanceIndex.objects.filter(
-        hotel=hotel,
-        date__gte=start_date,
-        date__lte=end_date,
-        competitor__isnull=True  # Only get hotel's own indices
-    ).order_by('date')
-    
+    try:
+        start_date, end_date = _chart_date_range(request)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date format. Please use YYYY-MM-DD format.'}, status=400)
+
     # Calculate prior year date range (same period last year)
     days_diff = (end_date - start_date).days
-    prior_year_start_date = date(start_date.year - 1, start_date.month, start_date.day)
+    prior_year_start_date = _same_day_prior_year(start_date)
     prior_year_end_date = prior_year_start_date + timedelta(days=days_diff)
-    
-    # Get prior year performance indices
-    prior_year_indices = PerformanceIndex.objects.filter(
-        hotel=hotel,
-        date__gte=prior_year_start_date,
-        date__lte=prior_year_end_date,
-        competitor__isnull=True
-    ).order_by('date')
-    
-    # Generate date labels
+
+    # Hotel's own indices only
+    series = get_series('index', hotel.id)
+    buckets = _chart_buckets(start_date, end_date)
+
     response_data = {
-        'labels': [],
+        'labels': [label for label, _, _ in buckets],
         'current': {},
         'market': {},
         'date_range': {
@@ -325,80 +202,121 @@ def performance_indices_api(request):
             'prior_end_date': prior_year_end_date.isoformat()
         }
     }
-    
-    # Generate date labels (monthly or daily based on date range)
-    if days_diff > 90:  # More than 3 months, use monthly labels
-        current_date = start_date.replace(day=1)
-        while current_date <= end_date:
-            response_data['labels'].append(current_date.strftime('%b %Y'))
-            current_date = (current_date.replace(day=1) + timedelta(days=32)).replace(day=1)
-    else:  # Use daily labels
-        current_date = start_date
-        while current_date <= end_date:
-            response_data['labels'].append(current_date.strftime('%b %d'))
-            current_date += timedelta(days=1)
-    
-    # Get MPI data
-    response_data['current']['mpi'] = []
-    response_data['market']['mpi'] = []
-    
-    for label in response_data['labels']:
-        if days_diff > 90:  # Monthly data
-            month_year = datetime.strptime(label, '%b %Y')
-            month_data = performance_indices.filter(date__year=month_year.year, date__month=month_year.month)
-            avg_mpi = month_data.aggregate(Avg('mpi'))['mpi__avg'] or 100
-            response_data['current']['mpi'].append(float(avg_mpi))
-        else:  # Daily data
-            # For daily data, we'll use the first available data point for each day
-            if performance_indices.exists():
-                first_data = performance_indices.first()
-                response_data['current']['mpi'].append(float(first_data.mpi or 100))
-            else:
-                response_data['current']['mpi'].append(100)
-        
-        # Market average is always 100 (baseline)
-        response_data['market']['mpi'].append(100)
-    
-    # Get ARI data
-    response_data['current']['ari'] = []
-    response_data['market']['ari'] = []
-    
-    for label in response_data['labels']:
-        if days_diff > 90:  # Monthly data
-            month_year = datetime.strptime(label, '%b %Y')
-            month_data = performance_indices.filter(date__year=month_year.year, date__month=month_year.month)
-            avg_ari = month_data.aggregate(Avg('ari'))['ari__avg'] or 100
-            response_data['current']['ari'].append(float(avg_ari))
-        else:  # Daily data
-            # For daily data, we'll use the first available data point for each day
-            if performance_indices.exists():
-                first_data = performance_indices.first()
-                response_data['current']['ari'].append(float(first_data.ari or 100))
-            else:
-                response_data['current']['ari'].append(100)
-        
-        # Market average is always 100 (baseline)
-        response_data['market']['ari'].append(100)
-    
-    # Get RGI data
-    response_data['current']['rgi'] = []
-    response_data['market']['rgi'] = []
-    
-    for label in response_data['labels']:
-        if days_diff > 90:  # Monthly data
-            month_year = datetime.strptime(label, '%b %Y')
-            month_data = performance_indices.filter(date__year=month_year.year, date__month=month_year.month)
-            avg_rgi = month_data.aggregate(Avg('rgi'))['rgi__avg'] or 100
-            response_data['current']['rgi'].append(float(avg_rgi))
-        else:  # Daily data
-            # For daily data, we'll use the first available data point for each day
-            if performance_indices.exists():
-                first_data = performance_indices.first()
-                response_data['current']['rgi'].append(float(first_data.rgi or 100))
-            else:
-                response_data['current']['rgi'].append(100)
-        
+
+    for index in ('mpi', 'ari', 'rgi'):
+        # Points without indices sit on the baseline
+        response_data['current'][index] = [float(series.avg(index, first, last) or 100) for _, first, last in buckets]
         # Market average is always 100 (baseline)
-        response_data['market']['rgi'].append(100)
-    
-    return JsonResponse(response_data)
\ No newline at end of file
+        response_data['market'][index] = [100] * len(buckets)
+
+    return JsonResponse(response_data)
+
+@login_required
+@permission_required('accounts.view_hotel_management', raise_exception=True)
+def kpi_range_api(request):
+    """
+    Totals and averages for an arbitrary date range, answered from the cached
+    KPI series without touching the daily tables.
+    Accepts start_date and end_date parameters (defaults to the current month)
+    """
+    hotel = request_hotel(request)
+
+    if not hotel:
+        return JsonResponse({'error': 'Hotel not found'}, status=404)
+
+    try:
+        start_date, end_date = _chart_date_range(request)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date format. Please use YYYY-MM-DD format.'}, status=400)
+
+    series = get_series('hotel', hotel.id)
+    indices = get_series('index', hotel.id)
+    rooms_sold = series.sum('rooms_sold', start_date, end_date)
+    room_nights = series.sum('total_rooms', start_date, end_date)
+    revenue = series.sum('total_revenue', start_date, end_date)
+
+    competitors = []
+    for competitor in sorted(get_active_competitors(hotel.id), key=lambda competitor: competitor.name):
+        competitor_series = get_series('competitor', competitor.id)
+        competitors.append({
+            'id': competitor.id,
+            'name': competitor.name,
+            'rooms_sold': int(competitor_series.sum('rooms_sold', start_date, end_date)),
+            'occupancy': round(competitor_series.avg('estimated_occupancy', start_date, end_date), 2),
+            'adr': round(competitor_series.avg('estimated_average_rate', start_date, end_date), 2),
+            'revpar': round(competitor_series.avg('revpar', start_date, end_date), 2),
+        })
+
+    return JsonResponse({
+        'date_range': {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+        },
+        'hotel': {
+            'days_with_data': series.count('rooms_sold', start_date, end_date),
+            'rooms_sold': int(rooms_sold),
+            'room_nights': int(room_nights),
+            'total_revenue': round(revenue, 2),
+            # Averages of the daily figures, as shown on the reports
+            'occupancy': round(series.avg('occupancy_percentage', start_date, end_date), 2),
+            'adr': round(series.avg('average_rate', start_date, end_date), 2),
+            'revpar': round(series.avg('revpar', start_date, end_date), 2),
+        },
+        'indices': {
+            index: round(indices.avg(index, start_date, end_date), 2)
+            for index in ('mpi', 'ari', 'rgi', 'fair_market_share', 'actual_market_share')
+        },
+        'competitors': competitors,
+    })
+
+@login_required
+@permission_required('accounts.view_hotel_management', raise_exception=True)
+def goal_pacing_api(request):
+    """
+    Budget goal pacing: actuals against the day-level goal calendar.
+    Accepts start_date and end_date parameters (defaults to the current month),
+    at most GOAL_PACING_MAX_DAYS days apart
+    """
+    hotel = request_hotel(request)
+
+    if not hotel:
+        return JsonResponse({'error': 'Hotel not found'}, status=404)
+
+    try:
+        start_date, end_date = _chart_date_range(request)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date format. Please use YYYY-MM-DD format.'}, status=400)
+    if start_date > end_date:
+        return JsonResponse({'error': 'start_date must not be after end_date.'}, status=400)
+    if (end_date - start_date).days + 1 > GOAL_PACING_MAX_DAYS:
+        return JsonResponse({'error': f'The date range can cover at most {GOAL_PACING_MAX_DAYS} days.'}, status=400)
+
+    return JsonResponse({
+        'date_range': {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+        },
+        'summary': goal_vs_actual(hotel, start_date, end_date),
+        'days': goal_pacing(hotel, start_date, end_date),
+    })
+
+@login_required
+@permission_required('accounts.view_hotel_management', raise_exception=True)
+def budget_forecast_api(request):
+    """
+    Month, quarter and year-end projections for every budget goal.
+    Accepts an optional fiscal_year parameter to narrow the goals returned
+    """
+    hotel = request_hotel(request)
+
+    if not hotel:
+        return JsonResponse({'error': 'Hotel not found'}, status=404)
+
+    forecast = budget_forecast(hotel)
+    fiscal_year = request.GET.get('fiscal_year')
+    if fiscal_year:
+        if not fiscal_year.isdigit():
+            return JsonResponse({'error': 'fiscal_year must be a year, e.g. 2025.'}, status=400)
+        forecast = dict(forecast, goals=[goal for goal in forecast['goals'] if goal['fiscal_year'] == int(fiscal_year)])
+
+    return JsonResponse(forecast)
@@ -0,0 +1,177 @@
+from datetime import datetime, time
+
+from django.apps import apps
+from django.contrib.auth.decorators import login_required, permission_required
+from django.db import models
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .export_utils import (
+    PYARROW_AVAILABLE,
+    arrow_schema,
+    iter_queryset_chunks,
+    iter_queryset_rows,
+    stream_csv_response,
+    stream_parquet_response,
+)
+
+# Datasets available to the analytics export API. ``date_field`` drives the
+# start_date/end_date filter and ``changed_field`` the incremental export.
+EXPORT_DATASETS = {
+    'daily-data': {
+        'model': 'hotel_management.DailyData',
+        'date_field': 'date',
+        'changed_field': 'updated_at',
+        'fields': [
+            'id', 'date', 'hotel_id', 'hotel__name', 'rooms_sold', 'total_rooms', 'total_revenue',
+            'average_rate', 'occupancy_percentage', 'revpar', 'created_at', 'updated_at',
+        ],
+    },
+    'competitor-data': {
+        'model': 'hotel_management.CompetitorData',
+        'date_field': 'date',
+        'changed_field': 'updated_at',
+        'fields': [
+            'id', 'date', 'competitor__hotel_id', 'competitor_id', 'competitor__name', 'rooms_sold', 'total_rooms',
+            'estimated_occupancy', 'estimated_average_rate', 'revpar', 'occupancy_index',
+            'adr_index', 'revenue_index', 'created_at', 'updated_at',
+        ],
+    },
+    'performance-index': {
+        'model': 'hotel_management.PerformanceIndex',
+        'date_field': 'date',
+        'changed_field': 'updated_at',
+        'fields': [
+            'id', 'date', 'hotel_id', 'competitor_id', 'competitor__name', 'fair_market_share',
+            'actual_market_share', 'mpi', 'ari', 'rgi', 'mpi_rank', 'ari_rank', 'rgi_rank',
+            'created_at', 'updated_at',
+        ],
+    },
+    'market-summary': {
+        'model': 'hotel_management.MarketSummary',
+        'date_field': 'date',
+        'changed_field': 'updated_at',
+        'fields': [
+            'id', 'date', 'hotel_id', 'total_rooms_available', 'total_rooms_sold', 'total_revenue',
+            'market_occupancy', 'market_adr', 'market_revpar', 'created_at', 'updated_at',
+        ],
+    },
+    'repair-requests': {
+        'model': 'hotelkit.RepairRequest',
+        'date_field': 'creation_date',
+        'changed_field': 'updated_at',
+        'fields': [
+            'id', 'id_field', 'creator', 'recipients', 'location', 'location_path', 'type', 'type_path',
+            'assets', 'ticket', 'creation_date', 'priority', 'state', 'latest_state_change_user',
+            'latest_state_change_time', 'time_accepted', 'time_in_progress', 'time_done',
+            'time_in_evaluation', 'parking_reason', 'response_time', 'work_start_delay',
+            'completion_time', 'execution_time', 'evaluation_time', 'latest_state_delay',
+            'created_at', 'updated_at',
+        ],
+    },
+    'guest-requests': {
+        'model': 'hotelkit.GuestRequest',
+        'date_field': 'creation_date',
+        'changed_field': 'updated_at',
+        'fields': [
+            'id', 'request_id', 'creator', 'recipients', 'location', 'location_path', 'type', 'type_path',
+            'ticket', 'creation_date', 'priority', 'state', 'latest_state_change_user',
+            'latest_state_change_time', 'time_accepted', 'time_in_progress', 'time_done',
+            'time_in_evaluation', 'response_time', 'completion_time', 'total_duration',
+            'uploaded_at', 'updated_at',
+        ],
+    },
+    'arrivals': {
+        'model': 'guest_experience.ArrivalRecord',
+        'date_field': 'arrival_date',
+        'changed_field': 'updated_at',
+        'fields': [
+            'id', 'property_name', 'confirmation_number', 'room', 'nationality', 'country',
+            'arrival_date', 'departure_date', 'nights', 'status', 'travel_agent_name', 'vip_code',
+            'rate', 'rate_code', 'membership_type', 'in_house_since', 'first_courtesy_due_at',
+            'first_courtesy_done_at', 'first_courtesy_outcome', 'second_courtesy_due_at',
+            'second_courtesy_done_at', 'second_courtesy_outcome', 'departed_at', 'departure_method',
+            'message_sent_to_guest', 'created_at', 'updated_at',
+        ],
+    },
+}
+
+EXPORT_FORMATS = ('csv', 'parquet')
+
+
+def _parse_changed_since(value):
+    """Accept either an ISO datetime or a plain date for ``changed_since``."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def build_export_queryset(dataset, start_date=None, end_date=None, changed_since=None):
+    """Return the filtered queryset and model for an export dataset."""
+    config = EXPORT_DATASETS[dataset]
+    model = apps.get_model(config['model'])
+    date_field = config['date_field']
+    # Datetime columns are filtered on their calendar date
+    if isinstance(model._meta.get_field(date_field), models.DateTimeField):
+        date_field = f'{date_field}__date'
+
+    queryset = model.objects.all()
+    if start_date:
+        queryset = queryset.filter(**{f'{date_field}__gte': start_date})
+    if end_date:
+        queryset = queryset.filter(**{f'{date_field}__lte': end_date})
+    if changed_since:
+        queryset = queryset.filter(**{f"{config['changed_field']}__gte": changed_since})
+        # Incremental consumers resume from the last updated_at they saw
+        queryset = queryset.order_by(config['changed_field'], 'pk')
+    else:
+        queryset = queryset.order_by('pk')
+    return queryset, model
+
+
+@login_required
+@permission_required('accounts.view_reporting', raise_exception=True)
+def data_export_api(request, dataset, export_format):
+    """
+    Bulk export of analytics tables as streamed CSV or Parquet.
+
+    Query parameters:
+        start_date / end_date: YYYY-MM-DD bounds on the dataset's date column
+        changed_since: ISO date or datetime; only rows updated since then
+    """
+    if dataset not in EXPORT_DATASETS:
+        return JsonResponse({'error': f'Unknown dataset. Choose one of: {", ".join(EXPORT_DATASETS)}'}, status=404)
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': 'Format must be csv or parquet'}, status=400)
+    if export_format == 'parquet' and not PYARROW_AVAILABLE:
+        return JsonResponse({'error': 'Parquet export requires pyarrow. Please install it.'}, status=500)
+
+    start_date = end_date = changed_since = None
+    try:
+        if request.GET.get('start_date'):
+            start_date = datetime.strptime(request.GET['start_date'], '%Y-%m-%d').date()
+        if request.GET.get('end_date'):
+            end_date = datetime.strptime(request.GET['end_date'], '%Y-%m-%d').date()
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date format. Please use YYYY-MM-DD format.'}, status=400)
+    if request.GET.get('changed_since'):
+        try:
+            changed_since = _parse_changed_since(request.GET['changed_since'])
+        except ValueError:
+            return JsonResponse({'error': 'Invalid changed_since. Use an ISO date or datetime.'}, status=400)
+
+    queryset, model = build_export_queryset(dataset, start_date, end_date, changed_since)
+    fields = EXPORT_DATASETS[dataset]['fields']
+    filename = f"{dataset.replace('-', '_')}_{start_date or 'all'}_{end_date or 'all'}.{export_format}"
+
+    if export_format == 'csv':
+        return stream_csv_response(filename, fields, iter_queryset_rows(queryset, fields))
+
+    return stream_parquet_response(filename, arrow_schema(model, fields), iter_queryset_chunks(queryset, fields))
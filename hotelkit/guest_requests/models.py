@@ -34,6 +34,7 @@ class GuestRequest(models.Model):
     total_duration = models.DurationField(null=True, blank=True)
 
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         app_label = 'hotelkit'
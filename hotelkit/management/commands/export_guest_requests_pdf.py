@@ -0,0 +1,43 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from hotelkit.utils import filter_guest_requests, export_guest_requests_to_pdf
+
+
+class Command(BaseCommand):
+    help = 'Export guest requests to a PDF file (for large exports run outside the web request)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', type=str, help='Path of the PDF file to write')
+        parser.add_argument('--start-date', type=str, help='Only requests created on or after YYYY-MM-DD')
+        parser.add_argument('--end-date', type=str, help='Only requests created on or before YYYY-MM-DD')
+        parser.add_argument('--status', type=str, default='', help='Only requests in this state')
+        parser.add_argument('--type', type=str, default='', help='Only requests of this type')
+
+    def _parse_date(self, value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid date "{value}". Please use YYYY-MM-DD format.')
+
+    def handle(self, *args, **options):
+        qs = filter_guest_requests(
+            start_date=self._parse_date(options['start_date']),
+            end_date=self._parse_date(options['end_date']),
+            status=options['status'],
+            request_type=options['type'],
+        )
+        total = qs.count()
+        self.stdout.write(f'Exporting {total} guest requests to {options["output"]}')
+
+        started = time.monotonic()
+        with open(options['output'], 'wb') as handle:
+            export_guest_requests_to_pdf(handle, qs)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Export completed in {elapsed:.1f}s ({total / elapsed if elapsed else total:.0f} rows/s)')
+        )
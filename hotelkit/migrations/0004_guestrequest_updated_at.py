@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-19 09:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotelkit', '0003_guestrequest_assets_guestrequest_comments_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='guestrequest',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -904,164 +904,128 @@ def get_internal_requests(start_date=None, end_date=None):
 
 
 # Export Functions
-def export_to_excel(report_type, start_date=None, end_date=None):
-    """Export report data to Excel."""
-    import openpyxl
-    from openpyxl.styles import Font, Alignment, PatternFill
-    from openpyxl.utils import get_column_letter
-    import io
-    
-    # Create workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = f"{report_type.title()} Report"
-    
-    # Add header
-    ws['A1'] = f"{report_type.title()} Report"
-    ws['A1'].font = Font(size=16, bold=True)
-    ws['A2'] = f"Date Range: {start_date or 'All'} to {end_date or 'All'}"
-    ws['A2'].font = Font(size=12)
-    
-    # Get data based on report type
+def _get_report_data(report_type, start_date=None, end_date=None):
+    """Return the section data for a daily/weekly/monthly report."""
     if report_type == 'daily':
-        data = get_daily_flash_data(start_date, end_date)
+        return get_daily_flash_data(start_date, end_date)
     elif report_type == 'weekly':
-        data = get_weekly_trend_data(start_date, end_date)
+        return get_weekly_trend_data(start_date, end_date)
     elif report_type == 'monthly':
-        data = get_monthly_root_cause_data(start_date, end_date)
-    else:
-        data = {}
-    
+        return get_monthly_root_cause_data(start_date, end_date)
+    return {}
+
+
+def export_to_excel(report_type, start_date=None, end_date=None):
+    """
+    Export report data to Excel.
+
+    Returns a ``StreamingWorkbook``; call ``as_response()`` to stream it or
+    ``to_bytes()`` to get the file contents.
+    """
+    from hotel_management.export_utils import StreamingWorkbook, estimate_column_widths, WIDTH_SAMPLE_ROWS
+
+    data = _get_report_data(report_type, start_date, end_date)
+
+    # Size columns from the section headers and a sample of their rows
+    sample_rows = []
+    for section_data in data.values():
+        if isinstance(section_data, list) and section_data:
+            headers = list(section_data[0].keys())
+            sample_rows.append(headers)
+            sample_rows.extend(
+                [item.get(header, '') for header in headers]
+                for item in section_data[:WIDTH_SAMPLE_ROWS]
+            )
+
+    book = StreamingWorkbook()
+    ws = book.create_sheet(f"{report_type.title()} Report")
+    ws.set_widths(estimate_column_widths([], sample_rows))
+
+    # Add header
+    ws.append([f"{report_type.title()} Report"], style='title')
+    ws.append([f"Date Range: {start_date or 'All'} to {end_date or 'All'}"], style='subtitle')
+    ws.skip()
+
     # Add data to worksheet
-    row = 4
     for section, section_data in data.items():
-        ws[f'A{row}'] = section
-        ws[f'A{row}'].font = Font(size=14, bold=True)
-        row += 1
-        
+        ws.append([section], style='section')
+
         if isinstance(section_data, list) and section_data:
-            # Add headers
             headers = list(section_data[0].keys())
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=row, column=col, value=header)
-                cell.font = Font(bold=True)
-                cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-            row += 1
-            
-            # Add data rows
+            ws.append(headers, style='subheader')
             for item in section_data:
-                for col, header in enumerate(headers, 1):
-                    value = item.get(header, '')
-                    if hasattr(value, 'total_seconds'):  # Handle timedelta objects
-                        value = str(value)
-                    ws.cell(row=row, column=col, value=value)
-                row += 1
-        row += 1
-    
-    # Auto-adjust column widths
-    for column in ws.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Save to BytesIO
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    return output.read()
+                ws.append([item.get(header, '') for header in headers])
+        ws.skip()
+
+    return book
+
+
+def _report_sections(data):
+    """Turn report section data into ``(heading, headers, rows)`` tables."""
+    for section, section_data in data.items():
+        if isinstance(section_data, list) and section_data:
+            headers = list(section_data[0].keys())
+            rows = ([item.get(header, '') for header in headers] for item in section_data)
+            yield section, headers, rows
+        else:
+            yield section, [], []
 
 
 def export_to_pdf(report_type, start_date=None, end_date=None):
     """Export report data to PDF."""
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    from reportlab.lib import colors
+    from hotel_management.export_utils import write_table_pdf
     import io
-    
-    # Create BytesIO buffer
+
+    data = _get_report_data(report_type, start_date, end_date)
+
     buffer = io.BytesIO()
-    
-    # Create PDF document
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-    
-    # Get styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30,
-        alignment=1  # Center alignment
+    write_table_pdf(
+        buffer,
+        f"{report_type.title()} Report",
+        _report_sections(data),
+        subtitle=f"Date Range: {start_date or 'All'} to {end_date or 'All'}",
+        landscape_pages=False,
     )
-    
-    # Get data based on report type
-    if report_type == 'daily':
-        data = get_daily_flash_data(start_date, end_date)
-    elif report_type == 'weekly':
-        data = get_weekly_trend_data(start_date, end_date)
-    elif report_type == 'monthly':
-        data = get_monthly_root_cause_data(start_date, end_date)
-    else:
-        data = {}
-    
-    # Build PDF content
-    story = []
-    
-    # Add title
-    story.append(Paragraph(f"{report_type.title()} Report", title_style))
-    story.append(Paragraph(f"Date Range: {start_date or 'All'} to {end_date or 'All'}", styles['Normal']))
-    story.append(Spacer(1, 20))
-    
-    # Add data sections
-    for section, section_data in data.items():
-        story.append(Paragraph(section, styles['Heading2']))
-        story.append(Spacer(1, 12))
-        
-        if isinstance(section_data, list) and section_data:
-            # Create table
-            headers = list(section_data[0].keys())
-            table_data = [headers]
-            
-            for item in section_data:
-                row = []
-                for header in headers:
-                    value = item.get(header, '')
-                    if hasattr(value, 'total_seconds'):  # Handle timedelta objects
-                        value = str(value)
-                    row.append(str(value))
-                table_data.append(row)
-            
-            table = Table(table_data)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 14),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            story.append(table)
-            story.append(Spacer(1, 20))
-    
-    # Build PDF
-    doc.build(story)
-    
-    # Get PDF content
-    buffer.seek(0)
-    return buffer.read()
+    return buffer.getvalue()
+
+
+# Guest request exports
+GUEST_REQUEST_PDF_TITLE = 'Guest Requests Export'
+GUEST_REQUEST_PDF_HEADERS = ['ID', 'Creator', 'Recipients', 'Location', 'Type', 'Priority', 'State', 'Created', 'Done']
+GUEST_REQUEST_PDF_FIELDS = [
+    'request_id', 'creator', 'recipients', 'location', 'type', 'priority', 'state', 'creation_date', 'time_done',
+]
+
+
+def filter_guest_requests(start_date=None, end_date=None, status='', request_type=''):
+    """Guest requests filtered the same way as the guest request dashboards."""
+    from .guest_requests.models import GuestRequest
+
+    qs = GuestRequest.objects.all()
+    if start_date:
+        qs = qs.filter(creation_date__date__gte=start_date)
+    if end_date:
+        qs = qs.filter(creation_date__date__lte=end_date)
+    if status:
+        qs = qs.filter(state=status)
+    if request_type:
+        qs = qs.filter(type=request_type)
+    return qs
+
+
+def guest_requests_pdf_sections(queryset):
+    """Table sections for the guest request PDF export, read straight from the database."""
+    from hotel_management.export_utils import iter_queryset_rows
+
+    rows = iter_queryset_rows(queryset.order_by('creation_date'), GUEST_REQUEST_PDF_FIELDS)
+    return [(None, GUEST_REQUEST_PDF_HEADERS, rows)]
+
+
+def export_guest_requests_to_pdf(handle, queryset):
+    """Write the guest request PDF export for ``queryset`` to ``handle``."""
+    from hotel_management.export_utils import write_table_pdf
+
+    write_table_pdf(handle, GUEST_REQUEST_PDF_TITLE, guest_requests_pdf_sections(queryset))
 
 
 def get_daily_flash_data(start_date=None, end_date=None):
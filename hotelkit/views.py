@@ -899,17 +899,9 @@ class ExportExcelView(APIView):
                 pass
         
         try:
-            # Generate Excel file
-            excel_file = export_to_excel(report_type, start_date_obj, end_date_obj)
-            
-            # Create HTTP response
-            response = HttpResponse(
-                excel_file,
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-            response['Content-Disposition'] = f'attachment; filename="{report_type}_report_{start_date or "all"}_{end_date or "all"}.xlsx"'
-            
-            return response
+            # Generate Excel file and stream it back
+            workbook = export_to_excel(report_type, start_date_obj, end_date_obj)
+            return workbook.as_response(f'{report_type}_report_{start_date or "all"}_{end_date or "all"}.xlsx')
             
         except Exception as e:
             return Response({'error': str(e)}, status=500)
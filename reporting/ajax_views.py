@@ -9,14 +9,15 @@ from django.db.models import Sum, Avg
 import json
 
 from hotel_management.models import Hotel, Competitor, DailyData, CompetitorData, MarketSummary, PerformanceIndex
+from hotel_management.registry import request_hotel
 
 @login_required
 @require_POST
 def refresh_competitor_analytics(request):
     """AJAX endpoint to refresh competitor analytics data"""
     # Get the current hotel and competitors
-    hotel = Hotel.objects.first()
-    competitors = Competitor.objects.all()
+    hotel = request_hotel(request)
+    competitors = Competitor.objects.filter(hotel=hotel)
     
     # Get date range from request
     start_date_str = request.POST.get('start_date')
@@ -0,0 +1,193 @@
+from decimal import Decimal
+
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.utils import timezone
+
+from hotel_management.models import Competitor, CompetitorData, DailyData, MarketSummary, PerformanceIndex
+
+INDEX_FIELDS = ('mpi', 'ari', 'rgi', 'fair_market_share', 'actual_market_share')
+
+
+def _empty_metrics():
+    return {
+        'rooms_available': 0,
+        'rooms_sold': 0,
+        'room_revenue': 0,
+        'occupancy_percentage': 0,
+        'average_rate': 0,
+        'revpar': 0,
+        'fair_market_share': 0,
+        'actual_market_share': 0,
+        'mpi': 0,
+        'ari': 0,
+        'rgi': 0,
+        'mpi_rank': 0,
+        'ari_rank': 0,
+        'rgi_rank': 0,
+    }
+
+
+def _index_averages(hotel, competitor_ids, start_date, end_date):
+    """Average performance indices per competitor (None for the hotel) in one query."""
+    rows = PerformanceIndex.objects.filter(
+        Q(competitor__isnull=True) | Q(competitor_id__in=competitor_ids),
+        hotel=hotel,
+        date__gte=start_date,
+        date__lte=end_date,
+    )
+    rows = rows.order_by().values('competitor_id').annotate(**{field: Avg(field) for field in INDEX_FIELDS})
+    return {row['competitor_id']: row for row in rows}
+
+
+def _period_data(hotel, competitors, start_date, end_date, days):
+    """
+    Metrics for the hotel and each competitor over one period.
+
+    ``days`` multiplies the room inventory so MTD/YTD fair shares are based
+    on room nights rather than physical rooms.
+    """
+    competitor_ids = [competitor.id for competitor in competitors]
+    indices = _index_averages(hotel, competitor_ids, start_date, end_date)
+    data = {}
+
+    hotel_totals = DailyData.objects.filter(hotel=hotel, date__gte=start_date, date__lte=end_date).aggregate(
+        rooms_sold=Sum('rooms_sold'),
+        room_revenue=Sum('total_revenue'),
+        occupancy_percentage=Avg('occupancy_percentage'),
+        average_rate=Avg('average_rate'),
+        revpar=Avg('revpar'),
+    )
+    metrics = _empty_metrics()
+    metrics['rooms_available'] = hotel.total_rooms * days
+    for key, value in hotel_totals.items():
+        metrics[key] = value or 0
+    for field in INDEX_FIELDS:
+        metrics[field] = indices.get(None, {}).get(field) or 0
+    data[hotel.name] = metrics
+
+    competitor_totals = {
+        row['competitor_id']: row
+        for row in CompetitorData.objects.filter(
+            competitor_id__in=competitor_ids, date__gte=start_date, date__lte=end_date
+        ).order_by().values('competitor_id').annotate(
+            rooms_sold=Sum('rooms_sold'),
+            occupancy_percentage=Avg('estimated_occupancy'),
+            average_rate=Avg('estimated_average_rate'),
+        )
+    }
+    for competitor in competitors:
+        totals = competitor_totals.get(competitor.id, {})
+        metrics = _empty_metrics()
+        metrics['rooms_available'] = competitor.total_rooms * days
+        metrics['rooms_sold'] = totals.get('rooms_sold') or 0
+        metrics['occupancy_percentage'] = totals.get('occupancy_percentage') or 0
+        metrics['average_rate'] = totals.get('average_rate') or 0
+        metrics['room_revenue'] = metrics['rooms_sold'] * metrics['average_rate']
+        if metrics['rooms_available'] > 0:
+            metrics['revpar'] = metrics['room_revenue'] / metrics['rooms_available']
+        for field in INDEX_FIELDS:
+            metrics[field] = indices.get(competitor.id, {}).get(field) or 0
+        data[competitor.name] = metrics
+
+    return data
+
+
+def _apply_market_shares(data):
+    """Recalculate market shares and MPI/ARI/RGI against the competitive set, then rank."""
+    total_rooms_available = sum(metrics['rooms_available'] for metrics in data.values())
+    total_rooms_sold = sum(metrics['rooms_sold'] for metrics in data.values())
+    total_room_revenue = sum(metrics['room_revenue'] for metrics in data.values())
+
+    avg_market_rate = Decimal(str(total_room_revenue)) / Decimal(str(total_rooms_sold)) if total_rooms_sold > 0 else Decimal('0')
+    market_revpar = Decimal(str(total_room_revenue)) / Decimal(str(total_rooms_available)) if total_rooms_available > 0 else Decimal('0')
+
+    for metrics in data.values():
+        metrics['fair_market_share'] = (Decimal(str(metrics['rooms_available'])) / Decimal(str(total_rooms_available)) * Decimal('100')) if total_rooms_available > 0 else Decimal('0')
+        metrics['actual_market_share'] = (Decimal(str(metrics['rooms_sold'])) / Decimal(str(total_rooms_sold)) * Decimal('100')) if total_rooms_sold > 0 else Decimal('0')
+
+        # Market Penetration Index (MPI)
+        if metrics['fair_market_share'] > 0:
+            metrics['mpi'] = metrics['actual_market_share'] / metrics['fair_market_share'] * Decimal('100')
+
+        # Average Rate Index (ARI)
+        if avg_market_rate > 0:
+            metrics['ari'] = Decimal(str(metrics['average_rate'])) / avg_market_rate * Decimal('100')
+
+        # Revenue Generation Index (RGI)
+        if market_revpar > 0:
+            metrics['rgi'] = Decimal(str(metrics['revpar'])) / market_revpar * Decimal('100')
+
+    for index in ('mpi', 'ari', 'rgi'):
+        ranked = sorted(data.items(), key=lambda item: item[1][index], reverse=True)
+        for rank, (name, _) in enumerate(ranked, 1):
+            data[name][f'{index}_rank'] = rank
+
+    return {
+        'rooms_available': total_rooms_available,
+        'rooms_sold': total_rooms_sold,
+        'room_revenue': total_room_revenue,
+        'occupancy_percentage': (Decimal(str(total_rooms_sold)) / Decimal(str(total_rooms_available)) * Decimal('100')) if total_rooms_available > 0 else Decimal('0'),
+        'average_rate': avg_market_rate,
+        'revpar': market_revpar,
+    }
+
+
+def compute_competitor_analytics(hotel, competitors, start_date, end_date, today=None):
+    """
+    Competitive-set analytics for the custom range, month-to-date and year-to-date.
+
+    Returns a dict with ``daily_data``/``mtd_data``/``ytd_data`` keyed by hotel
+    name plus the matching ``*_totals``. This is the single source used by the
+    advanced analytics page and its PDF/Excel exports.
+    """
+    today = today or timezone.now().date()
+    month_start = today.replace(day=1)
+    year_start = today.replace(month=1, day=1)
+    competitors = list(competitors)
+
+    periods = {
+        'daily': (start_date, end_date, 1),
+        'mtd': (month_start, today, (today - month_start).days + 1),
+        'ytd': (year_start, today, (today - year_start).days + 1),
+    }
+    result = {}
+    for period, (period_start, period_end, days) in periods.items():
+        data = _period_data(hotel, competitors, period_start, period_end, days)
+        result[f'{period}_totals'] = _apply_market_shares(data)
+        result[f'{period}_data'] = data
+    return result
+
+
+def _queryset_version(queryset):
+    stats = queryset.order_by().aggregate(count=Count('id'), changed=Max('updated_at'))
+    return f"{stats['count']}:{stats['changed'].isoformat() if stats['changed'] else ''}"
+
+
+def competitor_analytics_version(hotel):
+    """
+    Cheap fingerprint of everything the competitor analytics read.
+
+    Any insert, update or delete of hotel, competitor, daily or index rows
+    changes the version, so caches keyed on it never serve stale figures.
+    """
+    parts = [hotel.updated_at.isoformat()]
+    for queryset in (
+        Competitor.objects.filter(hotel=hotel),
+        DailyData.objects.filter(hotel=hotel),
+        CompetitorData.objects.filter(competitor__hotel=hotel),
+        PerformanceIndex.objects.filter(hotel=hotel),
+    ):
+        parts.append(_queryset_version(queryset))
+    return '|'.join(parts)
+
+
+def performance_report_version(hotel):
+    """Fingerprint of the hotel, market and index rows behind the performance report charts."""
+    parts = [hotel.updated_at.isoformat()]
+    for queryset in (
+        DailyData.objects.filter(hotel=hotel),
+        MarketSummary.objects.filter(hotel=hotel),
+        PerformanceIndex.objects.filter(hotel=hotel, competitor__isnull=True),
+    ):
+        parts.append(_queryset_version(queryset))
+    return '|'.join(parts)
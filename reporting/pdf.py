@@ -0,0 +1,210 @@
+import hashlib
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+
+from django.core.cache import cache
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_LEFT
+from reportlab.lib.pagesizes import A3, landscape
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from .analytics import competitor_analytics_version, compute_competitor_analytics
+
+# Rendered packs are keyed on the analytics data version, so a long timeout
+# is safe: any data change produces a new key instead of a stale hit.
+COMPETITOR_PDF_CACHE_TIMEOUT = 60 * 60 * 24
+
+COMPETITOR_PDF_HEADERS = [
+    'Hotel', 'Total\nRooms', 'Occupancy\n%', 'Avg Rate',
+    'Sold\nRooms', 'Room Revenue', 'RevPAR', 'Fair Market\nShare',
+    'Actual Market\nShare', 'MPI\nRank', 'MPI\nIndex',
+    'ARI\nRank', 'ARI\nIndex', 'RGI\nRank', 'RGI\nIndex'
+]
+
+COMPETITOR_PDF_COLUMN_WIDTHS = [
+    35*mm, 20*mm, 18*mm, 22*mm, 18*mm, 25*mm, 22*mm, 20*mm,
+    20*mm, 15*mm, 18*mm, 15*mm, 18*mm, 15*mm, 18*mm
+]
+
+# (analytics key, section title, header colour) in the order they are rendered.
+# Only the selected date range is exported to match the on-screen report.
+COMPETITOR_PDF_SECTIONS = (
+    ('daily', 'Custom Date Range Performance Metrics', '#d97706'),
+)
+
+
+@lru_cache(maxsize=None)
+def competitor_pdf_styles():
+    """Paragraph styles for the competitive-set pack, built once per process."""
+    styles = getSampleStyleSheet()
+    return {
+        'normal': styles['Normal'],
+        'title': ParagraphStyle(
+            'CompetitorPdfTitle',
+            parent=styles['Heading1'],
+            fontSize=18,
+            textColor=colors.HexColor('#2563eb'),
+            spaceAfter=6*mm,
+            alignment=TA_LEFT
+        ),
+        'subtitle': ParagraphStyle(
+            'CompetitorPdfSubtitle',
+            fontSize=12,
+            textColor=colors.HexColor('#646464'),
+            spaceAfter=2*mm,
+            alignment=TA_LEFT
+        ),
+        'section': ParagraphStyle(
+            'CompetitorPdfSection',
+            fontSize=14,
+            spaceAfter=8*mm,
+            spaceBefore=15*mm,
+            alignment=TA_LEFT,
+            fontName='Helvetica-Bold'
+        ),
+    }
+
+
+@lru_cache(maxsize=None)
+def competitor_section_style(header_color):
+    return ParagraphStyle(
+        f'CompetitorPdfSection{header_color}',
+        parent=competitor_pdf_styles()['section'],
+        textColor=colors.HexColor(header_color)
+    )
+
+
+@lru_cache(maxsize=None)
+def competitor_table_style(header_color):
+    """Table style per header colour, shared by every table rendered in this process."""
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(header_color)),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 7),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 2*mm),
+        ('TOPPADDING', (0, 0), (-1, 0), 2*mm),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 0.1*mm, colors.HexColor('#c8c8c8')),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 2*mm),
+        ('TOPPADDING', (0, 1), (-1, -1), 2*mm),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.HexColor('#f8fafc')]),
+        ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
+        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#e5e7eb')),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ])
+
+
+def _metrics_row(hotel_name, metrics):
+    return [
+        hotel_name,
+        str(int(metrics.get('rooms_available', 0))),
+        f"{float(metrics.get('occupancy_percentage', 0)):.1f}%",
+        f"EGP {float(metrics.get('average_rate', 0)):.2f}",
+        str(int(metrics.get('rooms_sold', 0))),
+        f"EGP {float(metrics.get('room_revenue', 0)):.2f}",
+        f"EGP {float(metrics.get('revpar', 0)):.2f}",
+        f"{float(metrics.get('fair_market_share', 0)):.2f}%",
+        f"{float(metrics.get('actual_market_share', 0)):.2f}%",
+        str(metrics.get('mpi_rank', '-')),
+        f"{float(metrics.get('mpi', 0)):.2f}",
+        str(metrics.get('ari_rank', '-')),
+        f"{float(metrics.get('ari', 0)):.2f}",
+        str(metrics.get('rgi_rank', '-')),
+        f"{float(metrics.get('rgi', 0)):.2f}",
+    ]
+
+
+def _totals_row(totals):
+    return [
+        'Total',
+        str(int(totals.get('rooms_available', 0))),
+        f"{float(totals.get('occupancy_percentage', 0)):.1f}%",
+        f"EGP {float(totals.get('average_rate', 0)):.2f}",
+        str(int(totals.get('rooms_sold', 0))),
+        f"EGP {float(totals.get('room_revenue', 0)):.2f}",
+        f"EGP {float(totals.get('revpar', 0)):.2f}",
+        '100.00%', '100.00%',
+        '-', '-', '-', '-', '-', '-',
+    ]
+
+
+def render_competitor_analytics_pdf(hotel, analytics, start_date, end_date, sections=COMPETITOR_PDF_SECTIONS):
+    """
+    Render a precomputed ``compute_competitor_analytics`` result as an A3
+    landscape PDF and return the bytes.
+    """
+    styles = competitor_pdf_styles()
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=landscape(A3),
+        rightMargin=10*mm,
+        leftMargin=10*mm,
+        topMargin=20*mm,
+        bottomMargin=15*mm,
+        pageCompression=1,
+    )
+
+    story = [
+        Paragraph(f"{hotel.name} - Market Share Report", styles['title']),
+        Paragraph(
+            f"Date Range: {start_date.strftime('%b %d, %Y')} - {end_date.strftime('%b %d, %Y')}",
+            styles['subtitle']
+        ),
+        Paragraph(f"Generated on: {datetime.now().strftime('%m/%d/%Y')}", styles['subtitle']),
+        Spacer(1, 10*mm),
+    ]
+
+    for period, title, header_color in sections:
+        data = analytics.get(f'{period}_data') or {}
+        story.append(Paragraph(title, competitor_section_style(header_color)))
+        if not data:
+            story.append(Paragraph("No data available for this period.", styles['normal']))
+            story.append(Spacer(1, 15*mm))
+            continue
+
+        table_data = [COMPETITOR_PDF_HEADERS]
+        table_data.extend(_metrics_row(hotel_name, metrics) for hotel_name, metrics in data.items())
+        table_data.append(_totals_row(analytics.get(f'{period}_totals') or {}))
+
+        table = Table(table_data, colWidths=COMPETITOR_PDF_COLUMN_WIDTHS, repeatRows=1)
+        table.setStyle(competitor_table_style(header_color))
+        story.append(table)
+        story.append(Spacer(1, 15*mm))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def competitor_analytics_pdf(hotel, competitors, start_date, end_date, sections=COMPETITOR_PDF_SECTIONS):
+    """
+    Return the competitive-set PDF, rendering it only when the parameters or
+    the underlying data have changed since the last download.
+    """
+    competitors = list(competitors)
+    today = timezone.now().date()
+    params = '|'.join([
+        str(hotel.pk),
+        ','.join(str(competitor.pk) for competitor in competitors),
+        start_date.isoformat(),
+        end_date.isoformat(),
+        today.isoformat(),
+        repr(sections),
+        competitor_analytics_version(hotel),
+    ])
+    cache_key = f"competitor_analytics_pdf_{hashlib.md5(params.encode()).hexdigest()}"
+
+    pdf = cache.get(cache_key)
+    if pdf is None:
+        analytics = compute_competitor_analytics(hotel, competitors, start_date, end_date, today)
+        pdf = render_competitor_analytics_pdf(hotel, analytics, start_date, end_date, sections)
+        cache.set(cache_key, pdf, COMPETITOR_PDF_CACHE_TIMEOUT)
+    return pdf
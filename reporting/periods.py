@@ -0,0 +1,128 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from django.db.models import Q
+
+from hotel_management.models import CompetitorData, DailyData, MarketSummary, PerformanceIndex
+
+
+class PrefixSeries:
+    """
+    Date-ordered metric values with running sums and non-null counts.
+
+    The sum, count or average of any metric over a date window is two
+    bisects and two subtractions, so overlapping windows (custom range,
+    MTD, YTD) all come from the same rows. Null values are skipped the way
+    SQL AVG skips them.
+    """
+
+    def __init__(self, rows, metrics):
+        # rows: (date, value, value, ...) tuples ordered by date, one value per metric
+        self.rows = rows
+        self.positions = {metric: position for position, metric in enumerate(metrics, 1)}
+        self.dates = [row[0] for row in rows]
+        self.sums = {}
+        self.counts = {}
+        for position, metric in enumerate(metrics, 1):
+            sums = [0]
+            counts = [0]
+            for row in rows:
+                value = row[position]
+                if value is None:
+                    sums.append(sums[-1])
+                    counts.append(counts[-1])
+                else:
+                    sums.append(sums[-1] + value)
+                    counts.append(counts[-1] + 1)
+            self.sums[metric] = sums
+            self.counts[metric] = counts
+
+    def values(self, *metrics):
+        """(date, value, ...) tuples for the given metrics, in date order."""
+        if not self.rows:
+            return []
+        positions = [self.positions[metric] for metric in metrics]
+        return [(row[0], *(row[position] for position in positions)) for row in self.rows]
+
+    def _bounds(self, start_date, end_date):
+        return bisect_left(self.dates, start_date), bisect_right(self.dates, end_date)
+
+    def sum(self, metric, start_date, end_date):
+        lo, hi = self._bounds(start_date, end_date)
+        return self.sums[metric][hi] - self.sums[metric][lo]
+
+    def count(self, metric, start_date, end_date):
+        lo, hi = self._bounds(start_date, end_date)
+        return self.counts[metric][hi] - self.counts[metric][lo]
+
+    def avg(self, metric, start_date, end_date):
+        count = self.count(metric, start_date, end_date)
+        if not count:
+            return 0
+        return self.sum(metric, start_date, end_date) / count
+
+
+EMPTY_SERIES = PrefixSeries([], ())
+
+HOTEL_METRICS = ('rooms_sold', 'total_revenue', 'occupancy_percentage', 'average_rate', 'revpar')
+COMPETITOR_METRICS = ('rooms_sold', 'estimated_occupancy', 'estimated_average_rate', 'revpar')
+INDEX_METRICS = ('mpi', 'ari', 'rgi', 'fair_market_share', 'actual_market_share')
+MARKET_METRICS = ('market_occupancy', 'market_adr', 'market_revpar')
+
+
+class PeriodWindows:
+    """
+    Hotel, competitor, index and market series loaded once for a set of
+    named date windows.
+
+    ``windows`` maps a period name to ``(start_date, end_date)``. Each table
+    is read with a single query covering every window, and
+    ``series(source, key)`` returns the PrefixSeries used to answer any
+    window inside them.
+    """
+
+    def __init__(self, hotel, competitors, windows):
+        self.hotel = hotel
+        self.competitors = list(competitors)
+        self.windows = dict(windows)
+
+        date_filter = Q()
+        for start_date, end_date in self.windows.values():
+            date_filter |= Q(date__gte=start_date, date__lte=end_date)
+        competitor_ids = [competitor.id for competitor in self.competitors]
+
+        self._series = {
+            ('hotel', None): PrefixSeries(list(
+                DailyData.objects.filter(date_filter, hotel=hotel).order_by('date').values_list('date', *HOTEL_METRICS)
+            ), HOTEL_METRICS),
+            ('market', None): PrefixSeries(list(
+                MarketSummary.objects.filter(date_filter, hotel=hotel).order_by('date').values_list('date', *MARKET_METRICS)
+            ), MARKET_METRICS),
+        }
+
+        competitor_rows = defaultdict(list)
+        for competitor_id, *row in CompetitorData.objects.filter(
+            date_filter, competitor_id__in=competitor_ids
+        ).order_by('date').values_list('competitor_id', 'date', *COMPETITOR_METRICS):
+            competitor_rows[competitor_id].append(row)
+        for competitor_id, rows in competitor_rows.items():
+            self._series[('competitor', competitor_id)] = PrefixSeries(rows, COMPETITOR_METRICS)
+
+        index_rows = defaultdict(list)
+        for competitor_id, *row in PerformanceIndex.objects.filter(
+            Q(competitor__isnull=True) | Q(competitor_id__in=competitor_ids), date_filter, hotel=hotel
+        ).order_by('date').values_list('competitor_id', 'date', *INDEX_METRICS):
+            index_rows[competitor_id].append(row)
+        for competitor_id, rows in index_rows.items():
+            self._series[('index', competitor_id)] = PrefixSeries(rows, INDEX_METRICS)
+
+    def series(self, source, key=None):
+        """Series for 'hotel', 'market', ('competitor', id) or ('index', id or None for the hotel)."""
+        return self._series.get((source, key), EMPTY_SERIES)
+
+    def avg(self, source, key, metric, period):
+        start_date, end_date = self.windows[period]
+        series = self.series(source, key)
+        if metric not in series.sums:
+            return 0
+        return series.avg(metric, start_date, end_date)
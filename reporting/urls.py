@@ -23,5 +23,6 @@ urlpatterns = [
     path('hotel-performance/<int:hotel_id>/', views_performance.hotel_performance_report, name='hotel_performance'),
     path('export-pdf/<int:hotel_id>/', views.export_competitor_analytics_pdf, name='export_competitor_analytics_pdf'),
     path('hotel-performance/', views_performance.hotel_performance_report, name='hotel_performance_default'),
+    path('hotel-performance/<int:hotel_id>/charts/', views_performance.hotel_performance_charts_api, name='hotel_performance_charts'),
 
 ]
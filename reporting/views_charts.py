@@ -2,27 +2,31 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Avg, Sum, F, ExpressionWrapper, DecimalField, Count, Q
+from django.db.models import F, ExpressionWrapper, DecimalField, Count, Q
 from django.http import HttpResponse, JsonResponse
 from datetime import timedelta, datetime
 import json
 
-from hotel_management.models import Hotel, Competitor, DailyData, CompetitorData, MarketSummary, PerformanceIndex
+from hotel_management.models import DailyData, CompetitorData
+from hotel_management.registry import get_active_competitors, request_hotel
 from accounts.models import UserProfile, SystemSettings
 
+from .periods import PeriodWindows
+
 @login_required
 def competitor_charts(request):
     """View for generating and viewing competitor charts"""
-    hotel = Hotel.objects.first()
-    competitors = Competitor.objects.filter(is_active=True)
+    hotel = request_hotel(request)
     
     # If no hotel exists yet, redirect to hotel data page
     if not hotel:
         messages.info(request, 'Please set up your hotel information first')
         return redirect('hotel_management:hotel_data')
     
+    competitors = get_active_competitors(hotel.id)
+    
     # If no competitors exist, redirect to competitors page
-    if not competitors.exists():
+    if not competitors:
         messages.info(request, 'Please add competitors first')
         return redirect('hotel_management:competitors')
     
@@ -41,15 +45,10 @@ def competitor_charts(request):
             except ValueError:
                 messages.error(request, 'Invalid date format. Please use YYYY-MM-DD format.')
     
-    # Calculate date ranges for different periods
+    # Selected range, MTD and YTD computed from a single load of the union range
     today = timezone.now().date()
-    month_start = today.replace(day=1)
-    year_start = today.replace(month=1, day=1)
-    
-    # Get data for different periods
-    daily_data = prepare_chart_data(hotel, competitors, start_date, end_date)
-    mtd_data = prepare_chart_data(hotel, competitors, month_start, today)
-    ytd_data = prepare_chart_data(hotel, competitors, year_start, today)
+    periods = prepare_period_chart_data(hotel, competitors, chart_periods(start_date, end_date, today))
+    daily_data, mtd_data, ytd_data = periods['daily'], periods['mtd'], periods['ytd']
     
     # Debug: Print data to console
     print("Daily Data:", daily_data)
@@ -113,16 +112,17 @@ def create_sample_data(hotel, competitors):
 @login_required
 def competitor_analytics_charts(request):
     """View for generating and viewing advanced competitor analytics charts"""
-    hotel = Hotel.objects.first()
-    competitors = Competitor.objects.filter(is_active=True)
+    hotel = request_hotel(request)
     
     # If no hotel exists yet, redirect to hotel data page
     if not hotel:
         messages.info(request, 'Please set up your hotel information first')
         return redirect('hotel_management:hotel_data')
     
+    competitors = get_active_competitors(hotel.id)
+    
     # If no competitors exist, redirect to competitors page
-    if not competitors.exists():
+    if not competitors:
         messages.info(request, 'Please add competitors first')
         return redirect('hotel_management:competitors')
     
@@ -141,15 +141,10 @@ def competitor_analytics_charts(request):
             except ValueError:
                 messages.error(request, 'Invalid date format. Please use YYYY-MM-DD format.')
     
-    # Calculate date ranges for different periods
+    # Selected range, MTD and YTD computed from a single load of the union range
     today = timezone.now().date()
-    month_start = today.replace(day=1)
-    year_start = today.replace(month=1, day=1)
-    
-    # Get data for different periods with more detailed analytics
-    daily_data = prepare_advanced_chart_data(hotel, competitors, start_date, end_date)
-    mtd_data = prepare_advanced_chart_data(hotel, competitors, month_start, today)
-    ytd_data = prepare_advanced_chart_data(hotel, competitors, year_start, today)
+    periods = prepare_period_chart_data(hotel, competitors, chart_periods(start_date, end_date, today), advanced=True)
+    daily_data, mtd_data, ytd_data = periods['daily'], periods['mtd'], periods['ytd']
     
     context = {
         'title': 'Advanced Competitor Analytics Charts - Benchstay',
@@ -168,16 +163,17 @@ def competitor_analytics_charts(request):
 @login_required
 def competitor_data_visualization(request):
     """View for generating and viewing competitor data visualizations"""
-    hotel = Hotel.objects.first()
-    competitors = Competitor.objects.filter(is_active=True)
+    hotel = request_hotel(request)
     
     # If no hotel exists yet, redirect to hotel data page
     if not hotel:
         messages.info(request, 'Please set up your hotel information first')
         return redirect('hotel_management:hotel_data')
     
+    competitors = get_active_competitors(hotel.id)
+    
     # If no competitors exist, redirect to competitors page
-    if not competitors.exists():
+    if not competitors:
         messages.info(request, 'Please add competitors first')
         return redirect('hotel_management:competitors')
     
@@ -196,15 +192,15 @@ def competitor_data_visualization(request):
             except ValueError:
                 messages.error(request, 'Invalid date format. Please use YYYY-MM-DD format.')
     
-    # Calculate date ranges for different periods
+    # Selected range, MTD and YTD share one load per table; MTD is a slice of YTD
     today = timezone.now().date()
-    month_start = today.replace(day=1)
-    year_start = today.replace(month=1, day=1)
-    
-    # Get data for different periods with visualization-specific formatting
-    daily_data = prepare_visualization_data(hotel, competitors, start_date, end_date)
-    mtd_data = prepare_visualization_data(hotel, competitors, month_start, today)
-    ytd_data = prepare_visualization_data(hotel, competitors, year_start, today)
+    windows = chart_periods(start_date, end_date, today)
+    loaded = PeriodWindows(hotel, competitors, windows)
+    periods = prepare_period_chart_data(hotel, competitors, windows, advanced=True, loaded=loaded)
+    daily_trends = build_daily_trends(hotel, competitors, [windows['daily'], windows['ytd']], loaded=loaded)
+    for period, (period_start, period_end) in windows.items():
+        periods[period]['daily_trends'] = slice_daily_trends(daily_trends, period_start, period_end)
+    daily_data, mtd_data, ytd_data = periods['daily'], periods['mtd'], periods['ytd']
     
     context = {
         'title': 'Competitor Data Visualization - Benchstay',
@@ -225,144 +221,166 @@ def competitor_data_visualization(request):
     
     return render(request, 'reporting/competitor_data_visualization.html', context)
 
-def prepare_chart_data(hotel, competitors, start_date, end_date):
-    """Prepare data for competitor charts"""
-    data = {}
-    
-    # Get hotel data
-    hotel_data = DailyData.objects.filter(
-        hotel=hotel,
-        date__gte=start_date,
-        date__lte=end_date
-    )
-    
-    # Calculate hotel metrics
-    hotel_rooms_sold = hotel_data.aggregate(Sum('rooms_sold'))['rooms_sold__sum'] or 0
-    hotel_occupancy = hotel_data.aggregate(Avg('occupancy_percentage'))['occupancy_percentage__avg'] or 0
-    hotel_avg_rate = hotel_data.aggregate(Avg('average_rate'))['average_rate__avg'] or 0
-    hotel_revpar = hotel_data.aggregate(Avg('revpar'))['revpar__avg'] or 0
-    
-    # Get hotel performance indices
-    hotel_performance = PerformanceIndex.objects.filter(
-        hotel=hotel,
-        competitor=None,  # Only get hotel's own indices
-        date__gte=start_date,
-        date__lte=end_date
-    )
-    
-    hotel_mpi = hotel_performance.aggregate(Avg('mpi'))['mpi__avg'] or 0
-    hotel_ari = hotel_performance.aggregate(Avg('ari'))['ari__avg'] or 0
-    hotel_rgi = hotel_performance.aggregate(Avg('rgi'))['rgi__avg'] or 0
-    
-    # Add hotel data to the result
-    data[hotel.name] = {
-        'occupancy_percentage': float(hotel_occupancy),
-        'average_rate': float(hotel_avg_rate),
-        'revpar': float(hotel_revpar),
-        'mpi': float(hotel_mpi),
-        'ari': float(hotel_ari),
-        'rgi': float(hotel_rgi)
+def chart_periods(start_date, end_date, today):
+    """The selected range plus month-to-date and year-to-date windows ending today."""
+    return {
+        'daily': (start_date, end_date),
+        'mtd': (today.replace(day=1), today),
+        'ytd': (today.replace(month=1, day=1), today),
     }
-    
-    # Add competitor data
-    for competitor in competitors:
-        comp_data = CompetitorData.objects.filter(
-            competitor=competitor,
-            date__gte=start_date,
-            date__lte=end_date
-        )
+
+def prepare_period_chart_data(hotel, competitors, periods, advanced=False, loaded=None):
+    """
+    Chart data for several date windows from one read of each table.
+
+    ``periods`` maps a name to ``(start_date, end_date)``; the result maps
+    the same names to the prepare_chart_data payload (plus the market
+    average when ``advanced``). ``loaded`` may be a PeriodWindows already
+    built for these periods.
+    """
+    competitors = list(competitors)
+    windows = loaded if loaded is not None else PeriodWindows(hotel, competitors, periods)
+    payloads = {}
+    
+    for period in periods:
+        data = {}
         
-        comp_occupancy = comp_data.aggregate(Avg('estimated_occupancy'))['estimated_occupancy__avg'] or 0
-        comp_avg_rate = comp_data.aggregate(Avg('estimated_average_rate'))['estimated_average_rate__avg'] or 0
-        comp_revpar = comp_data.aggregate(Avg('revpar'))['revpar__avg'] or 0
+        # Hotel metrics and the hotel's own performance indices
+        data[hotel.name] = {
+            'occupancy_percentage': float(windows.avg('hotel', None, 'occupancy_percentage', period)),
+            'average_rate': float(windows.avg('hotel', None, 'average_rate', period)),
+            'revpar': float(windows.avg('hotel', None, 'revpar', period)),
+            'mpi': float(windows.avg('index', None, 'mpi', period)),
+            'ari': float(windows.avg('index', None, 'ari', period)),
+            'rgi': float(windows.avg('index', None, 'rgi', period))
+        }
         
-        # Get competitor performance indices
-        comp_performance = PerformanceIndex.objects.filter(
-            hotel=hotel,
-            competitor=competitor,
-            date__gte=start_date,
-            date__lte=end_date
-        )
+        for competitor in competitors:
+            data[competitor.name] = {
+                'occupancy_percentage': float(windows.avg('competitor', competitor.id, 'estimated_occupancy', period)),
+                'average_rate': float(windows.avg('competitor', competitor.id, 'estimated_average_rate', period)),
+                'revpar': float(windows.avg('competitor', competitor.id, 'revpar', period)),
+                'mpi': float(windows.avg('index', competitor.id, 'mpi', period)),
+                'ari': float(windows.avg('index', competitor.id, 'ari', period)),
+                'rgi': float(windows.avg('index', competitor.id, 'rgi', period))
+            }
         
-        comp_mpi = comp_performance.aggregate(Avg('mpi'))['mpi__avg'] or 0
-        comp_ari = comp_performance.aggregate(Avg('ari'))['ari__avg'] or 0
-        comp_rgi = comp_performance.aggregate(Avg('rgi'))['rgi__avg'] or 0
+        if advanced:
+            data['Market Average'] = {
+                'occupancy_percentage': float(windows.avg('market', None, 'market_occupancy', period)),
+                'average_rate': float(windows.avg('market', None, 'market_adr', period)),
+                'revpar': float(windows.avg('market', None, 'market_revpar', period)),
+                'mpi': 100.0,  # Market is the baseline
+                'ari': 100.0,
+                'rgi': 100.0
+            }
         
-        data[competitor.name] = {
-            'occupancy_percentage': float(comp_occupancy),
-            'average_rate': float(comp_avg_rate),
-            'revpar': float(comp_revpar),
-            'mpi': float(comp_mpi),
-            'ari': float(comp_ari),
-            'rgi': float(comp_rgi)
-        }
+        payloads[period] = data
     
-    return data
+    return payloads
+
+def prepare_chart_data(hotel, competitors, start_date, end_date):
+    """Prepare data for competitor charts"""
+    return prepare_period_chart_data(hotel, competitors, {'range': (start_date, end_date)})['range']
 
 def prepare_advanced_chart_data(hotel, competitors, start_date, end_date):
     """Prepare advanced data for competitor analytics charts"""
-    # This function extends the basic chart data with more detailed metrics
-    data = prepare_chart_data(hotel, competitors, start_date, end_date)
-    
-    # Get market summary data
-    market_summaries = MarketSummary.objects.filter(
-        date__gte=start_date,
-        date__lte=end_date
-    )
-    
-    # Calculate market averages
-    market_occupancy = market_summaries.aggregate(Avg('market_occupancy'))['market_occupancy__avg'] or 0
-    market_adr = market_summaries.aggregate(Avg('market_adr'))['market_adr__avg'] or 0
-    market_revpar = market_summaries.aggregate(Avg('market_revpar'))['market_revpar__avg'] or 0
-    
-    # Add market data
-    data['Market Average'] = {
-        'occupancy_percentage': float(market_occupancy),
-        'average_rate': float(market_adr),
-        'revpar': float(market_revpar),
-        'mpi': 100.0,  # Market is the baseline
-        'ari': 100.0,
-        'rgi': 100.0
+    # Extends the basic chart data with the market averages
+    return prepare_period_chart_data(hotel, competitors, {'range': (start_date, end_date)}, advanced=True)['range']
+
+def _iter_days(start_date, end_date):
+    for offset in range((end_date - start_date).days + 1):
+        yield start_date + timedelta(days=offset)
+
+
+def build_daily_trends(hotel, competitors, ranges, loaded=None):
+    """
+    Day-by-day occupancy/ADR/RevPAR per hotel for every (start, end) in ranges.
+
+    Fetches the hotel and competitor rows for all ranges in two queries and
+    pivots them into ``{'YYYY-MM-DD': {name: metrics}}``. Callers that need
+    several overlapping periods build once over all of them and use
+    slice_daily_trends for each period. When ``loaded`` is a PeriodWindows
+    covering the ranges its rows are used instead of querying again.
+    """
+    competitors = list(competitors)
+    if loaded is not None:
+        hotel_values = loaded.series('hotel').values('occupancy_percentage', 'average_rate', 'revpar')
+        competitor_values = [
+            (competitor.id, *row)
+            for competitor in competitors
+            for row in loaded.series('competitor', competitor.id).values(
+                'estimated_occupancy', 'estimated_average_rate', 'revpar'
+            )
+        ]
+    else:
+        date_filter = Q()
+        for start_date, end_date in ranges:
+            date_filter |= Q(date__gte=start_date, date__lte=end_date)
+        hotel_values = DailyData.objects.filter(date_filter, hotel=hotel).values_list(
+            'date', 'occupancy_percentage', 'average_rate', 'revpar'
+        )
+        # Oldest first so the most recently entered row for a day wins
+        competitor_values = CompetitorData.objects.filter(
+            date_filter, competitor__in=competitors
+        ).order_by('created_at').values_list(
+            'competitor_id', 'date', 'estimated_occupancy', 'estimated_average_rate', 'revpar'
+        )
+
+    hotel_rows = {
+        day: {
+            'occupancy_percentage': float(occupancy),
+            'average_rate': float(average_rate),
+            'revpar': float(revpar)
+        }
+        for day, occupancy, average_rate, revpar in hotel_values
+    }
+
+    competitor_rows = {}
+    for competitor_id, day, occupancy, average_rate, revpar in competitor_values:
+        competitor_rows[(day, competitor_id)] = {
+            'occupancy_percentage': float(occupancy or 0),
+            'average_rate': float(average_rate),
+            'revpar': float(revpar or 0)
+        }
+
+    daily_trends = {}
+    for start_date, end_date in ranges:
+        for day in _iter_days(start_date, end_date):
+            key = day.strftime('%Y-%m-%d')
+            if key in daily_trends:
+                continue
+            values = {}
+            if day in hotel_rows:
+                values[hotel.name] = hotel_rows[day]
+            for competitor in competitors:
+                if (day, competitor.id) in competitor_rows:
+                    values[competitor.name] = competitor_rows[(day, competitor.id)]
+            daily_trends[key] = values
+    return daily_trends
+
+
+def slice_daily_trends(daily_trends, start_date, end_date):
+    """The part of a build_daily_trends result covering start_date..end_date."""
+    return {
+        key: daily_trends.get(key, {})
+        for key in (day.strftime('%Y-%m-%d') for day in _iter_days(start_date, end_date))
     }
-    
-    return data
 
-def prepare_visualization_data(hotel, competitors, start_date, end_date):
-    """Prepare data specifically formatted for visualizations"""
+
+def prepare_visualization_data(hotel, competitors, start_date, end_date, daily_trends=None):
+    """
+    Prepare data specifically formatted for visualizations.
+
+    ``daily_trends`` may be a build_daily_trends result covering this range;
+    when omitted the trend for the range is fetched here.
+    """
     # Start with the advanced data
     data = prepare_advanced_chart_data(hotel, competitors, start_date, end_date)
     
-    # Add any visualization-specific data transformations here
-    # For example, calculating trends, growth rates, etc.
+    # Day-by-day data for trend visualization
+    if daily_trends is None:
+        daily_trends = build_daily_trends(hotel, competitors, [(start_date, end_date)])
+    data['daily_trends'] = slice_daily_trends(daily_trends, start_date, end_date)
     
-    # Calculate day-by-day data for trend visualization
-    date_range = (end_date - start_date).days + 1
-    daily_trends = {}
-    
-    for i in range(date_range):
-        current_date = start_date + timedelta(days=i)
-        daily_trends[current_date.strftime('%Y-%m-%d')] = {}
-        
-        # Get hotel data for this day
-        hotel_day_data = DailyData.objects.filter(hotel=hotel, date=current_date).first()
-        if hotel_day_data:
-            daily_trends[current_date.strftime('%Y-%m-%d')][hotel.name] = {
-                'occupancy_percentage': float(hotel_day_data.occupancy_percentage),
-                'average_rate': float(hotel_day_data.average_rate),
-                'revpar': float(hotel_day_data.revpar)
-            }
-        
-        # Get competitor data for this day
-        for competitor in competitors:
-            comp_day_data = CompetitorData.objects.filter(competitor=competitor, date=current_date).first()
-            if comp_day_data:
-                daily_trends[current_date.strftime('%Y-%m-%d')][competitor.name] = {
-                    'occupancy_percentage': float(comp_day_data.estimated_occupancy),
-                    'average_rate': float(comp_day_data.estimated_average_rate),
-                    'revpar': float(comp_day_data.revpar)
-                }
-    
-    # Add the daily trends to the data
-    data['daily_trends'] = daily_trends
-    
-    return data
\ No newline at end of file
+    return data
@@ -0,0 +1,69 @@
+/**
+ * Live front-desk updates for the Guest Experience screens
+ *
+ * Subscribes to the arrival event stream and patches a screen's rows in
+ * place as other terminals check guests in, move rooms, log courtesy calls
+ * or check guests out, instead of reloading the whole list.
+ */
+
+const guestEvents = {
+    /**
+     * Opens the event stream
+     * @param {string} url - The arrival_events endpoint
+     * @param {Function} onChange - Called with each change ({action, rows, removed})
+     * @param {Function} onResync - Called when changes may have been missed and the list should be reloaded
+     * @returns {EventSource|null} The stream, or null when the browser has no EventSource
+     */
+    subscribe: function(url, onChange, onResync) {
+        if (!window.EventSource) return null;
+
+        const source = new EventSource(url);
+        let dropped = false;
+
+        source.addEventListener('arrivals', event => {
+            try {
+                onChange(JSON.parse(event.data));
+            } catch (e) {
+                console.error('Invalid arrival event:', e);
+            }
+        });
+        source.addEventListener('resync', () => onResync());
+        source.addEventListener('open', () => {
+            // Anything published while the stream was down was missed
+            if (dropped) onResync();
+            dropped = false;
+        });
+        source.addEventListener('error', () => {
+            if (source.readyState === EventSource.CLOSED) return;
+            dropped = true;
+        });
+        return source;
+    },
+
+    /**
+     * Applies a change to a screen's rows
+     * @param {Array} rows - The rows the screen currently holds
+     * @param {Object} change - The change received from the stream
+     * @param {Function} belongs - Whether an updated row should be listed on this screen
+     * @returns {Array} The patched rows
+     */
+    patch: function(rows, change, belongs) {
+        const key = row => row.confirmation_number;
+        const gone = new Set((change.removed || []).concat((change.rows || []).map(key)));
+        const patched = rows.filter(row => !gone.has(key(row)));
+        (change.rows || []).forEach(row => {
+            if (belongs(row)) patched.push(row);
+        });
+        return patched;
+    },
+
+    /**
+     * Whether a status means the guest is in house
+     * @param {string} status - The arrival status
+     * @returns {boolean}
+     */
+    isInHouse: function(status) {
+        const value = (status || '').toLowerCase();
+        return value === 'in-house' || value === 'in house';
+    }
+};
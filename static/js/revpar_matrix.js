@@ -5,6 +5,10 @@ let revparChartPrevYear; // Global variable to store the chart instance for prev
 let currentMonth;
 let currentYear;
 let currentView = 'month'; // 'month' or '3month'
+let animationTimer = null; // Interval driving the week-by-week playback
+
+const MATRIX_API_URL = '/hotel/api/revpar-matrix/';
+const ANIMATION_FRAME_MS = 800;
 
 // Initialize the chart when the DOM is loaded
 document.addEventListener('DOMContentLoaded', function() {
@@ -173,10 +177,22 @@ function setupEventListeners() {
         this.classList.add('active');
         fetchAndUpdateChart();
     });
+    
+    // Week-by-week playback, if the page offers it
+    const animateBtn = document.getElementById('animateMatrixBtn');
+    if (animateBtn) {
+        animateBtn.addEventListener('click', animateMatrix);
+    }
 }
 
 // Fetch data for the selected month/year and update both charts
 function fetchAndUpdateChart() {
+    // A filter change ends any playback in progress
+    if (animationTimer) {
+        clearInterval(animationTimer);
+        animationTimer = null;
+    }
+    
     // Show loading indicators
     const currentChartContainer = document.getElementById('revparMatrix').parentNode;
     currentChartContainer.classList.add('loading');
@@ -215,7 +231,7 @@ function fetchAndUpdateChart() {
     const formattedPrevYearEndDate = formatDate(prevYearEndDate);
     
     // Make AJAX request for current period data
-    const currentPeriodPromise = fetch(`/hotel_management/api/revpar-matrix/?start_date=${formattedStartDate}&end_date=${formattedEndDate}`)
+    const currentPeriodPromise = fetch(`${MATRIX_API_URL}?start_date=${formattedStartDate}&end_date=${formattedEndDate}`)
         .then(response => {
             if (!response.ok) {
                 throw new Error('Network response was not ok');
@@ -224,7 +240,7 @@ function fetchAndUpdateChart() {
         });
     
     // Make AJAX request for previous year data
-    const prevYearPromise = fetch(`/hotel_management/api/revpar-matrix/?start_date=${formattedPrevYearStartDate}&end_date=${formattedPrevYearEndDate}`)
+    const prevYearPromise = fetch(`${MATRIX_API_URL}?start_date=${formattedPrevYearStartDate}&end_date=${formattedPrevYearEndDate}`)
         .then(response => {
             if (!response.ok) {
                 throw new Error('Network response was not ok');
@@ -250,13 +266,13 @@ function fetchAndUpdateChart() {
             const currentPeriodDateRange = document.getElementById('currentPeriodDateRange');
             if (currentPeriodDateRange) {
                 currentPeriodDateRange.textContent = 
-                    `${formatDisplayDate(currentData.start_date)} - ${formatDisplayDate(currentData.end_date)}`;
+                    `${formatDisplayDate(currentData.date_range.start_date)} - ${formatDisplayDate(currentData.date_range.end_date)}`;
             }
             
             const prevYearDateRange = document.getElementById('prevYearDateRange');
             if (prevYearDateRange) {
                 prevYearDateRange.textContent = 
-                    `${formatDisplayDate(prevYearData.start_date)} - ${formatDisplayDate(prevYearData.end_date)}`;
+                    `${formatDisplayDate(prevYearData.date_range.start_date)} - ${formatDisplayDate(prevYearData.date_range.end_date)}`;
             }
         })
         .catch(error => {
@@ -280,7 +296,61 @@ function updateChartData(data, chartType) {
     
     // Update hotel data point
     chart.data.datasets[0].data = [{
-        x: data.hotel_data.occupancy_index,
+        x: data.hotel_data.x,
+        y: data.hotel_data.y
+    }];
+    
+    // Update competitor data points
+    chart.data.datasets[1].data = data.competitor_data;
+    
+    chart.update();
+}
+
+// Play the current period week by week. All frames arrive in one
+// response (mode=animate), so playback never goes back to the server.
+function animateMatrix() {
+    if (animationTimer) {
+        clearInterval(animationTimer);
+        animationTimer = null;
+    }
+    
+    const startDate = currentView === 'month'
+        ? new Date(currentYear, currentMonth - 1, 1)
+        : new Date(currentYear, currentMonth - 3, 1);
+    const endDate = new Date(currentYear, currentMonth, 0);
+    
+    fetch(`${MATRIX_API_URL}?mode=animate&start_date=${formatDate(startDate)}&end_date=${formatDate(endDate)}`)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Network response was not ok');
+            }
+            return response.json();
+        })
+        .then(data => {
+            const frames = data.frames || [];
+            const dateRange = document.getElementById('currentPeriodDateRange');
+            let frameIndex = 0;
+            
+            if (!frames.length) return;
+            
+            animationTimer = setInterval(() => {
+                const frame = frames[frameIndex];
+                updateChartData(frame, 'current');
+                if (dateRange) {
+                    dateRange.textContent = `Week of ${formatDisplayDate(frame.week_start)}`;
+                }
+                
+                frameIndex += 1;
+                if (frameIndex >= frames.length) {
+                    clearInterval(animationTimer);
+                    animationTimer = null;
+                }
+            }, ANIMATION_FRAME_MS);
+        })
+        .catch(error => {
+            console.error('Error fetching animation data:', error);
+        });
+}
 
 // Helper function to get month name from month number
 function getMonthName(monthNumber) {